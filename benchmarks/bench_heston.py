@@ -0,0 +1,12 @@
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+from pricer.model.heston import HestonModel
+
+
+@benchmark("heston.calibrate", sizes=[1_000, 10_000], unit="contracts", repeat=1)
+def calibrate(size: int):
+    chain = synthetic.solved_chain(size)
+    chain = chain[chain["days_to_expiry"] > 0]
+    model = HestonModel(S=synthetic.SPOT, r=synthetic.RISK_FREE_RATE, q=synthetic.DIVIDEND_YIELD)
+    return (lambda: model.calibrate(chain, target="iv")), len(chain)
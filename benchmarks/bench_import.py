@@ -0,0 +1,76 @@
+"""
+Cold import cost of the modules worker processes and Streamlit pages start with.
+
+Each round imports the module in a fresh interpreter, so the timings include interpreter start up -
+which a worker process pays as well. To see where the time goes:
+
+    poetry run python -m benchmarks.bench_import pricer.model.monte_carlo
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.harness import benchmark
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+MODULES = [
+    "pricer",
+    "pricer.model.monte_carlo",
+    "pricer.model.implied_volatility",
+    "pricer.data.data",
+    "pricer.plotter.plot_volatility_surface",
+]
+
+
+def _import_in_subprocess(module: str | None, importtime: bool = False) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))}
+    flags = ["-X", "importtime"] if importtime else []
+    code = f"import {module}" if module else "pass"
+    return subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+
+def _importtime_rows(module: str | None) -> list[tuple[str, float, float]]:
+    rows = []
+    for line in _import_in_subprocess(module, importtime=True).stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+    return rows
+
+
+def import_times(module: str) -> list[tuple[str, float, float]]:
+    """
+    Returns
+        (name, self seconds, cumulative seconds) for everything `import module` loads, as reported by
+        `python -X importtime`. The interpreter's own start up imports always come first and are left out.
+    """
+    return _importtime_rows(module)[len(_importtime_rows(None)):]
+
+
+def _register(module: str):
+    @benchmark(f"import.{module}", sizes=[1], unit="imports", repeat=5)
+    def cold_import(size: int):
+        return (lambda: _import_in_subprocess(module)), size
+
+
+for _module in MODULES:
+    _register(_module)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Break down the cold import time of pricer modules")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--top", type=int, default=10, help="number of most expensive imports to list")
+    args = parser.parse_args(argv)
+    for module in args.modules:
+        rows = import_times(module)
+        print(f"{module}: {sum(self_s for _, self_s, _ in rows):.3f} s")
+        for name, _, cumulative in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+            print(f"    {cumulative:8.3f} s  {name}")
+
+
+if __name__ == "__main__":
+    main()
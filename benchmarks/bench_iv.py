@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+# Data() builds Alpaca clients eagerly - placeholders are enough as no request is ever made
+os.environ.setdefault("ALPACA_ID", "BENCHMARK")
+os.environ.setdefault("ALPACA_KEY", "BENCHMARK")
+
+from pricer.data.chain_dataset import CHUNK_SIZE, RAW, ChainDataset
+from pricer.data.data import Data
+from pricer.model.implied_volatility import implied_volatility_batch
+
+
+def offline_data() -> Data:
+    data = Data()
+    data.asset_price_dict[synthetic.SYMBOL] = synthetic.SPOT
+    data.dividend_yield_dict[synthetic.SYMBOL] = synthetic.DIVIDEND_YIELD
+    return data
+
+
+@benchmark("iv.clean_up_df", sizes=[1_000, 10_000, 100_000], unit="contracts", repeat=1)
+def clean_up_df(size: int):
+    data = offline_data()
+    chain = synthetic.option_chain(size, parity_band=0.1)
+    return (lambda: data.clean_up_df(chain.copy())), size
+
+
+@benchmark("iv.solve_stored_chain", sizes=[10_000, 100_000], unit="contracts", repeat=1)
+def solve_stored_chain(size: int):
+    """
+    clean_up_df out of core - the peak memory is a chunk's, not the chain's
+    """
+    data = offline_data()
+    dataset = ChainDataset(tempfile.mkdtemp(prefix="bench_chains."))
+    chain = synthetic.option_chain(size, parity_band=0.1)
+    for start in range(0, size, CHUNK_SIZE):
+        dataset.append(synthetic.SYMBOL, RAW, chain.iloc[start:start + CHUNK_SIZE])
+    del chain
+    return (lambda: data.solve_stored_chain(synthetic.SYMBOL, dataset)), size
+
+
+def batch_inputs(size: int):
+    chain = synthetic.option_chain(size)
+    period_year = (pd.to_datetime(chain["expiration_date"]) - pd.Timestamp.now().normalize()).dt.days.to_numpy() / 365
+    return chain["close_price"].to_numpy(), chain["strike_price"].to_numpy(), period_year, chain["type"].to_numpy()
+
+
+@benchmark("iv.implied_volatility_batch.numpy", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def iv_batch_numpy(size: int):
+    opt_px, K, T, typ = batch_inputs(size)
+    work = lambda: implied_volatility_batch(synthetic.SPOT, synthetic.DIVIDEND_YIELD, opt_px, K, T, synthetic.RISK_FREE_RATE, typ, backend="numpy")
+    return work, size
+
+
+@benchmark("iv.implied_volatility_batch.numba", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def iv_batch_numba(size: int):
+    opt_px, K, T, typ = batch_inputs(size)
+    implied_volatility_batch(synthetic.SPOT, synthetic.DIVIDEND_YIELD, opt_px[:2], K[:2], T[:2], synthetic.RISK_FREE_RATE, typ[:2], backend="numba") # compile outside the timing
+    work = lambda: implied_volatility_batch(synthetic.SPOT, synthetic.DIVIDEND_YIELD, opt_px, K, T, synthetic.RISK_FREE_RATE, typ, backend="numba")
+    return work, size
@@ -0,0 +1,108 @@
+"""
+Load test for the pricing service (`pricer.service`).
+
+Concurrent clients each send a stream of Asian option requests for one ticker and horizon with random
+strikes, and the client side latency and throughput are reported next to the server's /metrics.
+Without --url a service is started in this process on a synthetic surface, once with micro-batching
+and once with every request priced on its own, for comparison.
+
+    python -m benchmarks.bench_load --clients 16 --requests 20
+    python -m benchmarks.bench_load --url http://127.0.0.1:8765 --ticker AAPL --spot 270
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmarks import synthetic
+
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.service import WINDOW, PricingService, SurfaceRegistry
+
+
+def _post(url: str, payload) -> dict:
+    request = urllib.request.Request(f"{url}/price", data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.loads(response.read())
+
+
+def _get(url: str, path: str) -> dict:
+    with urllib.request.urlopen(f"{url}{path}", timeout=60) as response:
+        return json.loads(response.read())
+
+
+def run_load(url: str, ticker: str, spot: float, clients: int, requests: int, iterations: int, days: int, seed: int = 0) -> dict:
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+
+    def client(i):
+        generator = np.random.default_rng([seed, i])
+        for _ in range(requests):
+            payload = {"ticker": ticker, "strike": round(float(spot * generator.uniform(0.9, 1.1)), 1), "type": "call", "days": days, "iterations": iterations}
+            start = time.perf_counter()
+            response = _post(url, payload)
+            latencies[i].append(time.perf_counter() - start)
+            errors[i] += response["error"] is not None
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    all_latencies = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return {
+        "requests": clients * requests,
+        "errors": sum(errors),
+        "seconds": elapsed,
+        "throughput_rps": clients * requests / elapsed,
+        "latency_p50_ms": float(np.percentile(all_latencies, 50)),
+        "latency_p95_ms": float(np.percentile(all_latencies, 95)),
+        "latency_p99_ms": float(np.percentile(all_latencies, 99)),
+    }
+
+
+def _synthetic_service(window: float, max_batch: int) -> PricingService:
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(50)
+    registry = SurfaceRegistry()
+    registry.add("SYN", MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE))
+    return PricingService(registry, port=0, window=window, max_batch=max_batch).start()
+
+
+def _report(label: str, client: dict, server: dict):
+    print(f"\n{label}")
+    print(f"  client: {client['requests']} requests in {client['seconds']:.2f}s, {client['throughput_rps']:.1f} req/s, "
+          f"p50 {client['latency_p50_ms']:.1f} ms, p95 {client['latency_p95_ms']:.1f} ms, p99 {client['latency_p99_ms']:.1f} ms, {client['errors']} errors")
+    print(f"  server: {server['batches']} simulations, mean batch {server['mean_batch_size']:.1f}, max batch {server['max_batch_size']}, "
+          f"{server['simulation_s']:.2f}s simulating")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Load test the pricing service")
+    parser.add_argument("--url", default=None, help="a running service, otherwise one is started here on a synthetic surface")
+    parser.add_argument("--ticker", default="SYN")
+    parser.add_argument("--spot", type=float, default=synthetic.SPOT, help="strikes are drawn within 10%% of this")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20, help="per client")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    load = dict(ticker=args.ticker, spot=args.spot, clients=args.clients, requests=args.requests, iterations=args.iterations, days=args.days)
+    if args.url:
+        _report(args.url, run_load(args.url, **load), _get(args.url, "/metrics"))
+        return
+    for label, window, max_batch in (("micro-batching", WINDOW, 256), ("one simulation per request", 0.0, 1)):
+        service = _synthetic_service(window, max_batch)
+        try:
+            _report(label, run_load(service.url, **load), _get(service.url, "/metrics"))
+        finally:
+            service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+from pricer.model.monte_carlo import MonteCarlo
+
+
+@benchmark("lv.local_volatility", sizes=[50, 200, 500], unit="grid nodes")
+def local_volatility(size: int):
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(size)
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE)
+    return mc.local_volatility, size * size
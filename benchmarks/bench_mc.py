@@ -0,0 +1,135 @@
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+from pricer.model import asian_analytic, numba_kernels
+from pricer.model.basket import BasketMonteCarlo
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, Barrier, European, FixedScheduleAsian, GeometricAsian, Lookback
+
+PATH_LENGTH = 30
+RESOLUTION = 50
+BASKET_ASSETS = 4
+
+numba_kernels.resolve_backend("numpy") # load the lazily imported backend module outside the timings
+
+
+def local_vol_model() -> MonteCarlo:
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(RESOLUTION)
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE)
+    mc.local_volatility()
+    return mc
+
+
+@benchmark("mc.simple_random_walk.flat", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def flat_vol_walk(size: int):
+    mc = local_vol_model()
+    work = lambda: mc.simple_random_walk(synthetic.SPOT, 0.2, synthetic.SPOT * 1.05, "call", PATH_LENGTH, size, backend="numpy")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("mc.simple_random_walk.local_vol", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def local_vol_walk(size: int):
+    mc = local_vol_model()
+    work = lambda: mc.simple_random_walk(synthetic.SPOT, mc.lv_surface, synthetic.SPOT * 1.05, "call", PATH_LENGTH, size, backend="numpy")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("mc.simple_random_walk.local_vol.f32", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def local_vol_walk_float32(size: int):
+    mc = local_vol_model()
+    work = lambda: mc.simple_random_walk(synthetic.SPOT, mc.lv_surface, synthetic.SPOT * 1.05, "call", PATH_LENGTH, size, dtype=np.float32, backend="numpy")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("mc.simple_random_walk.flat.f32", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def flat_vol_walk_float32(size: int):
+    mc = local_vol_model()
+    work = lambda: mc.simple_random_walk(synthetic.SPOT, 0.2, synthetic.SPOT * 1.05, "call", PATH_LENGTH, size, dtype=np.float32, backend="numpy")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("mc.simple_random_walk.local_vol.numba", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def local_vol_walk_numba(size: int):
+    mc = local_vol_model()
+    mc.simple_random_walk(synthetic.SPOT, mc.lv_surface, synthetic.SPOT * 1.05, "call", 2, 10, backend="numba") # compile outside the timing
+    work = lambda: mc.simple_random_walk(synthetic.SPOT, mc.lv_surface, synthetic.SPOT * 1.05, "call", PATH_LENGTH, size, backend="numba")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("mc.simulate.six_payoffs", sizes=[10_000, 100_000, 1_000_000], unit="paths*steps", repeat=1)
+def six_payoffs(size: int):
+    """
+    Compare with mc.simple_random_walk.flat - the extra payoffs only add their per step updates
+    """
+    mc = local_vol_model()
+    strike = synthetic.SPOT * 1.05
+    payoffs = [
+        ArithmeticAsian(strike, "call"), GeometricAsian(strike, "call"), FixedScheduleAsian(strike, "call", tuple(range(5, PATH_LENGTH + 1, 5))),
+        European(strike, "call"), Lookback("call"), Barrier(strike, "call", synthetic.SPOT * 1.2),
+    ]
+    work = lambda: mc.simulate(synthetic.SPOT, 0.2, payoffs, PATH_LENGTH, size, backend="numpy")
+    return work, size * PATH_LENGTH
+
+
+@benchmark("basket.simulate.local_vol", sizes=[10_000, 100_000], unit="paths*steps*assets", repeat=1)
+def basket_local_vol(size: int):
+    correlation = np.full((BASKET_ASSETS, BASKET_ASSETS), 0.5) + 0.5 * np.eye(BASKET_ASSETS)
+    basket = BasketMonteCarlo([local_vol_model() for _ in range(BASKET_ASSETS)], correlation).local_volatility()
+    work = lambda: basket.simulate("local", [ArithmeticAsian(synthetic.SPOT * 1.05, "call")], PATH_LENGTH, size)
+    return work, size * PATH_LENGTH * BASKET_ASSETS
+
+
+@benchmark("basket.local_vol.loop_over_models", sizes=[10_000, 100_000], unit="paths*steps*assets", repeat=1)
+def basket_local_vol_loop(size: int):
+    """
+    The same paths' LV lookups done one MonteCarlo at a time, for comparison with the stacked lookup
+    """
+    models = [local_vol_model() for _ in range(BASKET_ASSETS)]
+    prices = np.random.default_rng(0).uniform(0.6, 1.4, size) * synthetic.SPOT
+    work = lambda: [[model.get_lv(step / 252, prices) for model in models] for step in range(PATH_LENGTH)]
+    return work, size * PATH_LENGTH * BASKET_ASSETS
+
+
+@benchmark("mc.reanchor.sticky_moneyness", sizes=[50, 100, 200], unit="grid points")
+def reanchor_sticky_moneyness(size: int):
+    """
+    A spot move with the IV and LV grids reused - compare with lv.local_volatility, the rebuild it replaces
+    """
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(size)
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE)
+    mc.local_volatility()
+    work = lambda: mc.reanchor(synthetic.SPOT * 1.01)
+    return work, size * size
+
+
+@benchmark("mc.reanchor.sticky_strike", sizes=[50, 100, 200], unit="grid points")
+def reanchor_sticky_strike(size: int):
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(size)
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE)
+    mc.local_volatility()
+    work = lambda: mc.reanchor(synthetic.SPOT * 1.01, "sticky_strike")
+    return work, size * size
+
+
+@benchmark("asian_analytic.arithmetic", sizes=[1_000, 100_000, 1_000_000], unit="contracts")
+def arithmetic_asian_analytic(size: int):
+    """
+    Turnbull-Wakeman prices of a strike x maturity grid - the flat vol fast path in place of a simulation
+    """
+    strikes = np.linspace(0.5, 1.5, size // 100)[:, None] * synthetic.SPOT
+    days = np.arange(1, 101)
+    work = lambda: asian_analytic.arithmetic_asian_price(synthetic.SPOT, strikes, days, 0.2, synthetic.RISK_FREE_RATE, synthetic.DIVIDEND_YIELD)
+    return work, strikes.size * days.size
+
+
+@benchmark("mc.simulate.control_variate", sizes=[10_000, 100_000], unit="paths*steps", repeat=1)
+def control_variate_walk(size: int):
+    """
+    Compare the standard error with mc.simple_random_walk.flat - the geometric control costs a log per step
+    """
+    mc = local_vol_model()
+    payoff = asian_analytic.control_variate(synthetic.SPOT, synthetic.SPOT * 1.05, "call", PATH_LENGTH, 0.2, mc.r)
+    work = lambda: mc.simulate(synthetic.SPOT, 0.2, [payoff], PATH_LENGTH, size, backend="numpy")
+    return work, size * PATH_LENGTH
@@ -0,0 +1,15 @@
+import numpy as np
+
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+from pricer.model.scenario import ScenarioGrid, revalue_chain
+
+# 50 spot moves x 20 parallel vol shifts
+GRID = ScenarioGrid(spot_shocks=np.linspace(-0.25, 0.25, 50), vol_shocks=np.linspace(-0.05, 0.14, 20))
+
+
+@benchmark("scenario.revalue_chain", sizes=[1_000, 10_000], unit="contracts*scenarios")
+def scenario_revalue_chain(size: int):
+    chain = synthetic.solved_chain(size)
+    return (lambda: revalue_chain(chain, synthetic.SPOT, GRID)), size * GRID.size
@@ -0,0 +1,76 @@
+import itertools
+
+from benchmarks import synthetic
+from benchmarks.harness import benchmark
+
+from pricer.plotter import plot_volatility_surface
+from pricer.plotter.plot_volatility_surface import create_volatility_surface
+from pricer.plotter.surface_pipeline import build_surfaces, make_executor
+
+RESOLUTION = 50
+WATCHLIST_CHAIN = 20_000 # contracts per ticker in the watchlist benchmarks
+
+_seeds = itertools.count() # every round gets chains the worker caches have not seen
+_executor = None
+
+
+def clear_caches():
+    plot_volatility_surface._triangulations.clear()
+    plot_volatility_surface._interpolators.clear()
+
+
+@benchmark("surface.create_volatility_surface", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def volatility_surface(size: int):
+    chain = synthetic.solved_chain(size)
+    clear_caches() # a new chain - triangulation, gradient estimation and evaluation
+    return (lambda: create_volatility_surface(chain, RESOLUTION)), size
+
+
+@benchmark("surface.create_volatility_surface.resolution", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def new_resolution(size: int):
+    chain = synthetic.solved_chain(size)
+    clear_caches()
+    create_volatility_surface(chain, RESOLUTION)
+    return (lambda: create_volatility_surface(chain, 2 * RESOLUTION)), size # evaluation only
+
+
+@benchmark("surface.create_volatility_surface.adaptive", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def adaptive_surface(size: int):
+    """
+    A 20 x 20 node budget placed by curvature and density, as accurate at the contracts as a uniform 50 x 50
+    grid - the pilot evaluation is the extra cost over a change of resolution
+    """
+    chain = synthetic.solved_chain(size)
+    clear_caches()
+    create_volatility_surface(chain, RESOLUTION) # triangulated already, as for a change of resolution
+    return (lambda: create_volatility_surface(chain, 20, grid="adaptive")), size
+
+
+@benchmark("surface.create_volatility_surface.new_iv", sizes=[1_000, 10_000, 100_000], unit="contracts")
+def new_iv(size: int):
+    chain = synthetic.solved_chain(size)
+    clear_caches()
+    create_volatility_surface(chain, RESOLUTION)
+    refreshed = chain.assign(calculated_iv=chain["calculated_iv"] * 1.01)
+    return (lambda: create_volatility_surface(refreshed, RESOLUTION)), size # gradient estimation and evaluation
+
+
+def watchlist(size: int) -> dict:
+    return {f"T{i}": synthetic.solved_chain(WATCHLIST_CHAIN, seed=next(_seeds)) for i in range(size)}
+
+
+@benchmark("surface.watchlist.sequential", sizes=[1, 4, 8], unit="tickers")
+def watchlist_sequential(size: int):
+    chains = watchlist(size)
+    clear_caches()
+    return (lambda: [create_volatility_surface(chain, RESOLUTION) for chain in chains.values()]), size
+
+
+@benchmark("surface.watchlist.process_pool", sizes=[1, 4, 8], unit="tickers")
+def watchlist_process_pool(size: int):
+    global _executor
+    if _executor is None:
+        _executor = make_executor()
+        list(build_surfaces(watchlist(2), RESOLUTION, executor=_executor)) # start the workers outside the timings
+    chains = watchlist(size)
+    return (lambda: list(build_surfaces(chains, RESOLUTION, executor=_executor))), size
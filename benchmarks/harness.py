@@ -0,0 +1,133 @@
+"""
+A small, dependency-free benchmark harness.
+
+Benchmarks register themselves with `@benchmark`. A benchmark function receives a size and returns
+a zero-argument callable (the timed work) together with the number of work units it processes, so
+that setup cost stays out of the measurement and throughput can be reported per unit.
+"""
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+REGISTRY: list["Benchmark"] = []
+
+
+@dataclass
+class Benchmark:
+    name: str
+    func: Callable[[int], tuple[Callable[[], object], int]]
+    sizes: list[int]
+    unit: str                      # what the work units are e.g. "contracts", "paths*steps"
+    repeat: int = 3                # timed rounds, the best one is reported
+    params: dict = field(default_factory=dict)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: int
+    seconds: float
+    throughput: float              # work units per second
+    unit: str
+    peak_memory_mb: float | None
+
+
+def benchmark(name: str, sizes: list[int], unit: str, repeat: int = 3, **params):
+    def register(func):
+        REGISTRY.append(Benchmark(name=name, func=func, sizes=sizes, unit=unit, repeat=repeat, params=params))
+        return func
+    return register
+
+
+def measure(bench: Benchmark, size: int, track_memory: bool = True) -> BenchmarkResult:
+    """
+    Time the best of `bench.repeat` rounds, then run once more under tracemalloc for the peak memory.
+    Memory is measured separately as tracing slows down the timed rounds considerably.
+    """
+    best = float("inf")
+    for _ in range(max(1, bench.repeat)):
+        work, units = bench.func(size)
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    peak_memory_mb = None
+    if track_memory:
+        work, units = bench.func(size)
+        tracemalloc.start()
+        try:
+            work()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_memory_mb = peak / 2 ** 20
+    return BenchmarkResult(
+        name=bench.name,
+        size=size,
+        seconds=best,
+        throughput=units / best if best > 0 else float("inf"),
+        unit=f"{bench.unit}/s",
+        peak_memory_mb=peak_memory_mb,
+    )
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def save_results(results: list[BenchmarkResult], path: Path | None = None) -> Path:
+    revision = git_revision()
+    if path is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{revision}.json"
+    payload = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(payload, indent=2))
+    return path
+
+
+def load_results(path: Path) -> dict[tuple[str, int], dict]:
+    payload = json.loads(Path(path).read_text())
+    return {(result["name"], result["size"]): result for result in payload["results"]}
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    lines = [f"{'benchmark':<48}{'size':>10}{'seconds':>12}{'throughput':>16}  {'unit':<16}{'peak MB':>10}"]
+    for r in results:
+        peak = f"{r.peak_memory_mb:.1f}" if r.peak_memory_mb is not None else "-"
+        lines.append(f"{r.name:<48}{r.size:>10}{r.seconds:>12.4f}{r.throughput:>16.4g}  {r.unit:<16}{peak:>10}")
+    return "\n".join(lines)
+
+
+def format_comparison(baseline_path: Path, candidate_path: Path) -> str:
+    """
+    Speedup > 1 means the candidate is faster than the baseline
+    """
+    baseline, candidate = load_results(baseline_path), load_results(candidate_path)
+    lines = [f"{'benchmark':<48}{'size':>10}{'base s':>12}{'new s':>12}{'speedup':>10}{'base MB':>10}{'new MB':>10}"]
+    for key in sorted(baseline.keys() & candidate.keys()):
+        base, new = baseline[key], candidate[key]
+        speedup = base["seconds"] / new["seconds"] if new["seconds"] > 0 else float("inf")
+        base_mb = f"{base['peak_memory_mb']:.1f}" if base["peak_memory_mb"] is not None else "-"
+        new_mb = f"{new['peak_memory_mb']:.1f}" if new["peak_memory_mb"] is not None else "-"
+        lines.append(f"{key[0]:<48}{key[1]:>10}{base['seconds']:>12.4f}{new['seconds']:>12.4f}{speedup:>10.2f}{base_mb:>10}{new_mb:>10}")
+    return "\n".join(lines)
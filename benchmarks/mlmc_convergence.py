@@ -0,0 +1,83 @@
+"""
+Convergence of multilevel against plain Monte Carlo for a local volatility Asian option.
+
+For every target standard error the plain daily walk (`MonteCarlo.simulate`) is sized from a pilot run
+to reach it, and `MonteCarlo.simulate_multilevel` picks its own paths per level. Both are timed and
+their cost counted in simulated time steps. With --steps-per-day above 1 the plain walk is sub-daily,
+i.e. less discretisation bias - plain Monte Carlo pays for every sub-step on every path. Multilevel adds
+levels (up to the same step) only until its estimated bias is within the target, and then only on the few
+paths of its finest levels. Its epsilon is a root mean square error, half of its square spent on the bias.
+
+    python -m benchmarks.mlmc_convergence
+    python -m benchmarks.mlmc_convergence --steps-per-day 4 --epsilons 0.02 0.01
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import synthetic
+
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian
+
+PILOT_PATHS = 20_000
+
+
+def _sub_daily_simulate(mc: MonteCarlo, payoff, path_length: int, iterations: int, steps_per_day: int, seed: int):
+    """
+    Plain Monte Carlo on the sub-daily walk - a path of path_length * steps_per_day steps, settled on the daily closes
+    """
+    from pricer.model import mlmc
+    level = mlmc.LevelStatistics(level=0, step_days=1 / steps_per_day, cost=path_length * steps_per_day)
+    generator = np.random.default_rng(seed)
+    while level.paths < iterations:
+        mlmc._sample(mc, generator, level, synthetic.SPOT, mc.lv_surface, payoff, path_length, min(iterations - level.paths, mlmc.BATCH_PATHS))
+    return level.mean, np.sqrt(level.variance / level.paths)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Multilevel vs plain Monte Carlo cost for a target standard error")
+    parser.add_argument("--epsilons", type=float, nargs="+", default=[0.02, 0.01, 0.005])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--steps-per-day", type=int, default=1)
+    parser.add_argument("--resolution", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    maturities, strike_prices, implied_vol = synthetic.volatility_surface(args.resolution)
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, synthetic.SPOT, synthetic.DIVIDEND_YIELD, synthetic.RISK_FREE_RATE)
+    mc.local_volatility()
+    payoff = ArithmeticAsian(synthetic.SPOT * 1.05, "call")
+    steps = args.days * args.steps_per_day
+
+    def plain(iterations, seed):
+        if args.steps_per_day == 1:
+            result = mc.simulate(synthetic.SPOT, mc.lv_surface, [payoff], args.days, iterations, seed=seed, backend="numpy")
+            return result.prices[0], result.standard_errors[0]
+        return _sub_daily_simulate(mc, payoff, args.days, iterations, args.steps_per_day, seed)
+
+    _, pilot_error = plain(PILOT_PATHS, seed=0)
+    path_variance = pilot_error ** 2 * PILOT_PATHS
+    print(f"Arithmetic Asian call, strike {payoff.strike:g}, {args.days} days, {args.steps_per_day} step(s) per day, local volatility")
+    print(f"{'epsilon':>8} | {'MC price':>9} {'s.e.':>7} {'steps':>11} {'seconds':>8} | {'MLMC price':>10} {'s.e.':>7} {'steps':>11} {'seconds':>8} | {'steps saved':>11}")
+    for epsilon in args.epsilons:
+        iterations = int(np.ceil(2 * path_variance / epsilon ** 2)) # the standard error multilevel allows itself
+        start = time.perf_counter()
+        mc_price, mc_error = plain(iterations, seed=1)
+        mc_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = mc.simulate_multilevel(synthetic.SPOT, mc.lv_surface, payoff, args.days, epsilon, args.steps_per_day, seed=2)
+        mlmc_seconds = time.perf_counter() - start
+        print(f"{epsilon:>8g} | {mc_price:>9.4f} {mc_error:>7.4f} {iterations * steps:>11,} {mc_seconds:>8.2f} | "
+              f"{result.price:>10.4f} {result.standard_error:>7.4f} {result.cost:>11,} {mlmc_seconds:>8.2f} | {iterations * steps / result.cost:>10.1f}x")
+
+    print("\nLevels at the last epsilon")
+    print(f"estimated bias {result.bias:.4f}, {'converged' if result.converged else 'NOT converged'}")
+    print(f"{'level':>5} {'step (days)':>11} {'paths':>9} {'mean':>9} {'variance':>10}")
+    for level in result.levels:
+        print(f"{level.level:>5} {level.step_days:>11g} {level.paths:>9,} {level.mean:>9.4f} {level.variance:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
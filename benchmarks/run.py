@@ -0,0 +1,56 @@
+"""
+Run the benchmark suite and record the results against the current git revision.
+
+    poetry run python -m benchmarks.run                       # everything, results saved to benchmarks/results/<revision>.json
+    poetry run python -m benchmarks.run --quick -k mc         # smallest size of the MC benchmarks only
+    poetry run python -m benchmarks.run --compare benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import argparse
+import importlib
+from pathlib import Path
+
+from benchmarks.harness import REGISTRY, format_comparison, format_results, measure, save_results
+
+BENCHMARK_MODULES = [
+    "benchmarks.bench_iv",
+    "benchmarks.bench_surface",
+    "benchmarks.bench_lv",
+    "benchmarks.bench_mc",
+    "benchmarks.bench_heston",
+    "benchmarks.bench_scenario",
+    "benchmarks.bench_import",
+]
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Pricer benchmark suite")
+    parser.add_argument("-k", "--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--quick", action="store_true", help="only run the smallest size of each benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory run")
+    parser.add_argument("--output", type=Path, default=None, help="where to write the json results")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASELINE", "CANDIDATE"), help="compare two result files and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        print(format_comparison(*args.compare))
+        return
+
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+
+    results = []
+    for bench in REGISTRY:
+        if args.filter not in bench.name:
+            continue
+        sizes = bench.sizes[:1] if args.quick else bench.sizes
+        for size in sizes:
+            result = measure(bench, size, track_memory=not args.no_memory)
+            print(format_results([result]).splitlines()[-1], flush=True)
+            results.append(result)
+
+    path = save_results(results, args.output)
+    print(f"\nResults written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Offline synthetic market data for the benchmark suite.
+
+Chains are shaped like the DataFrames `Data.get_active_options_api` hands to `clean_up_df`
+(one row per OTM contract) and are priced off a smiley Black-Scholes surface so that the IV
+solver has real work to do. Everything is seeded so runs are comparable across commits.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+SYMBOL = "SYN"
+SPOT = 100.0
+RISK_FREE_RATE = 0.035
+DIVIDEND_YIELD = 0.01
+# Contracts share a few dozen listed expiries - weeklies, then monthlies, then LEAPS - as on a real chain
+LISTED_EXPIRIES = np.concatenate([np.arange(14, 63, 7), np.arange(63, 365, 30), np.arange(365, 731, 91)])
+
+
+def smile(moneyness: np.ndarray, period_year: np.ndarray) -> np.ndarray:
+    """
+    A simple skewed smile with a mild term structure - enough curvature to keep the solvers honest
+    """
+    log_moneyness = np.log(moneyness)
+    return 0.22 - 0.1 * log_moneyness + 0.25 * log_moneyness ** 2 + 0.02 * np.sqrt(period_year)
+
+
+def black_scholes_price(S, d, K, T, r, sigma, is_call):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r - d + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    call = S * np.exp(-d * T) * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
+    put = K * np.exp(-r * T) * ndtr(-d2) - S * np.exp(-d * T) * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def option_chain(n_contracts: int, seed: int = 0, parity_band: float = 0.0) -> pd.DataFrame:
+    """
+    Args
+        n_contracts - number of rows in the chain
+        seed - seed for the strike / expiry draws
+        parity_band - within this fraction of spot strikes are whole dollars and either side is listed,
+            like the ITM contracts the Alpaca fetch keeps for the put-call parity fit
+    Returns
+        a raw chain with the columns of `ContractModel`, ready for `Data.clean_up_df`
+    """
+    generator = np.random.default_rng(seed)
+    days_to_expiry = generator.choice(LISTED_EXPIRIES, size=n_contracts)
+    moneyness = generator.uniform(0.5, 1.5, size=n_contracts)
+    near = np.abs(moneyness - 1) <= parity_band
+    strike = np.where(near, np.round(SPOT * moneyness), np.round(SPOT * moneyness, 1))
+    is_call = np.where(near, generator.random(n_contracts) < 0.5, strike > SPOT) # otherwise OTM only, like the Alpaca filter
+    period_year = days_to_expiry / 365
+    sigma = smile(strike / SPOT, period_year)
+    close_price = black_scholes_price(SPOT, DIVIDEND_YIELD, strike, period_year, RISK_FREE_RATE, sigma, is_call)
+    expiration_date = [(datetime.now() + timedelta(days=int(days))).strftime("%Y-%m-%d") for days in days_to_expiry]
+    return pd.DataFrame({
+        "close_price": np.maximum(close_price, 0.06),
+        "id": [f"id-{i}" for i in range(n_contracts)],
+        "symbol": [f"{SYMBOL}{i:08d}" for i in range(n_contracts)],
+        "name": SYMBOL,
+        "expiration_date": expiration_date,
+        "underlying_symbol": SYMBOL,
+        "type": np.where(is_call, "call", "put"),
+        "style": "american",
+        "strike_price": strike,
+        "open_interest": generator.integers(1, 5000, size=n_contracts),
+        "size": 100,
+    })
+
+
+def solved_chain(n_contracts: int, seed: int = 0) -> pd.DataFrame:
+    """
+    A chain as it looks after `clean_up_df` - the true smile is used in place of the solved IV
+    """
+    df = option_chain(n_contracts, seed)
+    df["expiration_date"] = pd.to_datetime(df["expiration_date"]).dt.normalize()
+    df["days_to_expiry"] = (df["expiration_date"] - pd.Timestamp.now().normalize()).dt.days
+    df["period_year"] = df["days_to_expiry"] / 365
+    df["calculated_iv"] = smile(df["strike_price"] / SPOT, df["period_year"])
+    return df
+
+
+def volatility_surface(resolution: int):
+    """
+    Returns
+        maturities, strike_prices, implied_vol grids shaped like `create_volatility_surface`'s output
+    """
+    maturities_1d = np.linspace(14, 730, resolution)
+    strike_prices_1d = np.linspace(0.5 * SPOT, 1.5 * SPOT, resolution)
+    maturities, strike_prices = np.meshgrid(maturities_1d, strike_prices_1d)
+    implied_vol = smile(strike_prices / SPOT, maturities / 365)
+    return maturities, strike_prices, implied_vol
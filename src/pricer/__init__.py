@@ -1,3 +1,33 @@
+import importlib
 from pathlib import Path
 
-ROOT_DIR = Path(__file__).resolve().parents[2]
\ No newline at end of file
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# Top level API - each name is imported from its module on first access, so `import pricer` stays cheap
+_EXPORTS = {
+    "Data": "pricer.data.data",
+    "TTLCache": "pricer.data.cache",
+    "SurfaceSnapshot": "pricer.data.surface_store",
+    "SurfaceStore": "pricer.data.surface_store",
+    "BlackScholesModel": "pricer.model.black_scholes_model",
+    "HestonModel": "pricer.model.heston",
+    "HestonParameters": "pricer.model.heston",
+    "IVResult": "pricer.model.implied_volatility",
+    "IVStatus": "pricer.model.implied_volatility",
+    "implied_volatility_batch": "pricer.model.implied_volatility",
+    "MonteCarlo": "pricer.model.monte_carlo",
+}
+
+__all__ = ["ROOT_DIR", *_EXPORTS]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
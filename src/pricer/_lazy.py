@@ -0,0 +1,68 @@
+"""
+Deferred imports for the heavy dependencies - scipy submodules, plotly, numba, the Alpaca SDK.
+
+Importing `pricer.model.monte_carlo` in a worker process, or a Streamlit page, should not pay for
+libraries the caller may never touch. `lazy_import` hands back a module whose code only runs on the
+first attribute access, `lazy_attribute` does the same for a single name pulled out of a module and
+keeps that name patchable (e.g. `mocker.patch("pricer.data.data.TradingClient")`).
+
+Annotations are evaluated when a function is defined, so modules using these for names that appear in
+signatures need `from __future__ import annotations`.
+"""
+import importlib
+import importlib.util
+import sys
+import threading
+
+
+def lazy_import(name: str):
+    """
+    Module `name`, executed on first attribute access rather than now. Modules that are already
+    imported are returned as they are. Raises ModuleNotFoundError straight away if `name` does not exist.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module) # as a regular import of a submodule would
+    return module
+
+
+class lazy_attribute:
+    """
+    Stand-in for `from module import name` that imports `module` the first time it is called or one
+    of its attributes is read - enough for classes and enums used as `Name(...)` or `Name.MEMBER`
+    """
+    def __init__(self, module: str, name: str):
+        self._module = module
+        self._name = name
+        self._target = None
+        self._lock = threading.Lock()
+
+    def _resolve(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    self._target = getattr(importlib.import_module(self._module), self._name)
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, item: str):
+        if item in ("_module", "_name", "_target", "_lock"): # not set yet e.g. while copying
+            raise AttributeError(item)
+        return getattr(self._resolve(), item)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._target is not None else "not loaded"
+        return f"<lazy {self._module}.{self._name} ({state})>"
@@ -0,0 +1,78 @@
+"""
+Thread-safe TTL cache with batched, de-duplicated fetching.
+
+`get_many` serves fresh entries from memory and fetches every missing key in one call. Keys that another
+caller is already fetching are not requested again - the second caller waits for the first one's
+result - so concurrent page loads asking for overlapping symbols share a single round trip.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Hashable, Iterable
+
+
+class TTLCache:
+    def __init__(self, ttl: timedelta, clock: Callable[[], datetime] = datetime.now):
+        """
+        Args
+            ttl - how long an entry stays fresh
+            clock - source of the current time, swappable for tests
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: dict[Hashable, tuple[object, datetime]] = {}
+        self._in_flight: dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[Hashable], fetch: Callable[[list], dict]) -> dict:
+        """
+        Args
+            keys - keys wanted
+            fetch - called with the list of keys that are neither cached nor being fetched, returns key -> value
+        Returns
+            key -> value for every key; keys fetch did not return a value for are missing
+        """
+        keys = list(dict.fromkeys(keys))
+        result, to_fetch, waiting = {}, [], {}
+        with self._lock:
+            now = self.clock()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    result[key] = entry[0]
+                elif key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                else:
+                    to_fetch.append(key)
+            done = threading.Event()
+            for key in to_fetch:
+                self._in_flight[key] = done
+
+        if to_fetch:
+            try:
+                fetched = fetch(to_fetch)
+                with self._lock:
+                    expiry = self.clock() + self.ttl
+                    for key in to_fetch:
+                        if key in fetched:
+                            self._entries[key] = (fetched[key], expiry)
+                result.update({key: fetched[key] for key in to_fetch if key in fetched})
+            finally:
+                with self._lock:
+                    for key in to_fetch:
+                        self._in_flight.pop(key, None)
+                done.set()
+
+        if waiting:
+            for event in set(waiting.values()):
+                event.wait()
+            # Whatever the other caller failed to fetch is retried here
+            result.update(self.get_many(waiting.keys(), fetch))
+        return result
+
+    def invalidate(self, keys: Iterable[Hashable] | None = None):
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+            else:
+                for key in keys:
+                    self._entries.pop(key, None)
@@ -0,0 +1,195 @@
+"""
+Out-of-core option chains, for universes whose chains do not fit in memory at once.
+
+A chain is stored as a sequence of parts (chunks of rows), each a directory of per column `.npy`
+files like the `HistoryStore` snapshots, in a stage per processing step:
+
+    <root>/<TICKER>/raw/<part>/meta.json        contracts as fetched and filtered, before the IV solve
+                               <column>.npy
+    <root>/<TICKER>/solved/<part>/...           the cleaned chain, what `Data.clean_up_df` would return
+
+Every stage of the pipeline holds at most one chunk (plus the `max_pending` chunks queued for the
+writer): pages are turned into chunks by `rechunk`, and `write_behind` writes them from a background
+thread behind a bounded queue, so a producer that outruns the disk blocks instead of piling chunks up
+in memory. Reads memory-map the parts and only open the columns asked for - a surface needs four
+columns of a chain stored with a dozen.
+"""
+import json
+import queue
+import shutil
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from pricer import ROOT_DIR
+from pricer.data.columnar import save_columns, write_atomically
+from pricer.instrumentation import instrumentation
+
+FORMAT_VERSION = 1
+RAW = "raw"
+SOLVED = "solved"
+CHUNK_SIZE = 10_000   # rows per part
+MAX_PENDING = 4       # chunks queued for the writer before the producer blocks
+
+
+def rechunk(pages: Iterable[list], chunk_size: int, to_frame: Callable[[list], pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    Args
+        pages - lists of records, e.g. the filtered contracts of each API page
+        chunk_size - rows per chunk, the last one may be shorter
+        to_frame - turns a list of records into a DataFrame
+    Yields
+        DataFrames of chunk_size rows, holding no more than one chunk and one page at a time
+    """
+    pending = []
+    for page in pages:
+        pending.extend(page)
+        while len(pending) >= chunk_size:
+            yield to_frame(pending[:chunk_size])
+            pending = pending[chunk_size:]
+    if pending:
+        yield to_frame(pending)
+
+
+class ChainDataset:
+    def __init__(self, root: Path | str = ROOT_DIR / "chains"):
+        self.root = Path(root)
+
+    def append(self, ticker: str, stage: str, chunk: pd.DataFrame) -> str:
+        """
+        Store a chunk as the next part of the ticker's stage. Parts are written atomically,
+        one writer per ticker and stage at a time.
+        Returns
+            the part id
+        """
+        stage_dir = self.root / ticker / stage
+        part = f"{len(self.parts(ticker, stage)):06d}"
+        chunk = chunk.reset_index(drop=True)
+
+        def write(tmp_dir):
+            kinds = save_columns(tmp_dir, chunk)
+            meta = {"format_version": FORMAT_VERSION, "ticker": ticker, "rows": len(chunk), "columns": kinds}
+            (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        write_atomically(stage_dir / part, write)
+        instrumentation.count("chain_dataset.rows_written", len(chunk))
+        return part
+
+    def tickers(self, stage: str = SOLVED) -> list[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir() and self.parts(path.name, stage))
+
+    def parts(self, ticker: str, stage: str = SOLVED) -> list[str]:
+        stage_dir = self.root / ticker / stage
+        if not stage_dir.is_dir():
+            return []
+        return sorted(path.name for path in stage_dir.iterdir() if path.is_dir() and not path.name.startswith("."))
+
+    def rows(self, ticker: str, stage: str = SOLVED) -> int:
+        return sum(self._meta(ticker, stage, part)["rows"] for part in self.parts(ticker, stage))
+
+    def chunks(self, ticker: str, stage: str = SOLVED, columns: list[str] | None = None, mmap_mode: str | None = "r") -> Iterator[pd.DataFrame]:
+        """
+        The parts one at a time, with only `columns` read (all if None). Numeric columns stay memory-mapped.
+        """
+        for part in self.parts(ticker, stage):
+            meta = self._meta(ticker, stage, part)
+            names = list(meta["columns"]) if columns is None else columns
+            missing = [name for name in names if name not in meta["columns"]]
+            if missing:
+                raise KeyError(f"Columns {missing} are not stored for {ticker} ({stage})")
+            frame = {}
+            for name in names:
+                values = np.load(self.root / ticker / stage / part / f"{name}.npy", mmap_mode=mmap_mode)
+                frame[name] = values.astype(object) if meta["columns"][name] == "str" else values
+            instrumentation.count("chain_dataset.rows_read", meta["rows"])
+            yield pd.DataFrame(frame, index=pd.RangeIndex(meta["rows"]))
+
+    def read(self, ticker: str, stage: str = SOLVED, columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Every part stacked, e.g. read("AAPL", columns=SURFACE_COLUMNS) for a surface
+        """
+        frames = list(self.chunks(ticker, stage, columns))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns or [])
+
+    def chains(self, tickers: list[str] | None = None, columns: list[str] | None = None) -> Mapping[str, pd.DataFrame]:
+        """
+        Solved chains per ticker, each read only when it is looked up - e.g. for `build_surfaces`
+        """
+        return _StoredChains(self, self.tickers() if tickers is None else list(tickers), columns)
+
+    def clear(self, ticker: str, stage: str | None = None):
+        """
+        Remove a stage of the ticker, or all of it
+        """
+        shutil.rmtree(self.root / ticker if stage is None else self.root / ticker / stage, ignore_errors=True)
+
+    def _meta(self, ticker: str, stage: str, part: str) -> dict:
+        meta = json.loads((self.root / ticker / stage / part / "meta.json").read_text())
+        if meta["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Part {part} of {ticker} ({stage}) has format version {meta['format_version']}, this build reads up to {FORMAT_VERSION}")
+        return meta
+
+
+class _StoredChains(Mapping):
+    def __init__(self, dataset: ChainDataset, tickers: list[str], columns: list[str] | None):
+        self.dataset, self.tickers, self.columns = dataset, tickers, columns
+
+    def __getitem__(self, ticker: str) -> pd.DataFrame:
+        if ticker not in self.tickers:
+            raise KeyError(ticker)
+        return self.dataset.read(ticker, SOLVED, self.columns)
+
+    def __iter__(self):
+        return iter(self.tickers)
+
+    def __len__(self):
+        return len(self.tickers)
+
+
+_DONE = object()
+
+
+def write_behind(dataset: ChainDataset, ticker: str, stage: str, chunks: Iterable[pd.DataFrame], max_pending: int = MAX_PENDING) -> int:
+    """
+    Append chunks to the dataset from a writer thread while the caller's thread keeps producing them
+    (fetching pages, solving IVs). At most max_pending chunks wait for the writer - the producer blocks
+    on the bounded queue until the writer catches up. A failed write is raised in the caller.
+    Returns
+        the number of rows written
+    """
+    pending = queue.Queue(maxsize=max_pending)
+    errors = []
+    written = 0
+
+    def writer():
+        nonlocal written
+        while (chunk := pending.get()) is not _DONE:
+            if errors:
+                continue # keep draining so the producer never blocks on a dead writer
+            try:
+                dataset.append(ticker, stage, chunk)
+                written += len(chunk)
+            except BaseException as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=writer, name=f"chain-writer-{ticker}", daemon=True)
+    thread.start()
+    try:
+        for chunk in chunks:
+            if errors:
+                break
+            if pending.full():
+                instrumentation.count("chain_dataset.backpressure_waits")
+            pending.put(chunk)
+    finally:
+        pending.put(_DONE)
+        thread.join()
+    if errors:
+        raise errors[0]
+    return written
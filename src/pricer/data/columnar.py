@@ -0,0 +1,39 @@
+"""
+Columnar on-disk tables shared by `HistoryStore` and `ChainDataset`: one `.npy` per column (memory-mappable,
+so readers open only the columns they need) in a directory that is written under a hidden temporary name
+and renamed into place, so readers never see a half written table.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def save_columns(directory: Path, chain: pd.DataFrame) -> dict[str, str]:
+    """
+    One .npy per column, returns the kind of each column ("str" columns are stored fixed width)
+    """
+    kinds = {}
+    for name in chain.columns:
+        values = chain[name].to_numpy()
+        if values.dtype == object:
+            values = chain[name].astype(str).to_numpy(dtype=str)
+            kinds[name] = "str"
+        else:
+            kinds[name] = values.dtype.str
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(values))
+    return kinds
+
+
+def write_atomically(target: Path, write):
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=target.parent))
+    try:
+        write(tmp_dir)
+        os.replace(tmp_dir, target)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
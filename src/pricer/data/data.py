@@ -1,39 +1,88 @@
 import collections
+import logging
 import os
-import traceback
 from datetime import datetime, timedelta
+from typing import Iterator
 
 import numpy as np
 import pandas as pd
-import requests
-from alpaca.data.historical import StockHistoricalDataClient
-from alpaca.data.requests import StockLatestTradeRequest
-from alpaca.trading.client import TradingClient
-from alpaca.trading.enums import AssetStatus, ContractType
-from alpaca.trading.requests import GetOptionContractsRequest
 
+from pricer._lazy import lazy_attribute, lazy_import
+from pricer.data.cache import TTLCache
+from pricer.data.chain_dataset import CHUNK_SIZE, MAX_PENDING, RAW, SOLVED, ChainDataset, rechunk, write_behind
+from pricer.instrumentation import instrumentation
 from pricer.model.black_scholes_model import BlackScholesModel
 from pricer.model.contract_model import ContractModel
+from pricer.model.forward_curve import PARITY_BAND, implied_forward_curve, rates_for_maturities
+from pricer.model.implied_volatility import MAX_MONEYNESS, MIN_MONEYNESS, TIME_CAP, IVResult, implied_volatility_batch, merge_summaries, solver_summary
 
 # https://github.com/alpacahq/alpaca-py/blob/master/examples/options/README.md
 # https://alpaca.markets/sdks/python/api_reference/trading/requests.html#getoptioncontractsrequest
 # https://alpaca.markets/sdks/python/api_reference/trading/models.html#optioncontract
 # https://docs.alpaca.markets/reference/corporateactions-1
 
+logger = logging.getLogger(__name__)
+
+# The Alpaca SDK takes over half a second to import, it is only loaded once a client or request is built
+requests = lazy_import("requests")
+StockHistoricalDataClient = lazy_attribute("alpaca.data.historical", "StockHistoricalDataClient")
+StockLatestTradeRequest = lazy_attribute("alpaca.data.requests", "StockLatestTradeRequest")
+TradingClient = lazy_attribute("alpaca.trading.client", "TradingClient")
+AssetStatus = lazy_attribute("alpaca.trading.enums", "AssetStatus")
+ContractType = lazy_attribute("alpaca.trading.enums", "ContractType")
+GetOptionContractsRequest = lazy_attribute("alpaca.trading.requests", "GetOptionContractsRequest")
+
+DIVIDEND_TTL = timedelta(days=1)
+SPOT_TTL = timedelta(seconds=15)
+UNFILTERED_TTL = timedelta(days=1) # listings change slowly, the unfiltered chain size is counted once a day
+RISK_FREE_RATE = 0.035 # used for expiries no forward could be implied for
+
 class Data:
-    def __init__(self):
+    def __init__(self, dividend_cache: TTLCache | None = None, spot_cache: TTLCache | None = None, unfiltered_cache: TTLCache | None = None):
+        """
+        Args
+            dividend_cache - trailing dividends per symbol, pass a shared one to reuse lookups across instances
+            spot_cache - latest trade price per symbol, likewise
+            unfiltered_cache - contracts an unfiltered fetch downloads per (symbol, limit), likewise
+        """
         self.api_key = os.environ.get('ALPACA_ID')
         self.secret_key = os.environ.get('ALPACA_KEY')
         self.trade_client = TradingClient(api_key=self.api_key, secret_key=self.secret_key, paper=True, url_override=None)
         self.stock_client = StockHistoricalDataClient(self.api_key, self.secret_key)
 
+        self.dividend_cache = dividend_cache if dividend_cache is not None else TTLCache(ttl=DIVIDEND_TTL)
+        self.spot_cache = spot_cache if spot_cache is not None else TTLCache(ttl=SPOT_TTL)
+        self.unfiltered_cache = unfiltered_cache if unfiltered_cache is not None else TTLCache(ttl=UNFILTERED_TTL)
+
         self.contracts_dict = {}
         self.dividend_yield_dict = collections.defaultdict(float)
         self.asset_price_dict = {}
+        self.fetch_stats_dict = {} # per ticker pages and contracts downloaded vs kept
+        self.iv_stats_dict = {} # per ticker summary of why contracts were dropped and what the IV solve cost
+        self.forward_curve_dict = {} # per ticker forwards, r and q implied per expiry by put-call parity
         self.TRADING_DAYS_IN_YEAR = 252
         self.DAYS_IN_YEAR = 365
 
-    def get_underlying_details(self, underlying_symbols: list[str]):
+    def get_underlying_details(self, underlying_symbols: list[str], fetch_dividends: bool = True):
+        """
+        Spot price and trailing 12 month dividend yield per symbol. Both come from caches, only symbols
+        missing from them are requested - in one batch per endpoint.
+        Args
+            fetch_dividends - skip the corporate actions scan when False. `clean_up_df` implies the dividend
+                yield per expiry from the chain itself, the trailing yield is only its fall back.
+        """
+        latest_prices = self.spot_cache.get_many(underlying_symbols, self._fetch_latest_prices)
+        for symbol in underlying_symbols:
+            self.asset_price_dict[symbol] = latest_prices[symbol]
+        if fetch_dividends:
+            dividends = self.dividend_cache.get_many(underlying_symbols, self._fetch_trailing_dividends)
+            for symbol in underlying_symbols:
+                self.dividend_yield_dict[symbol] = dividends[symbol] / self.asset_price_dict[symbol]
+
+    def _fetch_trailing_dividends(self, underlying_symbols: list[str]) -> dict[str, float]:
+        """
+        Sum of cash dividends paid per share over the last year
+        """
         corp_act_url = "https://data.alpaca.markets/v1/corporate-actions"
         headers = {
             "accept": "application/json",
@@ -46,88 +95,276 @@ class Data:
             "start": (datetime.now() - timedelta(days=365)).date(),
             "limit": 1000
         }
+        dividends = collections.defaultdict(float)
         next_page = True
         while next_page:
-            corp_act_resp = requests.get(corp_act_url, headers=headers, params=params).json()
+            with instrumentation.timer("data.corporate_actions_page"):
+                corp_act_resp = requests.get(corp_act_url, headers=headers, params=params).json()
+            instrumentation.count("data.corporate_actions_pages")
             for cash_dividend in corp_act_resp["corporate_actions"].get("cash_dividends", []):
-                self.dividend_yield_dict[cash_dividend["symbol"]] += cash_dividend["rate"]
+                dividends[cash_dividend["symbol"]] += cash_dividend["rate"]
             if corp_act_resp["next_page_token"]:
                 params["page_token"] = corp_act_resp["next_page_token"]
             else:
                 next_page = False
-        request_params = StockLatestTradeRequest(symbol_or_symbols=underlying_symbols)
-        latest_trades = self.stock_client.get_stock_latest_trade(request_params)
-        for symbol in underlying_symbols:
-            self.asset_price_dict[symbol] = latest_trades[symbol].price
-            self.dividend_yield_dict[symbol] = self.dividend_yield_dict[symbol] / self.asset_price_dict[symbol]
+        return {symbol: dividends[symbol] for symbol in underlying_symbols}
 
+    def _fetch_latest_prices(self, underlying_symbols: list[str]) -> dict[str, float]:
+        request_params = StockLatestTradeRequest(symbol_or_symbols=underlying_symbols)
+        with instrumentation.timer("data.latest_trade"):
+            latest_trades = self.stock_client.get_stock_latest_trade(request_params)
+        return {symbol: latest_trades[symbol].price for symbol in underlying_symbols}
 
-    def get_active_options_api(self, underlying_symbols: list[str], limit: int = 1000):
+    def get_active_options_api(self, underlying_symbols: list[str], limit: int = 1000, server_side_filters: bool = True, count_avoided: bool = False):
+        """
+        Args
+            underlying_symbols - tickers to pull option chains for, their spot must already be in asset_price_dict
+            limit - rough cap on the number of contracts kept per ticker
+            server_side_filters - ask Alpaca for OTM contracts inside the model's moneyness and expiry range only
+                (one request per side) instead of downloading every active contract and discarding most of them.
+                ITM contracts within PARITY_BAND of spot are kept as well, to pair up for the implied forwards.
+            count_avoided - with server side filters, also report the contracts they saved downloading. That takes
+                an unfiltered fetch that only counts, once per ticker and limit for as long as unfiltered_cache keeps it.
+        """
         for ticker in underlying_symbols:
             all_contracts = []
-            args = {
-                "underlying_symbols": [ticker],
-                "status": AssetStatus.ACTIVE,
-                "expiration_date": None,     
-                "expiration_date_gte": "2025-12-31", 
-                "expiration_date_lte": None, 
-                "root_symbol": None,         
-                "type": None, #ContractType.CALL,   
-                "style": "american",         
-                "strike_price_gte": None,    
-                "strike_price_lte": None,    
-                "limit": 1000,                 
-                "page_token": None,          
-            }
+            stats = {"pages": 0, "contracts_received": 0, "contracts_kept": 0}
+            for args, side_limit in self._option_contract_requests(ticker, limit, server_side_filters):
+                all_contracts.extend(self._fetch_option_contracts(args, self.asset_price_dict[ticker], side_limit, stats))
+            self.fetch_stats_dict[ticker] = self._finish_fetch_stats(ticker, stats, limit, server_side_filters, count_avoided)
+
+            df = pd.DataFrame([ContractModel.from_class(opt) for opt in all_contracts])
+            df = self.clean_up_df(df)
+            self.contracts_dict[ticker] = df
+            df.to_csv(f"{ticker}_options.csv")
+
+    def stream_active_options(self, underlying_symbols: list[str], dataset: ChainDataset, limit: int = 1000, server_side_filters: bool = True,
+                              count_avoided: bool = False, chunk_size: int = CHUNK_SIZE, max_pending: int = MAX_PENDING):
+        """
+        Out-of-core `get_active_options_api`: contracts stream page by page through the filters into the
+        dataset's raw stage, then `solve_stored_chain` cleans them chunk by chunk into the solved stage.
+        Nothing is kept in contracts_dict - read the chains back with `dataset.read` or `dataset.chains`.
+        Args
+            dataset - where the chains are written, a ticker's earlier chain is replaced
+            chunk_size - rows held per chunk, the memory each stage needs is proportional to it
+            max_pending - chunks queued for the disk writer before fetching / solving waits for it
+        """
+        for ticker in underlying_symbols:
+            stats = {"pages": 0, "contracts_received": 0, "contracts_kept": 0}
+            pages = (
+                page
+                for args, side_limit in self._option_contract_requests(ticker, limit, server_side_filters)
+                for page in self._iter_option_contracts(args, self.asset_price_dict[ticker], side_limit, stats)
+            )
+            to_frame = lambda contracts: pd.DataFrame([ContractModel.from_class(opt) for opt in contracts])
+            dataset.clear(ticker)
+            with instrumentation.timer("data.stream_contracts"):
+                write_behind(dataset, ticker, RAW, rechunk(pages, chunk_size, to_frame), max_pending)
+            self.fetch_stats_dict[ticker] = self._finish_fetch_stats(ticker, stats, limit, server_side_filters, count_avoided)
+            self.solve_stored_chain(ticker, dataset, max_pending)
+            dataset.clear(ticker, RAW)
+
+    def solve_stored_chain(self, ticker: str, dataset: ChainDataset, max_pending: int = MAX_PENDING) -> int:
+        """
+        `clean_up_df` for a chain in the dataset's raw stage, one chunk at a time. The forward curve needs
+        every call / put pair of an expiry, so a first pass reads only the near ATM rows of the pricing
+        columns to fit it, the second solves each chunk and writes it to the solved stage.
+        Returns
+            the number of solved contracts
+        """
+        spot = self.asset_price_dict.get(ticker, np.nan)
+        near = []
+        for chunk in dataset.chunks(ticker, RAW, columns=["expiration_date", "strike_price", "close_price", "type"]):
+            chunk = chunk[np.abs(chunk["strike_price"] / spot - 1) <= PARITY_BAND]
+            near.append(self._add_periods(chunk.copy()))
+        rows = pd.concat(near, ignore_index=True) if near else pd.DataFrame(columns=["expiration_date", "period_year", "strike_price", "close_price", "type"])
+        with instrumentation.timer("data.forward_curve"):
+            curve = implied_forward_curve(rows, spot)
+        self.forward_curve_dict[ticker] = curve
+        instrumentation.count("data.forward_expiries", len(curve))
+
+        summary = None
+
+        def solved():
+            nonlocal summary
+            for chunk in dataset.chunks(ticker, RAW, mmap_mode=None):
+                chunk = self._add_periods(chunk)
+                chunk["risk_free_rate"], chunk["dividend_yield"] = self._rates_for(ticker, curve, chunk["period_year"])
+                chunk = self._solve_otm(chunk)
+                chunk_summary = solver_summary(self._iv_result(chunk))
+                summary = chunk_summary if summary is None else merge_summaries(summary, chunk_summary)
+                yield chunk.dropna(subset=["calculated_iv"])
+
+        dataset.clear(ticker, SOLVED)
+        written = write_behind(dataset, ticker, SOLVED, solved(), max_pending)
+        if summary is not None:
+            self.iv_stats_dict[ticker] = summary
+        return written
+
+    def _finish_fetch_stats(self, ticker: str, stats: dict, limit: int, server_side_filters: bool, count_avoided: bool) -> dict:
+        stats["contracts_discarded"] = stats["contracts_received"] - stats["contracts_kept"] # downloaded for nothing
+        if count_avoided:
+            unfiltered = self.unfiltered_cache.get_many([(ticker, limit)], self._count_unfiltered)[(ticker, limit)] if server_side_filters else stats["contracts_received"]
+            stats["contracts_avoided"] = max(unfiltered - stats["contracts_received"], 0) # never downloaded thanks to the filters
+        return stats
+
+    def _count_unfiltered(self, keys: list[tuple[str, int]]) -> dict[tuple[str, int], int]:
+        """
+        Contracts the unfiltered fetch downloads per (ticker, limit), paging through it without keeping anything
+        """
+        counts = {}
+        for ticker, limit in keys:
+            stats = {"pages": 0, "contracts_received": 0, "contracts_kept": 0}
+            for args, side_limit in self._option_contract_requests(ticker, limit, server_side_filters=False):
+                for _ in self._iter_option_contracts(args, self.asset_price_dict[ticker], side_limit, stats):
+                    pass
+            counts[(ticker, limit)] = stats["contracts_received"]
+        return counts
+
+    def _option_contract_requests(self, ticker: str, limit: int, server_side_filters: bool) -> list[tuple[dict, int]]:
+        """
+        Request arguments, each with the number of contracts to stop paging after
+        """
+        args = {
+            "underlying_symbols": [ticker],
+            "status": AssetStatus.ACTIVE,
+            "expiration_date": None,
+            "expiration_date_gte": datetime.now().date(),
+            "expiration_date_lte": None,
+            "root_symbol": None,
+            "type": None,
+            "style": "american",
+            "strike_price_gte": None,
+            "strike_price_lte": None,
+            "limit": 1000,
+            "page_token": None,
+        }
+        if not server_side_filters:
+            return [(args, limit)]
+        # Mirror the filters applied after download (OTM plus the parity band) and by the IV solve (moneyness, TIME_CAP)
+        spot = self.asset_price_dict[ticker]
+        args["expiration_date_gte"] = (datetime.now() + timedelta(days=TIME_CAP)).date()
+        calls = {**args, "type": ContractType.CALL, "strike_price_gte": f"{spot * (1 - PARITY_BAND):.2f}", "strike_price_lte": f"{spot * MAX_MONEYNESS:.2f}"}
+        puts = {**args, "type": ContractType.PUT, "strike_price_gte": f"{spot * MIN_MONEYNESS:.2f}", "strike_price_lte": f"{spot * (1 + PARITY_BAND):.2f}"}
+        side_limit = -(-limit // 2)
+        return [(calls, side_limit), (puts, side_limit)]
+
+    def _fetch_option_contracts(self, args: dict, spot: float, limit: int, stats: dict) -> list:
+        return [contract for page in self._iter_option_contracts(args, spot, limit, stats) for contract in page]
+
+    def _iter_option_contracts(self, args: dict, spot: float, limit: int, stats: dict) -> Iterator[list]:
+        """
+        The filtered contracts of each page, a page is only requested once the previous one was consumed
+        """
+        kept = 0
+        while True:
             req = GetOptionContractsRequest(**args)
-            res = self.trade_client.get_option_contracts(req)
+            with instrumentation.timer("data.option_contracts_page"):
+                res = self.trade_client.get_option_contracts(req)
             ls = [a for a in res.option_contracts if 
                     int(a.size) == 100 
                     and a.close_price is not None 
                     and a.open_interest is not None
                     and (
-                        (a.strike_price > self.asset_price_dict[ticker] and a.type == ContractType.CALL) # we only want OTM options
-                        or (a.strike_price < self.asset_price_dict[ticker] and a.type == ContractType.PUT)
+                        (a.strike_price > spot and a.type == ContractType.CALL) # we only want OTM options
+                        or (a.strike_price < spot and a.type == ContractType.PUT)
+                        or abs(a.strike_price / spot - 1) <= PARITY_BAND # and near ATM ITM ones to pair up for put-call parity
                         )
                     and float(a.close_price) > 0.05 # filter out worthless options - assumption is that they are not realistic
                 ]
-            all_contracts.extend(ls)
-            while res.next_page_token:
-                args["page_token"] = res.next_page_token
-                req = GetOptionContractsRequest(**args)
-                res = self.trade_client.get_option_contracts(req)
-                ls = [a for a in res.option_contracts if 
-                        int(a.size) == 100 
-                        and a.close_price is not None 
-                        and a.open_interest is not None
-                        and (
-                            (a.strike_price > self.asset_price_dict[ticker] and a.type == ContractType.CALL) # we only want OTM options
-                            or (a.strike_price < self.asset_price_dict[ticker] and a.type == ContractType.PUT)
-                        )
-                        and float(a.close_price) > 0.05 # filter out worthless options - assumption is that they are not realistic
-                    ]
-                all_contracts.extend(ls)
-                if len(all_contracts) > limit:
-                    break
-            
-            df = pd.DataFrame([ContractModel.from_class(opt) for opt in all_contracts])
-            df = self.clean_up_df(df)
-            self.contracts_dict[ticker] = df
-            df.to_csv(f"{ticker}_options.csv")
+            self._count_page(res.option_contracts, ls)
+            stats["pages"] += 1
+            stats["contracts_received"] += len(res.option_contracts)
+            stats["contracts_kept"] += len(ls)
+            kept += len(ls)
+            yield ls
+            if not res.next_page_token or kept > limit:
+                return
+            args = {**args, "page_token": res.next_page_token}
+
+    def _count_page(self, received: list, kept: list):
+        instrumentation.count("data.api_pages")
+        instrumentation.count("data.contracts_received", len(received))
+        instrumentation.count("data.contracts_filtered", len(received) - len(kept))
 
     def get_active_contracts_csv(self, underlying_symbols: list[str]):
         for ticker in underlying_symbols:
             self.contracts_dict[ticker] = pd.read_csv(f"./{ticker}_options.csv")
 
     def clean_up_df(self, df: pd.DataFrame):
+        df = self._add_periods(df)
+        with instrumentation.timer("data.forward_curve"):
+            df = self._apply_forward_curve(df)
+        df = self._solve_otm(df)
+        for ticker, idx in df.groupby("underlying_symbol").indices.items():
+            self.iv_stats_dict[ticker] = solver_summary(self._iv_result(df.iloc[idx]))
+        return df.dropna(subset=["calculated_iv"])
+
+    def _add_periods(self, df: pd.DataFrame) -> pd.DataFrame:
         df["expiration_date"] = pd.to_datetime(df["expiration_date"]).dt.normalize()
         df["days_to_expiry"] = (df["expiration_date"] - pd.Timestamp.now().normalize()).dt.days
         df["period_year"] = df["days_to_expiry"] / self.DAYS_IN_YEAR
-        df["calculated_iv"] = df.apply(lambda row: self._calculate_iv(row), axis=1)
-        df = df.dropna(subset=["calculated_iv"])
+        return df
 
+    def _solve_otm(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Drops the ITM contracts and solves the IV of the rest, keeping the rows that failed with a NaN IV
+        """
+        # The ITM contracts were only there for the parity fit, the surface is built from OTM ones
+        spot = df["underlying_symbol"].map(self.asset_price_dict)
+        in_the_money = ((df["type"] == "call") & (df["strike_price"] <= spot)) | ((df["type"] == "put") & (df["strike_price"] >= spot))
+        df = df[~in_the_money].reset_index(drop=True)
+        with instrumentation.timer("data.iv_solve"):
+            result = self._calculate_iv_batch(df, df["risk_free_rate"].to_numpy(dtype=float), df["dividend_yield"].to_numpy(dtype=float))
+        df["calculated_iv"] = result.iv
+        df["iv_status"] = result.status
+        df["iv_iterations"] = result.iterations
+        instrumentation.count("data.iv_contracts", len(df))
+        instrumentation.count("data.iv_dropped", int(np.isnan(result.iv).sum()))
         return df
 
+    @staticmethod
+    def _iv_result(df: pd.DataFrame) -> IVResult:
+        return IVResult(df["calculated_iv"].to_numpy(), df["iv_status"].to_numpy(), df["iv_iterations"].to_numpy())
+
+    def _apply_forward_curve(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fits each ticker's forward curve and adds the per contract risk_free_rate and dividend_yield columns,
+        falling back to RISK_FREE_RATE and the trailing dividend yield where no forward could be implied
+        """
+        df["risk_free_rate"] = RISK_FREE_RATE
+        df["dividend_yield"] = 0.0
+        for ticker, idx in df.groupby("underlying_symbol").indices.items():
+            rows = df.iloc[idx]
+            curve = implied_forward_curve(rows, self.asset_price_dict.get(ticker, np.nan)) # no pairs without a spot
+            self.forward_curve_dict[ticker] = curve
+            instrumentation.count("data.forward_expiries", len(curve))
+            r, q = self._rates_for(ticker, curve, rows["period_year"])
+            df.iloc[idx, df.columns.get_loc("risk_free_rate")] = r
+            df.iloc[idx, df.columns.get_loc("dividend_yield")] = q
+        return df
+
+    def _rates_for(self, ticker: str, curve: pd.DataFrame, period_year) -> tuple[np.ndarray, np.ndarray]:
+        return rates_for_maturities(curve, period_year, RISK_FREE_RATE, self.dividend_yield_dict.get(ticker, 0.0))
+
+    def _calculate_iv_batch(self, df: pd.DataFrame, risk_free_rate=RISK_FREE_RATE, dividend_yield=None, sigma_guess: float = 0.1) -> IVResult:
+        """
+        Args
+            risk_free_rate, dividend_yield - scalars or one value per row, the dividend yield defaults to dividend_yield_dict
+        """
+        if dividend_yield is None:
+            dividend_yield = df["underlying_symbol"].map(self.dividend_yield_dict).to_numpy(dtype=float)
+        return implied_volatility_batch(
+            S=df["underlying_symbol"].map(self.asset_price_dict).to_numpy(dtype=float),
+            d=dividend_yield,
+            opt_px=df["close_price"].to_numpy(dtype=float),
+            K=df["strike_price"].to_numpy(dtype=float),
+            T=df["period_year"].to_numpy(dtype=float),
+            r=risk_free_rate,
+            typ=df["type"].to_numpy(),
+            sigma_guess=sigma_guess
+        )
+
     def _calculate_iv(self, row, risk_free_rate: float = 0.035, sigma_guess: float = 0.1):
         try:
             asset_price = self.asset_price_dict[row["underlying_symbol"]]
@@ -143,8 +380,8 @@ class Data:
                 sigma=sigma_guess
             )
             return black_scholes_model.implied_volatility()
-        except:
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Failed to calculate IV for %s", row.get("symbol", row["underlying_symbol"]))
             return np.nan
 
 
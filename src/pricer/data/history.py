@@ -0,0 +1,309 @@
+"""
+Append-only history of cleaned option chains and fitted surfaces, for ATM vol, skew and term structure over time.
+
+Every append writes one snapshot, a directory of per column `.npy` files (columnar and memory-mappable,
+so a query reads only the columns it asks for) in a partition per ticker and trading date:
+
+    <root>/<TICKER>/index.csv                                 one row of summary metrics per snapshot
+    <root>/<TICKER>/<YYYY-MM-DD>/<batch>/meta.json
+                                         <column>.npy         one per chain column
+                                         grid_<name>.npy      the surface grids, when given
+    <root>/<TICKER>/<YYYY-MM-DD>/compacted/...                every snapshot of the day, after `compact`
+
+The index holds the metrics computed at append time (spot, ATM IV at fixed tenors, skew), so time series
+such as the 30 day ATM IV of every day over a year come from one small file without opening a chain.
+Chain reads are pruned by the date in the partition name. Snapshots are written to a hidden temporary
+directory and renamed into place, like `SurfaceStore`, and are never modified afterwards - only
+`compact` rewrites old partitions, merging their snapshots into one.
+"""
+import json
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from pricer import ROOT_DIR
+from pricer.data.columnar import save_columns, write_atomically
+from pricer.instrumentation import instrumentation
+
+FORMAT_VERSION = 1
+COMPACTED = "compacted"
+BATCH_COLUMN = "_batch"        # batch id per row of a compacted partition
+NEW_COMPACTED = f".{COMPACTED}.new"   # merged partition waiting to be swapped in
+OLD_COMPACTED = f".{COMPACTED}.old"   # replaced partition waiting to be removed
+TENORS = (30, 90, 180, 365)    # days, ATM IV is indexed at each
+SKEW_TENOR = 30
+SKEW_MONEYNESS = (0.9, 1.1)    # skew is IV at 90% of spot minus IV at 110%
+INDEX_COLUMNS = ["date", "batch", "timestamp", "spot", "contracts", *[f"atm_iv_{tenor}d" for tenor in TENORS], f"skew_{SKEW_TENOR}d"]
+
+
+def _iv_at(chain: pd.DataFrame, strike: float, tenor_days: float) -> float:
+    """
+    IV at one strike and tenor - linear in strike within each expiry, then linear in total variance
+    across expiries. NaN outside the quoted strikes or expiries.
+    """
+    maturities, variances = [], []
+    for days, rows in chain.groupby("days_to_expiry"):
+        rows = rows.sort_values("strike_price")
+        strikes, ivs = rows["strike_price"].to_numpy(dtype=float), rows["calculated_iv"].to_numpy(dtype=float)
+        if days <= 0 or len(strikes) < 2 or not strikes[0] <= strike <= strikes[-1]:
+            continue
+        maturities.append(days)
+        variances.append(np.interp(strike, strikes, ivs) ** 2 * days)
+    if not maturities or not maturities[0] <= tenor_days <= maturities[-1]:
+        return np.nan
+    return float(np.sqrt(np.interp(tenor_days, maturities, variances) / tenor_days))
+
+
+def summary_metrics(chain: pd.DataFrame, spot: float) -> dict[str, float]:
+    """
+    What the index stores per snapshot
+    """
+    chain = chain.dropna(subset=["calculated_iv"])
+    metrics = {"spot": float(spot), "contracts": len(chain)}
+    for tenor in TENORS:
+        metrics[f"atm_iv_{tenor}d"] = _iv_at(chain, spot, tenor)
+    low, high = SKEW_MONEYNESS
+    metrics[f"skew_{SKEW_TENOR}d"] = _iv_at(chain, low * spot, SKEW_TENOR) - _iv_at(chain, high * spot, SKEW_TENOR)
+    return metrics
+
+
+class HistoryStore:
+    def __init__(self, root: Path | str = ROOT_DIR / "history"):
+        self.root = Path(root)
+        self._index_locks: dict[str, threading.Lock] = {} # one store serves every session of the app
+        self._locks_lock = threading.Lock()
+
+    @instrumentation.timed("history.append")
+    def append(self, ticker: str, chain: pd.DataFrame, spot: float, grids: dict[str, np.ndarray] | None = None, timestamp: datetime | None = None) -> str:
+        """
+        Args
+            chain - cleaned chain, with days_to_expiry, strike_price and calculated_iv for the summary metrics
+            spot - underlying price the chain was solved against
+            grids - e.g. maturities, strike_prices, implied_vol from `create_volatility_surface`
+        Returns
+            the batch id of the snapshot
+        """
+        timestamp = timestamp or datetime.now()
+        partition = self.root / ticker / timestamp.date().isoformat()
+        batch = timestamp.strftime("%Y%m%dT%H%M%S%f")
+        while (partition / batch).exists(): # two appends within the same microsecond
+            batch += "_"
+        metrics = summary_metrics(chain, spot)
+
+        def write(tmp_dir):
+            kinds = save_columns(tmp_dir, chain.reset_index(drop=True))
+            for name, grid in (grids or {}).items():
+                np.save(tmp_dir / f"grid_{name}.npy", np.ascontiguousarray(grid, dtype=np.float64))
+            meta = {
+                "format_version": FORMAT_VERSION,
+                "ticker": ticker,
+                "timestamp": timestamp.isoformat(),
+                "rows": len(chain),
+                "columns": kinds,
+                "grids": sorted(grids or {}),
+            }
+            (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+        write_atomically(partition / batch, write)
+        # The index row goes last, a snapshot is only visible to queries once it is complete
+        row = {"date": timestamp.date().isoformat(), "batch": batch, "timestamp": timestamp.isoformat(), **metrics}
+        index_path = self.root / ticker / "index.csv"
+        with self._index_lock(ticker): # appends to one index must neither interleave nor both write the header
+            pd.DataFrame([row], columns=INDEX_COLUMNS).to_csv(index_path, mode="a", header=not index_path.exists(), index=False)
+        instrumentation.count("history.rows_appended", len(chain))
+        return batch
+
+    def partitions(self, ticker: str, start: date | None = None, end: date | None = None) -> list[date]:
+        """
+        Dates with stored snapshots, between start and end inclusive
+        """
+        ticker_dir = self.root / ticker
+        if not ticker_dir.is_dir():
+            return []
+        days = []
+        for path in ticker_dir.iterdir():
+            if not path.is_dir() or path.name.startswith("."):
+                continue
+            day = date.fromisoformat(path.name)
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+        return sorted(days)
+
+    def snapshots(self, ticker: str, start: date | None = None, end: date | None = None) -> pd.DataFrame:
+        """
+        The index rows between start and end inclusive, oldest first
+        """
+        index_path = self.root / ticker / "index.csv"
+        if not index_path.exists():
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+        index = pd.read_csv(index_path, dtype={"batch": str}, parse_dates=["timestamp"])
+        index["date"] = pd.to_datetime(index["date"]).dt.date
+        if start is not None:
+            index = index[index["date"] >= start]
+        if end is not None:
+            index = index[index["date"] <= end]
+        return index.sort_values("timestamp").reset_index(drop=True)
+
+    def daily(self, ticker: str, metric: str, start: date | None = None, end: date | None = None) -> pd.Series:
+        """
+        One value of an index metric per day, from the day's last snapshot, e.g. daily("AAPL", "atm_iv_30d")
+        """
+        index = self.snapshots(ticker, start, end)
+        if metric not in INDEX_COLUMNS:
+            raise KeyError(f"Unknown metric {metric!r}, the index has {INDEX_COLUMNS}")
+        return index.groupby("date")[metric].last()
+
+    def read_chain(self, ticker: str, day: date, batch: str | None = None, columns: list[str] | None = None, mmap_mode: str | None = "r") -> pd.DataFrame:
+        """
+        Args
+            day - partition date
+            batch - a batch id from the index, defaults to the day's last snapshot
+            columns - only these columns are read, all if None
+        """
+        batch_dir, meta, rows = self._locate(ticker, day, batch)
+        names = list(meta["columns"]) if columns is None else columns
+        missing = [name for name in names if name not in meta["columns"]]
+        if missing:
+            raise KeyError(f"Columns {missing} are not stored for {ticker} on {day}")
+        frame = {}
+        for name in names:
+            values = np.load(batch_dir / f"{name}.npy", mmap_mode=mmap_mode)
+            values = values if rows is None else values[rows]
+            frame[name] = values.astype(object) if meta["columns"][name] == "str" else values
+        instrumentation.count("history.rows_read", len(next(iter(frame.values()))) if frame else 0)
+        return pd.DataFrame(frame)
+
+    def read_grids(self, ticker: str, day: date, batch: str | None = None) -> dict[str, np.ndarray]:
+        """
+        Surface grids stored with a snapshot, empty if there were none. A compacted partition keeps
+        only the grids of the day's last snapshot.
+        """
+        batch_dir, meta, _ = self._locate(ticker, day, batch)
+        if batch is not None and meta.get("grids_batch", batch) != batch:
+            return {}
+        return {name: np.load(batch_dir / f"grid_{name}.npy", mmap_mode="r") for name in meta["grids"]}
+
+    def scan(self, ticker: str, start: date | None = None, end: date | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+        """
+        Every snapshot between start and end inclusive, stacked, with the batch id of each row in `batch`.
+        Only the partitions inside the range are opened and only `columns` are read.
+        """
+        frames = []
+        for day in self.partitions(ticker, start, end):
+            for batch in self._batches(ticker, day):
+                frames.append(self.read_chain(ticker, day, batch, columns).assign(batch=batch))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=[*(columns or []), "batch"])
+
+    @instrumentation.timed("history.compact")
+    def compact(self, ticker: str, before: date) -> int:
+        """
+        Merge the snapshots of every partition dated before `before` into one, keeping all chain rows
+        but only the surface grids of each day's last snapshot. The index is unchanged - its batch ids
+        still select their rows from the compacted partition.
+        Returns
+            the number of partitions compacted
+        """
+        compacted = 0
+        for day in self.partitions(ticker, end=before):
+            if day >= before:
+                continue
+            partition = self.root / ticker / day.isoformat()
+            self._recover_compaction(partition)
+            batches = [p.name for p in sorted(partition.iterdir()) if p.is_dir() and not p.name.startswith(".") and p.name != COMPACTED]
+            if not batches:
+                continue
+            chains = [self.read_chain(ticker, day, batch, mmap_mode=None).assign(**{BATCH_COLUMN: batch}) for batch in self._batches(ticker, day)]
+            last = self._batches(ticker, day)[-1]
+            grids = {name: np.array(grid) for name, grid in self.read_grids(ticker, day, last).items()}
+            merged = pd.concat(chains, ignore_index=True)
+
+            def write(tmp_dir):
+                kinds = save_columns(tmp_dir, merged)
+                for name, grid in grids.items():
+                    np.save(tmp_dir / f"grid_{name}.npy", grid)
+                kinds.pop(BATCH_COLUMN)
+                meta = {
+                    "format_version": FORMAT_VERSION,
+                    "ticker": ticker,
+                    "rows": len(merged),
+                    "columns": kinds,
+                    "batches": sorted(set(merged[BATCH_COLUMN])),
+                    "grids": sorted(grids),
+                    "grids_batch": last,
+                }
+                (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+            # Every step leaves a state `_recover_compaction` can finish from, so a crash never loses rows:
+            # the merged partition is complete before the old one is moved aside, and the old one and the
+            # snapshots are only removed once the merged one is in place
+            write_atomically(partition / NEW_COMPACTED, write)
+            if (partition / COMPACTED).is_dir():
+                os.replace(partition / COMPACTED, partition / OLD_COMPACTED)
+            os.replace(partition / NEW_COMPACTED, partition / COMPACTED)
+            shutil.rmtree(partition / OLD_COMPACTED, ignore_errors=True)
+            for batch in batches:
+                shutil.rmtree(partition / batch)
+            compacted += 1
+        return compacted
+
+    @staticmethod
+    def _recover_compaction(partition: Path):
+        """
+        Finish or roll back a compaction that was interrupted. A merged partition left in NEW_COMPACTED
+        is complete (it is renamed there once written) and holds every row of the old one, so it is
+        moved into place if nothing is there yet, and only discarded if the old one was never moved aside.
+        """
+        current, new, old = partition / COMPACTED, partition / NEW_COMPACTED, partition / OLD_COMPACTED
+        if not current.is_dir():
+            if new.is_dir():
+                os.replace(new, current)
+            elif old.is_dir():
+                os.replace(old, current)
+        shutil.rmtree(new, ignore_errors=True)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def _index_lock(self, ticker: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._index_locks.setdefault(ticker, threading.Lock())
+
+    def _batches(self, ticker: str, day: date) -> list[str]:
+        partition = self.root / ticker / day.isoformat()
+        if not partition.is_dir():
+            return []
+        batches = set()
+        for path in partition.iterdir():
+            if not path.is_dir() or path.name.startswith("."):
+                continue
+            if path.name == COMPACTED:
+                batches.update(json.loads((path / "meta.json").read_text())["batches"])
+            else:
+                batches.add(path.name)
+        return sorted(batches)
+
+    def _locate(self, ticker: str, day: date, batch: str | None) -> tuple[Path, dict, np.ndarray | None]:
+        """
+        Directory and meta of the snapshot, with the rows that belong to it if the partition was compacted
+        """
+        if batch is None:
+            batches = self._batches(ticker, day)
+            if not batches:
+                raise FileNotFoundError(f"No history stored for {ticker} on {day} under {self.root}")
+            batch = batches[-1]
+        partition = self.root / ticker / day.isoformat()
+        batch_dir = partition / batch
+        if batch_dir.is_dir():
+            rows = None
+        else:
+            batch_dir = partition / COMPACTED
+            if not batch_dir.is_dir():
+                raise FileNotFoundError(f"No snapshot {batch} stored for {ticker} on {day} under {self.root}")
+            rows = np.flatnonzero(np.load(batch_dir / f"{BATCH_COLUMN}.npy") == batch)
+        meta = json.loads((batch_dir / "meta.json").read_text())
+        if meta["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Snapshot {batch_dir} has format version {meta['format_version']}, this build reads up to {FORMAT_VERSION}")
+        return batch_dir, meta, rows
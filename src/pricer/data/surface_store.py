@@ -0,0 +1,117 @@
+"""
+Versioned on-disk snapshots of IV / LV surfaces.
+
+Each snapshot is a directory of raw `.npy` grids plus a `meta.json` header:
+
+    <root>/<TICKER>/<version>/meta.json
+                              maturities.npy
+                              strike_prices.npy
+                              implied_vol.npy
+                              local_vol.npy        (only if the LV surface was built)
+
+`.npy` files can be memory-mapped, so loading is O(1) and every process that maps the same snapshot
+shares one copy of the grids through the OS page cache. Snapshots are written to a hidden temporary
+directory and renamed into place, readers never see a half written snapshot.
+"""
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from pricer import ROOT_DIR
+
+FORMAT_VERSION = 1
+GRIDS = ("maturities", "strike_prices", "implied_vol", "local_vol")
+
+
+@dataclass
+class SurfaceSnapshot:
+    ticker: str
+    spot: float
+    r: float
+    q: float
+    timestamp: datetime
+    maturities: np.ndarray         # days, maturities change within a row
+    strike_prices: np.ndarray      # strike prices change within a column
+    implied_vol: np.ndarray
+    local_vol: np.ndarray | None = None
+    version: str | None = None     # assigned by the store
+
+
+class SurfaceStore:
+    def __init__(self, root: Path | str = ROOT_DIR / "surfaces"):
+        self.root = Path(root)
+
+    def save(self, snapshot: SurfaceSnapshot) -> str:
+        """
+        Returns the version the snapshot was stored under
+        """
+        ticker_dir = self.root / snapshot.ticker
+        ticker_dir.mkdir(parents=True, exist_ok=True)
+        version = snapshot.timestamp.strftime("%Y%m%dT%H%M%S%f")
+        while (ticker_dir / version).exists(): # two saves within the same microsecond
+            version += "_"
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{version}.", dir=ticker_dir))
+        try:
+            for name in GRIDS:
+                grid = getattr(snapshot, name)
+                if grid is not None:
+                    np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(grid, dtype=np.float64))
+            meta = {
+                "format_version": FORMAT_VERSION,
+                "ticker": snapshot.ticker,
+                "spot": float(snapshot.spot),
+                "r": float(snapshot.r),
+                "q": float(snapshot.q),
+                "timestamp": snapshot.timestamp.isoformat(),
+                "shape": list(np.shape(snapshot.implied_vol)),
+                "grids": [name for name in GRIDS if getattr(snapshot, name) is not None],
+            }
+            (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+            os.replace(tmp_dir, ticker_dir / version)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        snapshot.version = version
+        return version
+
+    def versions(self, ticker: str) -> list[str]:
+        ticker_dir = self.root / ticker
+        if not ticker_dir.is_dir():
+            return []
+        return sorted(p.name for p in ticker_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def load(self, ticker: str, version: str | None = None, mmap_mode: str | None = "r") -> SurfaceSnapshot:
+        """
+        Args
+            ticker - underlying symbol
+            version - a version from `versions`, defaults to the latest
+            mmap_mode - passed on to np.load, "r" maps the grids read-only without copying; None reads them into memory
+        """
+        if version is None:
+            versions = self.versions(ticker)
+            if not versions:
+                raise FileNotFoundError(f"No surface snapshots stored for {ticker} under {self.root}")
+            version = versions[-1]
+        snapshot_dir = self.root / ticker / version
+        meta = json.loads((snapshot_dir / "meta.json").read_text())
+        if meta["format_version"] > FORMAT_VERSION:
+            raise ValueError(f"Snapshot {snapshot_dir} has format version {meta['format_version']}, this build reads up to {FORMAT_VERSION}")
+        grids = {name: np.load(snapshot_dir / f"{name}.npy", mmap_mode=mmap_mode) for name in meta["grids"]}
+        return SurfaceSnapshot(
+            ticker=meta["ticker"],
+            spot=meta["spot"],
+            r=meta["r"],
+            q=meta["q"],
+            timestamp=datetime.fromisoformat(meta["timestamp"]),
+            maturities=grids["maturities"],
+            strike_prices=grids["strike_prices"],
+            implied_vol=grids["implied_vol"],
+            local_vol=grids.get("local_vol"),
+            version=version,
+        )
@@ -0,0 +1,206 @@
+"""
+Lightweight timers and counters for the hot paths (Alpaca paging, IV solving, surface interpolation,
+Dupire, Monte Carlo).
+
+Nothing is recorded until a sink is attached. With no sinks, `timer` hands back a shared no-op context
+manager and `count` returns immediately, so the hooks can stay in the hot paths permanently.
+
+    from pricer.instrumentation import InMemorySink, instrumentation
+
+    sink = InMemorySink()
+    with instrumentation.recording(sink):
+        data.get_active_options_api(["AAPL"])
+    print(sink.summary())
+
+A sink attached with `local=True` only receives what the thread (or asyncio task) that attached it
+records - e.g. one Streamlit session's run, while other sessions go through the same hot paths in
+their own threads.
+"""
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Sink:
+    def record_timing(self, name: str, seconds: float):
+        pass
+
+    def record_count(self, name: str, value: float):
+        pass
+
+
+class LoggingSink(Sink):
+    def __init__(self, level: int = logging.INFO, log: logging.Logger = logger):
+        self.level = level
+        self.log = log
+
+    def record_timing(self, name: str, seconds: float):
+        self.log.log(self.level, "%s took %.4fs", name, seconds)
+
+    def record_count(self, name: str, value: float):
+        self.log.log(self.level, "%s += %s", name, value)
+
+
+class InMemorySink(Sink):
+    """
+    Aggregates timings (calls, total and max seconds) and counter totals per name
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.counters = defaultdict(float)
+
+    def record_timing(self, name: str, seconds: float):
+        with self._lock:
+            self.timings[name].append(seconds)
+
+    def record_count(self, name: str, value: float):
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self) -> list[dict]:
+        with self._lock:
+            rows = [
+                {"name": name, "calls": len(secs), "total_s": sum(secs), "max_s": max(secs)}
+                for name, secs in sorted(self.timings.items())
+            ]
+            rows.extend({"name": name, "count": value} for name, value in sorted(self.counters.items()))
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+
+class StreamlitSink(InMemorySink):
+    """
+    Collects like `InMemorySink` and renders the result into a collapsed expander on the current page
+    """
+    def render(self, label: str = "Stage timings"):
+        import streamlit as st # only the pages have streamlit available
+
+        with self._lock:
+            timings = [
+                {"stage": name, "calls": len(secs), "total (s)": round(sum(secs), 4), "max (s)": round(max(secs), 4)}
+                for name, secs in sorted(self.timings.items())
+            ]
+            counters = [{"counter": name, "value": value} for name, value in sorted(self.counters.items())]
+        with st.expander(label, expanded=False):
+            if timings:
+                st.dataframe(timings, hide_index=True)
+            if counters:
+                st.dataframe(counters, hide_index=True)
+            if not timings and not counters:
+                st.caption("Nothing was recorded - cached results are not re-timed.")
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Timer:
+    def __init__(self, owner: "Instrumentation", name: str):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        for sink in self.owner._active_sinks():
+            sink.record_timing(self.name, elapsed)
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Instrumentation:
+    def __init__(self):
+        self.sinks: list[Sink] = []
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local_sinks = contextvars.ContextVar("local_sinks", default=())
+        self._local_attached: list[Sink] = [] # local sinks of every thread, only to keep `enabled` right
+
+    def add_sink(self, sink: Sink, local: bool = False):
+        """
+        Args
+            local - only record what the calling thread does, not every thread of the process
+        """
+        with self._lock:
+            if local:
+                self._local_sinks.set(self._local_sinks.get() + (sink,))
+                self._local_attached = self._local_attached + [sink]
+            else:
+                self.sinks = self.sinks + [sink] # copy on write so readers never see a half-updated list
+            self.enabled = True
+
+    def remove_sink(self, sink: Sink):
+        """
+        Detach a sink however it was attached. A local sink is detached from the calling thread, and
+        stops counting towards `enabled` even if the thread that attached it is gone.
+        """
+        with self._lock:
+            self.sinks = [s for s in self.sinks if s is not sink]
+            self._local_attached = [s for s in self._local_attached if s is not sink]
+            self._local_sinks.set(tuple(s for s in self._local_sinks.get() if s is not sink))
+            self.enabled = bool(self.sinks or self._local_attached)
+
+    @contextmanager
+    def recording(self, sink: Sink, local: bool = False):
+        self.add_sink(sink, local)
+        try:
+            yield sink
+        finally:
+            self.remove_sink(sink)
+
+    def _active_sinks(self) -> list[Sink]:
+        local = self._local_sinks.get()
+        return self.sinks + list(local) if local else self.sinks
+
+    def timer(self, name: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str | None = None):
+        """
+        Decorator form of `timer`, defaults to the qualified name of the function
+        """
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, value: float = 1):
+        if not self.enabled:
+            return
+        for sink in self._active_sinks():
+            sink.record_count(name, value)
+
+
+instrumentation = Instrumentation()
+timer = instrumentation.timer
+timed = instrumentation.timed
+count = instrumentation.count
@@ -0,0 +1,97 @@
+"""
+Closed form and moment matching prices of discretely monitored Asian options under flat volatility.
+
+The fixings are those of `MonteCarlo`: a close every trading day t_i = i / 252 for i = 1 .. n after the
+start, the asset drifting at r - q, discounted over n / 252 years. Everything is vectorised - strikes,
+path lengths and option types broadcast against each other.
+
+    geometric_asian_price - exact (Kemna & Vorst, 1990, for discrete fixings). ln of the geometric
+        average is normal with mean ln S + (r - q - vol^2 / 2) * mean(t_i) and variance
+        vol^2 * dt * (n + 1)(2n + 1) / (6n)
+    arithmetic_asian_price - the arithmetic average taken to be lognormal with its exact first two
+        moments (Turnbull & Wakeman, 1991; Levy, 1992). Within a basis point or so of the spot at 20-30%
+        vol over a few months, drifting to tens of basis points at high vol and long tenors - a fast path
+        and a sanity check rather than an exact oracle
+
+Under a flat vol the simulated geometric average has the exact distribution above, which makes the
+geometric Asian a control variate for the arithmetic one - see `control_variate`.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from pricer._lazy import lazy_import
+from pricer.model.payoffs import ArithmeticAsian, ControlVariate, GeometricAsian
+
+special = lazy_import("scipy.special")
+
+TRADING_DAYS = 252
+
+
+def _lognormal_option(forward, log_variance, strike, discount, is_call):
+    """
+    Discounted option on a lognormal variable with mean `forward` and ln variance `log_variance`, the put from parity
+    """
+    sd = np.sqrt(log_variance)
+    d1 = (np.log(forward / strike) + log_variance / 2) / sd
+    call = discount * (forward * special.ndtr(d1) - strike * special.ndtr(d1 - sd))
+    return np.where(is_call, call, call - discount * (forward - strike))
+
+
+def geometric_asian_price(spot, strike, path_length, volatility: float, r: float = 0.035, q: float = 0.0, typ="call") -> np.ndarray:
+    """
+    Args
+        spot - asset price at the start of the path
+        strike - strike(s)
+        path_length - trading days to expiry, fixing daily, broadcast against strike
+        volatility, r, q - flat vol, risk free rate and dividend yield
+        typ - "call" or "put", or an array of them
+    """
+    n = np.asarray(path_length, dtype=np.float64)
+    dt = 1 / TRADING_DAYS
+    mean_time = dt * (n + 1) / 2
+    log_variance = volatility ** 2 * dt * (n + 1) * (2 * n + 1) / (6 * n)
+    forward = spot * np.exp((r - q - volatility ** 2 / 2) * mean_time + log_variance / 2)
+    is_call = np.asarray(typ) == "call"
+    return _lognormal_option(forward, log_variance, np.asarray(strike, dtype=np.float64), np.exp(-r * n * dt), is_call)
+
+
+def arithmetic_moments(spot, path_length, volatility: float, r: float = 0.035, q: float = 0.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    First and second moments of the arithmetic average of the daily closes, exact for geometric Brownian motion.
+    With x = e^((r - q) dt) and y = e^((r - q + vol^2) dt)
+        E[A]   = S / n * sum_i x^i
+        E[A^2] = S^2 / n^2 * sum_i sum_j e^((r - q)(t_i + t_j) + vol^2 min(t_i, t_j))
+               = S^2 / n^2 * sum_j ((xy)^j + 2 x^j sum_(i < j) y^i)
+    Both are prefix sums over the fixings, so every path length is read off one cumulative sum.
+    """
+    n = np.asarray(path_length, dtype=np.intp)
+    dt = 1 / TRADING_DAYS
+    j = np.arange(1, int(n.max()) + 1, dtype=np.float64)
+    x = np.exp((r - q) * dt * j)
+    y = np.exp((r - q + volatility ** 2) * dt * j)
+    first = np.cumsum(x)
+    earlier_y = np.concatenate(([0.0], np.cumsum(y)[:-1])) # sum of y^i for i < j
+    second = np.cumsum(x * y + 2 * x * earlier_y)
+    return spot * first[n - 1] / n, spot ** 2 * second[n - 1] / n.astype(np.float64) ** 2
+
+
+def arithmetic_asian_price(spot, strike, path_length, volatility: float, r: float = 0.035, q: float = 0.0, typ="call") -> np.ndarray:
+    """
+    Turnbull-Wakeman / Levy moment matching, arguments as for `geometric_asian_price`
+    """
+    m1, m2 = arithmetic_moments(spot, path_length, volatility, r, q)
+    log_variance = np.log(m2 / m1 ** 2)
+    n = np.asarray(path_length, dtype=np.float64)
+    is_call = np.asarray(typ) == "call"
+    return _lognormal_option(m1, log_variance, np.asarray(strike, dtype=np.float64), np.exp(-r * n / TRADING_DAYS), is_call)
+
+
+def control_variate(spot: float, strike: float, typ: str, path_length: int, volatility: float, r: float = 0.035) -> ControlVariate:
+    """
+    Arithmetic Asian payoff for `MonteCarlo.simulate` with the geometric Asian as its control, for flat vol walks.
+    The walk drifts at r, so the control's expectation is taken without a dividend yield.
+    """
+    discount = np.exp(-r * path_length / TRADING_DAYS)
+    control_mean = float(geometric_asian_price(spot, strike, path_length, volatility, r, 0.0, typ)) / discount
+    return ControlVariate(ArithmeticAsian(strike, typ), GeometricAsian(strike, typ), control_mean)
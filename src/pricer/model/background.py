@@ -0,0 +1,160 @@
+"""
+Monte Carlo pricing in a background thread, in batches, with partial results and cancellation.
+
+The paths are simulated `batch_size` at a time, each batch with its own child seed of one SeedSequence
+so a run is reproducible for a given seed and batch size. After every batch the running price and standard
+error of each payoff are merged in (Chan et al. pairwise mean / variance update) and published, so a
+caller - e.g. a Streamlit fragment polling `snapshot()` - can show convergence while the simulation runs
+and stop it early once the confidence interval is tight enough.
+
+A thread rather than a process: the heavy lifting is NumPy / Numba code that releases the GIL, and the
+MonteCarlo instance with its surfaces does not have to be pickled across.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+
+import numpy as np
+
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import Payoff
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, CANCELLED, FAILED = "pending", "running", "done", "cancelled", "failed"
+
+
+@dataclass
+class Progress:
+    status: str
+    paths_done: int
+    iterations: int
+    prices: np.ndarray               # running price per payoff, NaN before the first batch
+    standard_errors: np.ndarray      # running standard error per payoff
+    history: list[tuple[int, np.ndarray, np.ndarray]] = field(default_factory=list) # (paths_done, prices, standard_errors) after each batch
+    paths: np.ndarray | None = None  # display paths from the first batch
+    error: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, CANCELLED, FAILED)
+
+
+class BackgroundSimulation:
+    def __init__(
+        self,
+        mc: MonteCarlo,
+        current_price: float,
+        volatility,
+        payoffs: Sequence[Payoff],
+        path_length: int,
+        iterations: int,
+        batch_size: int = 50_000,
+        seed: int | None = None,
+        prepare: Callable[[], object] | None = None,
+        **simulate_kwargs
+    ):
+        """
+        Args
+            mc, current_price, volatility, payoffs, path_length, iterations - as for `MonteCarlo.simulate`
+            batch_size - paths per batch, i.e. how often progress is published and cancellation checked
+            seed - seed of the SeedSequence the batch seeds are spawned from
+            prepare - run in the background thread before simulating e.g. `mc.local_volatility`
+            simulate_kwargs - passed on to `MonteCarlo.simulate` (dtype, backend)
+        """
+        if iterations < 2:
+            raise ValueError("At least 2 iterations are needed for a standard error")
+        self.mc = mc
+        self.current_price = current_price
+        self.volatility = volatility
+        self.payoffs = list(payoffs)
+        self.path_length = path_length
+        self.iterations = iterations
+        self.batch_size = max(2, batch_size) # a batch needs 2 paths for its sample variance
+        self.seed = seed
+        self.prepare = prepare
+        self.simulate_kwargs = simulate_kwargs
+
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._thread = None
+        n = len(self.payoffs)
+        self._progress = Progress(PENDING, 0, iterations, np.full(n, np.nan), np.full(n, np.nan))
+        # Running moments per payoff
+        self._mean = np.zeros(n)
+        self._m2 = np.zeros(n)
+
+    def start(self) -> "BackgroundSimulation":
+        if self._thread is not None:
+            raise RuntimeError("The simulation has already been started")
+        self._thread = threading.Thread(target=self._run, name="background-simulation", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """
+        Stop after the batch in flight, the prices so far stay available
+        """
+        self._cancelled.set()
+
+    def wait(self, timeout: float | None = None) -> Progress:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.snapshot()
+
+    def snapshot(self) -> Progress:
+        with self._lock:
+            p = self._progress
+            return Progress(p.status, p.paths_done, p.iterations, p.prices.copy(), p.standard_errors.copy(), list(p.history), p.paths, p.error)
+
+    def _run(self):
+        self._set(status=RUNNING)
+        try:
+            if self.prepare is not None:
+                self.prepare()
+            sizes = [self.batch_size] * (self.iterations // self.batch_size)
+            remainder = self.iterations % self.batch_size
+            if remainder == 1 and sizes:
+                sizes[-1] += 1 # too few paths for a variance on their own
+            elif remainder:
+                sizes.append(remainder)
+            batch_seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+            done = 0
+            for n, batch_seed in zip(sizes, batch_seeds):
+                if self._cancelled.is_set():
+                    break
+                result = self.mc.simulate(
+                    self.current_price, self.volatility, self.payoffs, self.path_length, n,
+                    seed=batch_seed, **self.simulate_kwargs
+                )
+                self._merge(done, n, result)
+                done += n
+            self._set(status=CANCELLED if self._cancelled.is_set() and done < self.iterations else DONE)
+        except Exception as e:
+            logger.exception("Background simulation failed")
+            self._set(status=FAILED, error=str(e))
+
+    def _merge(self, done: int, n: int, result):
+        """
+        Fold a batch's mean and variance into the running ones
+        """
+        batch_var = (result.standard_errors * np.sqrt(n)) ** 2
+        total = done + n
+        delta = result.prices - self._mean
+        self._mean = self._mean + delta * n / total
+        self._m2 = self._m2 + batch_var * (n - 1) + delta ** 2 * done * n / total
+        prices = self._mean.copy()
+        standard_errors = np.sqrt(self._m2 / (total - 1) / total)
+        with self._lock:
+            p = self._progress
+            p.paths_done = total
+            p.prices, p.standard_errors = prices, standard_errors
+            p.history.append((total, prices, standard_errors))
+            if p.paths is None:
+                p.paths = result.paths
+
+    def _set(self, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self._progress, name, value)
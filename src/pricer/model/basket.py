@@ -0,0 +1,207 @@
+"""
+Monte Carlo pricing of options on a weighted basket of correlated underlyings, each under its own local volatility.
+
+All assets are simulated together in one (assets x paths) array. Each step draws independent normals
+for every asset and path and correlates them with a single matrix multiply by the Cholesky factor of
+the correlation matrix. The local volatilities are looked up for every asset at once from their LV grids
+stacked into one (assets x strikes x maturities) array on uniform axes - each grid is first interpolated
+in time to the step's maturity, then every path's price is located on its asset's strike axis by arithmetic
+rather than a search.
+
+The payoffs are the single asset ones from `pricer.model.payoffs`, fed the basket level
+sum(weights * prices) at each step - ArithmeticAsian is a basket Asian, European a basket option, etc.
+As in `MonteCarlo`, every asset drifts at the risk free rate and a year is 252 steps.
+"""
+from __future__ import annotations
+
+from typing import Iterator, Mapping, Sequence
+
+import numpy as np
+
+from pricer.instrumentation import instrumentation
+from pricer.model.monte_carlo import MonteCarlo, SimulationResult
+from pricer.model.payoffs import Payoff
+
+
+def _uniform_axis(axis: np.ndarray) -> bool:
+    steps = np.diff(axis)
+    return len(axis) > 1 and np.all(steps > 0) and np.allclose(steps, steps[0], rtol=1e-9, atol=0)
+
+
+def default_correlation(tickers: Sequence[str], rho: float = 0.5) -> dict[str, list[float]]:
+    """
+    Equicorrelation matrix as columns per ticker, the layout the Asian page's correlation editor shows
+    """
+    return {ticker: [1.0 if i == j else rho for j in range(len(tickers))] for i, ticker in enumerate(tickers)}
+
+
+class BasketMonteCarlo:
+    def __init__(self, models: Sequence[MonteCarlo], correlation, weights: Sequence[float] | None = None, r: float | None = None):
+        """
+        Args
+            models - one MonteCarlo per asset, its surface and asset price; the local volatility is computed if it has not been
+            correlation - assets x assets correlation matrix of the Brownian motions
+            weights - units of each asset in the basket, equal weights summing to 1 if None
+            r - risk free rate for drift and discounting, the first model's if None
+        """
+        self.models = list(models)
+        n_assets = len(self.models)
+        if n_assets == 0:
+            raise ValueError("A basket needs at least one asset")
+        correlation = np.asarray(correlation, dtype=float)
+        if correlation.shape != (n_assets, n_assets):
+            raise ValueError(f"Correlation matrix is {correlation.shape}, expected {(n_assets, n_assets)}")
+        if not np.allclose(correlation, correlation.T) or not np.allclose(np.diag(correlation), 1):
+            raise ValueError("Correlation matrix must be symmetric with a unit diagonal")
+        try:
+            self.cholesky = np.linalg.cholesky(correlation)
+        except np.linalg.LinAlgError:
+            raise ValueError("Correlation matrix is not positive definite") from None
+        self.correlation = correlation
+        self.weights = np.full(n_assets, 1 / n_assets) if weights is None else np.asarray(weights, dtype=float)
+        if self.weights.shape != (n_assets,):
+            raise ValueError(f"Expected {n_assets} weights, got {self.weights.shape}")
+        self.r = self.models[0].r if r is None else r
+        self.asset_prices = np.array([model.asset_price for model in self.models], dtype=float)
+        self.MAX_DISPLAY_AMT = 200
+        self._stacked = None
+
+    @classmethod
+    def from_page_data(cls, page_data: Mapping[str, dict], tickers: Sequence[str], correlation, weights: Sequence[float] | None = None, r: float = 0.035) -> "BasketMonteCarlo":
+        """
+        Basket over tickers saved by the Volatility Surface page (`st.session_state["page_2_data"]`)
+        """
+        models = [
+            MonteCarlo(page_data[t]["maturities"], page_data[t]["strike_prices"], page_data[t]["implied_vol"], page_data[t]["price"], q=page_data[t]["dividend_yield"], r=r)
+            for t in tickers
+        ]
+        return cls(models, correlation, weights, r)
+
+    def local_volatility(self) -> "BasketMonteCarlo":
+        """
+        Build (once) the stacked LV grids every step's lookup reads from
+        """
+        if self._stacked is not None:
+            return self
+        for model in self.models:
+            if model.lv_surface is None:
+                model.local_volatility()
+        n_k = max(model.lv_raw.shape[0] for model in self.models)
+        n_t = max(model.lv_raw.shape[1] for model in self.models)
+        k_axes, t_axes, grids = [], [], []
+        for model in self.models:
+            k_axis = np.asarray(model.strike_prices[:, 0], dtype=float)
+            t_axis = np.asarray(model.maturities[0, :], dtype=float) / 365
+            grid = np.asarray(model.lv_raw, dtype=float)
+            if grid.shape != (n_k, n_t) or not _uniform_axis(k_axis) or not _uniform_axis(t_axis):
+                # Resample onto uniform axes of the common shape, the model's own interpolator does the work
+                k_axis = np.linspace(k_axis[0], k_axis[-1], n_k)
+                t_axis = np.linspace(t_axis[0], t_axis[-1], n_t)
+                k_mesh, t_mesh = np.meshgrid(k_axis, t_axis, indexing="ij")
+                grid = model.lv_surface(np.column_stack((k_mesh.ravel(), t_mesh.ravel()))).reshape(n_k, n_t)
+            k_axes.append(k_axis)
+            t_axes.append(t_axis)
+            grids.append(grid)
+        k_axes, t_axes = np.array(k_axes), np.array(t_axes)
+        self._stacked = {
+            "k_min": k_axes[:, 0], "k_max": k_axes[:, -1], "dk": k_axes[:, 1] - k_axes[:, 0],
+            "t_min": t_axes[:, 0], "t_max": t_axes[:, -1], "dt": t_axes[:, 1] - t_axes[:, 0],
+            "lv": np.array(grids), # assets x strikes x maturities
+        }
+        return self
+
+    def get_lv(self, t: float, prices: np.ndarray) -> np.ndarray:
+        """
+        Local volatility of every asset and path, prices is assets x paths. Bilinear in (strike, maturity)
+        with both clamped to each asset's grid, as `MonteCarlo.get_lv`.
+        """
+        s = self._stacked
+        n_assets, n_k, n_t = s["lv"].shape
+        # Interpolate every grid in time first - a strikes vector per asset
+        position = (np.clip(t, s["t_min"], s["t_max"]) - s["t_min"]) / s["dt"]
+        j = np.clip(position.astype(np.intp), 0, n_t - 2)
+        w = (position - j)[:, None]
+        assets = np.arange(n_assets)
+        lv_t = s["lv"][assets, :, j] * (1 - w) + s["lv"][assets, :, j + 1] * w
+        # Then in strike
+        position = (np.clip(prices, s["k_min"][:, None], s["k_max"][:, None]) - s["k_min"][:, None]) / s["dk"][:, None]
+        i = np.clip(position.astype(np.intp), 0, n_k - 2)
+        w = position - i
+        low = np.take_along_axis(lv_t, i, axis=1)
+        high = np.take_along_axis(lv_t, i + 1, axis=1)
+        return low + (high - low) * w
+
+    @instrumentation.timed("basket.simulate")
+    def simulate(
+        self,
+        volatility: str | float | Sequence[float],
+        payoffs: Sequence[Payoff],
+        path_length: int,
+        iterations: int = 1000,
+        dtype: np.dtype = np.float64,
+        seed: int | None = None,
+    ) -> SimulationResult:
+        """
+        Price every payoff on the basket level off one set of correlated paths
+        Args
+            volatility - "local" for each asset's local volatility, otherwise a flat vol for all assets or one per asset
+            payoffs - settled on sum(weights * prices), all expiring at the end of the path
+            path_length - trading days
+            iterations - how many paths to walk, per asset
+            dtype - precision of the simulated paths, payoff statistics are accumulated in float64
+            seed - anything np.random.default_rng takes
+        Returns
+            prices and standard errors per payoff, and the first MAX_DISPLAY_AMT basket paths
+        """
+        n_assets = len(self.models)
+        instrumentation.count("mc.paths", iterations * n_assets)
+        instrumentation.count("mc.path_steps", iterations * path_length * n_assets)
+        generator = np.random.default_rng(seed)
+        dtype = np.dtype(dtype)
+        if isinstance(volatility, str):
+            if volatility != "local":
+                raise ValueError(f"Unknown volatility {volatility!r}, expected 'local' or flat vols")
+            self.local_volatility()
+            flat_vols = None
+        else:
+            flat_vols = np.broadcast_to(np.asarray(volatility, dtype=dtype), (n_assets,))[:, None]
+
+        basket_start = float(self.weights @ self.asset_prices)
+        states = [payoff.start(iterations, basket_start, path_length) for payoff in payoffs]
+        basket = np.empty(iterations, dtype=np.float64)
+        prices_archive = np.empty((min(iterations, self.MAX_DISPLAY_AMT), path_length + 1))
+        prices_archive[:, 0] = basket_start
+        for step, prices in enumerate(self._steps(generator, flat_vols, path_length, iterations, dtype), start=1):
+            np.matmul(self.weights, prices, out=basket)
+            prices_archive[:, step] = basket[:prices_archive.shape[0]]
+            for payoff, state in zip(payoffs, states):
+                payoff.update(state, step, basket)
+
+        discount = np.exp(-self.r * (path_length / 252))
+        prices, standard_errors = np.empty(len(payoffs)), np.empty(len(payoffs))
+        for j, (payoff, state) in enumerate(zip(payoffs, states)):
+            discounted_payoffs = payoff.settle(state) * discount
+            prices[j] = np.mean(discounted_payoffs)
+            standard_errors[j] = np.std(discounted_payoffs, ddof=1) / np.sqrt(iterations)
+        return SimulationResult(prices=prices, standard_errors=standard_errors, paths=prices_archive)
+
+    def _steps(self, generator: np.random.Generator, flat_vols: np.ndarray | None, path_length: int, iterations: int, dtype: np.dtype) -> Iterator[np.ndarray]:
+        """
+        Yields every asset's prices (assets x paths) after each step, only two such arrays are kept
+        """
+        time_delta = 1 / 252
+        r = dtype.type(self.r)
+        dt = dtype.type(time_delta)
+        sqrt_dt = dtype.type(np.sqrt(time_delta))
+        cholesky = self.cholesky.astype(dtype)
+
+        prev = np.repeat(self.asset_prices.astype(dtype)[:, None], iterations, axis=1)
+        out = np.empty_like(prev)
+        time_elapsed = 0
+        for _ in range(path_length):
+            lv = flat_vols if flat_vols is not None else self.get_lv(time_elapsed, prev).astype(dtype, copy=False)
+            shocks = cholesky @ generator.standard_normal(size=prev.shape, dtype=dtype) # correlated across assets
+            time_elapsed += time_delta
+            np.multiply(prev, np.exp((r - lv ** 2 / 2) * dt + lv * shocks * sqrt_dt), out=out)
+            yield out
+            prev, out = out, prev
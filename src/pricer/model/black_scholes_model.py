@@ -1,7 +1,11 @@
 import numpy as np
-import scipy.stats as si
 from typing import Optional
 
+from pricer._lazy import lazy_import
+from pricer.instrumentation import instrumentation
+
+special = lazy_import("scipy.special") # ndtr is the standard normal CDF, without loading all of scipy.stats
+
 class BlackScholesModel:
     """
     Validated with
@@ -36,7 +40,7 @@ class BlackScholesModel:
     def call_option_price(self, sigma: Optional[float] = None):
         if sigma is None:
             sigma = self.sigma
-        return ((self.S * np.exp(-self.d * self.T)) * si.norm.cdf(self.d1(sigma), 0.0, 1.0) - self.K * np.exp(-self.r * self.T) * si.norm.cdf(self.d2(sigma), 0.0, 1.0))
+        return ((self.S * np.exp(-self.d * self.T)) * special.ndtr(self.d1(sigma)) - self.K * np.exp(-self.r * self.T) * special.ndtr(self.d2(sigma)))
 
     def first_order_derivative(self, sigma: Optional[float] = None):
         if sigma is None:
@@ -46,7 +50,7 @@ class BlackScholesModel:
     def put_option_price(self, sigma: Optional[float] = None):
         if sigma is None:
             sigma = self.sigma
-        return (self.K * np.exp(-self.r * self.T) * si.norm.cdf(-self.d2(sigma), 0.0, 1.0) - (self.S * np.exp(-self.d * self.T)) * si.norm.cdf(-self.d1(sigma), 0.0, 1.0))
+        return (self.K * np.exp(-self.r * self.T) * special.ndtr(-self.d2(sigma)) - (self.S * np.exp(-self.d * self.T)) * special.ndtr(-self.d1(sigma)))
 
     def implied_volatility(self):
         """
@@ -68,7 +72,10 @@ class BlackScholesModel:
         # Calculate Implied Volatility
         vol = self._newton_raphson()
         if vol is None:
+            instrumentation.count("iv.bisection_fallbacks")
             vol = self._bisection()
+        else:
+            instrumentation.count("iv.newton_solves")
         if vol > self.MAX_VOL:
             return np.nan
         return vol
@@ -81,29 +88,36 @@ class BlackScholesModel:
         # print(self.S, self.d, self.option_price, self.K, self.T, self.r, self.sigma)
         sigma_lower, sigma_upper = self.SIGMA_LOWER_LIMIT, self.SIGMA_UPPER_LIMIT
         implied_price = float("inf")
-        for _ in range(self.MAX_ITERATIONS):
+        for iteration in range(self.MAX_ITERATIONS):
             sigma_mid = (sigma_lower + sigma_upper) / 2
             implied_price = self.call_option_price(sigma_mid) if self.type == "call" else self.put_option_price(sigma_mid)
             if abs(implied_price - self.option_price) < 1E-5:
+                instrumentation.count("iv.bisection_iterations", iteration + 1)
                 return sigma_mid
             if implied_price < self.option_price:
                 sigma_lower = sigma_mid
             elif implied_price > self.option_price:
                 sigma_upper = sigma_mid
+        instrumentation.count("iv.bisection_iterations", self.MAX_ITERATIONS)
         return np.nan
 
     def _newton_raphson(self):
         sigma_guess, implied_sigma, to_continue = self.sigma, float("inf"), True
+        iterations = 0
         while to_continue:
+            iterations += 1
             vega = self.first_order_derivative(sigma_guess)
             if abs(vega) < 1E-8:
+                instrumentation.count("iv.newton_iterations", iterations)
                 return None
             implied_price = self.call_option_price(sigma_guess) if self.type == "call" else self.put_option_price(sigma_guess)
             implied_sigma = (self.option_price - implied_price + (vega * sigma_guess)) / vega
             if implied_sigma <= 0:
+                instrumentation.count("iv.newton_iterations", iterations)
                 return None
             to_continue = abs(sigma_guess-implied_sigma) > 1E-5
             sigma_guess = implied_sigma
+        instrumentation.count("iv.newton_iterations", iterations)
         return sigma_guess
 
 # bs = BlackScholesModel(S=10, d=0.0, opt_px=1.9174, K=12, T=2, r=0.05, typ="call", sigma=0.1) # Newton-Raphson
@@ -1,8 +1,11 @@
+from __future__ import annotations
 from dataclasses import dataclass
 import datetime
 import pandas as pd
 import alpaca
-from alpaca.trading.enums import AssetStatus, ContractType, ExerciseStyle
+from pricer._lazy import lazy_attribute
+ContractType = lazy_attribute("alpaca.trading.enums", "ContractType")
+ExerciseStyle = lazy_attribute("alpaca.trading.enums", "ExerciseStyle")
 # https://alpaca.markets/sdks/python/api_reference/trading/models.html#optioncontract
 @dataclass
 class ContractModel:
@@ -0,0 +1,85 @@
+"""
+Implied forwards, discount factors, rates and dividend yields from put-call parity.
+
+For every expiry the call and put quoted at the same strike satisfy C - P = DF * (F - K), so across
+strikes C - P is a straight line in K with slope -DF and intercept DF * F. One least squares fit per
+expiry gives the discount factor and forward, hence r = -ln(DF) / T and q = r - ln(F / S) / T.
+All expiries are fitted at once from per-expiry sums - no Python loop over the chain.
+
+Listed equity options are American, for which parity only holds as an inequality. Near the money and
+away from expiry the early exercise premia of the call and put are small, which is why only pairs
+within PARITY_BAND of spot are used.
+"""
+import numpy as np
+import pandas as pd
+
+PARITY_BAND = 0.1     # pairs are matched on strikes within this fraction of spot
+MIN_PAIRS = 3         # fewest call / put pairs an expiry needs for its own fit
+MAX_ABS_RATE = 0.25   # fits implying |r| or |q| above this are treated as noise
+
+
+def implied_forward_curve(df: pd.DataFrame, spot: float) -> pd.DataFrame:
+    """
+    Args
+        df - one underlying's chain with expiration_date, period_year, strike_price, close_price and type
+        spot - underlying asset price
+    Returns
+        one row per fitted expiry: expiration_date, period_year, pairs, forward, discount_factor,
+        risk_free_rate and dividend_yield. Expiries with too few pairs or an implausible fit are left out.
+    """
+    columns = ["expiration_date", "period_year", "pairs", "forward", "discount_factor", "risk_free_rate", "dividend_yield"]
+    near = df[(np.abs(df["strike_price"] / spot - 1) <= PARITY_BAND) & (df["period_year"] > 0)]
+    keys = ["expiration_date", "period_year", "strike_price"]
+    calls = near.loc[near["type"] == "call", keys + ["close_price"]].groupby(keys, as_index=False).mean()
+    puts = near.loc[near["type"] == "put", keys + ["close_price"]].groupby(keys, as_index=False).mean()
+    pairs = calls.merge(puts, on=keys, suffixes=("_call", "_put"))
+    if pairs.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Ordinary least squares of y = C - P on x = K, per expiry, from the group sums
+    pairs["x"] = pairs["strike_price"]
+    pairs["y"] = pairs["close_price_call"] - pairs["close_price_put"]
+    pairs["xx"] = pairs["x"] ** 2
+    pairs["xy"] = pairs["x"] * pairs["y"]
+    sums = pairs.groupby(["expiration_date", "period_year"], as_index=False).agg(
+        pairs=("x", "size"), x=("x", "sum"), y=("y", "sum"), xx=("xx", "sum"), xy=("xy", "sum")
+    )
+    n = sums["pairs"].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sums["xy"] - sums["x"] * sums["y"]) / (n * sums["xx"] - sums["x"] ** 2)
+        intercept = (sums["y"] - slope * sums["x"]) / n
+        discount_factor = -slope
+        forward = intercept / discount_factor
+        T = sums["period_year"]
+        risk_free_rate = -np.log(discount_factor) / T
+        dividend_yield = risk_free_rate - np.log(forward / spot) / T
+
+    curve = pd.DataFrame({
+        "expiration_date": sums["expiration_date"],
+        "period_year": T,
+        "pairs": sums["pairs"],
+        "forward": forward,
+        "discount_factor": discount_factor,
+        "risk_free_rate": risk_free_rate,
+        "dividend_yield": dividend_yield,
+    })
+    plausible = (
+        (curve["pairs"] >= MIN_PAIRS)
+        & np.isfinite(curve["risk_free_rate"]) & np.isfinite(curve["dividend_yield"])
+        & (curve["risk_free_rate"].abs() <= MAX_ABS_RATE) & (curve["dividend_yield"].abs() <= MAX_ABS_RATE)
+    )
+    return curve[plausible].sort_values("period_year").reset_index(drop=True)
+
+
+def rates_for_maturities(curve: pd.DataFrame, period_year, risk_free_rate: float, dividend_yield: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per contract r and q read off the curve - linear in maturity between fitted expiries, flat beyond
+    them, and the given defaults when nothing could be fitted
+    """
+    period_year = np.asarray(period_year, dtype=float)
+    if curve.empty:
+        return np.full(period_year.shape, risk_free_rate, dtype=float), np.full(period_year.shape, dividend_yield, dtype=float)
+    maturities = curve["period_year"].to_numpy(dtype=float)
+    r = np.interp(period_year, maturities, curve["risk_free_rate"].to_numpy(dtype=float))
+    q = np.interp(period_year, maturities, curve["dividend_yield"].to_numpy(dtype=float))
+    return r, q
@@ -0,0 +1,159 @@
+"""
+Heston stochastic volatility model priced with the Carr-Madan FFT.
+
+One FFT prices calls on a whole log-strike grid for one maturity; all maturities of a chain go through
+a single batched FFT. Contract prices are read off the grid by interpolation, which keeps the cost of a
+calibration objective evaluation independent of the number of contracts.
+
+References
+    Carr, P. and Madan, D. (1999). Option valuation using the fast Fourier transform.
+    Albrecher, H. et al. (2007). The little Heston trap.
+"""
+from __future__ import annotations
+
+from dataclasses import astuple, dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from pricer._lazy import lazy_import
+from pricer.model.implied_volatility import black_scholes_vega
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+optimize = lazy_import("scipy.optimize")
+
+
+@dataclass
+class HestonParameters:
+    v0: float          # initial variance
+    kappa: float       # mean reversion speed of the variance
+    theta: float       # long run variance
+    sigma: float       # volatility of the variance
+    rho: float         # correlation between the asset and variance shocks
+
+    def as_array(self) -> np.ndarray:
+        return np.array(astuple(self), dtype=float)
+
+    @classmethod
+    def from_array(cls, values) -> HestonParameters:
+        return cls(*(float(v) for v in values))
+
+
+# Calibration bounds in the order of HestonParameters
+LOWER_BOUNDS = HestonParameters(v0=1e-4, kappa=1e-3, theta=1e-4, sigma=1e-3, rho=-0.999)
+UPPER_BOUNDS = HestonParameters(v0=4.0, kappa=20.0, theta=4.0, sigma=5.0, rho=0.999)
+DEFAULT_GUESS = HestonParameters(v0=0.04, kappa=2.0, theta=0.04, sigma=0.5, rho=-0.5)
+
+
+class HestonModel:
+    def __init__(self, S: float, r: float = 0.035, q: float = 0, params: HestonParameters | None = None, N: int = 4096, eta: float = 0.25, alpha: float = 1.5):
+        """
+        Args
+            S - underlying asset price
+            r - risk free rate
+            q - dividend yield
+            params - Heston parameters, set by `calibrate` if not given
+            N - number of FFT points
+            eta - spacing of the integration grid, the log-strike spacing is 2*pi / (N * eta)
+            alpha - Carr-Madan damping factor
+        """
+        self.S = S
+        self.r = r
+        self.q = q
+        self.params = params
+        self.N = N
+        self.eta = eta
+        self.alpha = alpha
+        self.log_strike_spacing = 2 * np.pi / (N * eta)
+
+    def characteristic_function(self, u: np.ndarray, T: np.ndarray, params: HestonParameters | None = None) -> np.ndarray:
+        """
+        Characteristic function of ln(S_T), u and T broadcast against each other
+        """
+        p = params or self.params
+        iu = 1j * u
+        beta = p.kappa - p.rho * p.sigma * iu
+        d = np.sqrt(beta ** 2 + p.sigma ** 2 * (iu + u ** 2))
+        g = (beta - d) / (beta + d)
+        exp_dt = np.exp(-d * T)
+        C = (self.r - self.q) * iu * T + p.kappa * p.theta / p.sigma ** 2 * ((beta - d) * T - 2 * np.log((1 - g * exp_dt) / (1 - g)))
+        D = (beta - d) / p.sigma ** 2 * (1 - exp_dt) / (1 - g * exp_dt)
+        return np.exp(C + D * p.v0 + iu * np.log(self.S))
+
+    def fft_call_prices(self, maturities: np.ndarray, params: HestonParameters | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns
+            log_strikes - (N,) the log-strike grid
+            call_prices - (len(maturities), N) call prices on that grid, one row per maturity
+        """
+        T = np.asarray(maturities, dtype=float)[:, np.newaxis]
+        j = np.arange(self.N)
+        v = self.eta * j
+        b = self.N * self.log_strike_spacing / 2
+        log_strikes = -b + self.log_strike_spacing * j
+        # Damped call transform
+        u = v - (self.alpha + 1) * 1j
+        psi = np.exp(-self.r * T) * self.characteristic_function(u, T, params) / (self.alpha ** 2 + self.alpha - v ** 2 + 1j * (2 * self.alpha + 1) * v)
+        # Simpson's rule weights
+        simpson = (3 + (-1) ** (j + 1)) / 3
+        simpson[0] = 1 / 3
+        x = np.exp(1j * b * v) * psi * self.eta * simpson
+        call_prices = np.exp(-self.alpha * log_strikes) / np.pi * np.real(np.fft.fft(x, axis=1))
+        return log_strikes, call_prices
+
+    def price(self, strikes, maturities, typ, params: HestonParameters | None = None) -> np.ndarray:
+        """
+        Args
+            strikes - strike price per contract
+            maturities - time to expiration in years per contract
+            typ - "call" or "put" per contract
+        Every distinct maturity costs one row of the batched FFT, puts come from put-call parity
+        """
+        strikes, maturities, typ = np.broadcast_arrays(np.asarray(strikes, dtype=float), np.asarray(maturities, dtype=float), np.asarray(typ))
+        unique_maturities, inverse = np.unique(maturities, return_inverse=True)
+        log_strikes, call_grid = self.fft_call_prices(unique_maturities, params)
+        log_k = np.log(strikes)
+        calls = np.empty(strikes.shape, dtype=float)
+        for m in range(unique_maturities.shape[0]):
+            rows = inverse == m
+            calls[rows] = np.interp(log_k[rows], log_strikes, call_grid[m])
+        puts = calls - self.S * np.exp(-self.q * maturities) + strikes * np.exp(-self.r * maturities)
+        return np.where(typ == "call", calls, puts)
+
+    def calibrate(self, df: pd.DataFrame, target: str = "iv", initial: HestonParameters | None = None, max_nfev: int = 200) -> HestonParameters:
+        """
+        Least squares fit to a cleaned chain (`Data.contracts_dict[ticker]`)
+        Args
+            df - needs strike_price, period_year, type, close_price and, for target="iv", calculated_iv
+            target - "price" fits prices directly, "iv" scales the price errors by the market vega which
+                to first order is the IV error, without having to invert every model price
+            initial - starting parameters, defaults to DEFAULT_GUESS with v0 and theta at the median market variance
+        """
+        strikes = df["strike_price"].to_numpy(dtype=float)
+        maturities = df["period_year"].to_numpy(dtype=float)
+        typ = df["type"].to_numpy()
+        market = df["close_price"].to_numpy(dtype=float)
+        if target == "iv":
+            market_iv = df["calculated_iv"].to_numpy(dtype=float)
+            scale = np.maximum(black_scholes_vega(self.S, self.q, strikes, maturities, self.r, market_iv), 1e-4)
+        elif target == "price":
+            scale = np.ones_like(market)
+        else:
+            raise ValueError(f"Unknown calibration target {target!r}, expected 'iv' or 'price'")
+
+        if initial is None:
+            initial = DEFAULT_GUESS
+            if "calculated_iv" in df:
+                median_variance = float(np.nanmedian(df["calculated_iv"].to_numpy(dtype=float)) ** 2)
+                initial = HestonParameters(median_variance, initial.kappa, median_variance, initial.sigma, initial.rho)
+
+        def residuals(x):
+            return (self.price(strikes, maturities, typ, HestonParameters.from_array(x)) - market) / scale
+
+        lower, upper = LOWER_BOUNDS.as_array(), UPPER_BOUNDS.as_array()
+        result = optimize.least_squares(residuals, np.clip(initial.as_array(), lower, upper), bounds=(lower, upper), x_scale="jac", max_nfev=max_nfev)
+        self.params = HestonParameters.from_array(result.x)
+        self.calibration_rmse = float(np.sqrt(np.mean(result.fun ** 2)))
+        return self.params
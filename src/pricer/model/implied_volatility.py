@@ -0,0 +1,214 @@
+"""
+Vectorized Black-Scholes implied volatility for a whole chain at once.
+
+Follows `BlackScholesModel.implied_volatility` contract for contract (same filters, Newton - Raphson
+with a bisection fall back, same tolerances) but solves every contract in one set of array operations.
+Alongside the IVs it returns why each contract was dropped and how many iterations it cost.
+"""
+from dataclasses import dataclass
+from enum import IntEnum
+
+import numpy as np
+
+from pricer._lazy import lazy_import
+from pricer.instrumentation import instrumentation
+
+special = lazy_import("scipy.special")
+numba_kernels = lazy_import("pricer.model.numba_kernels")
+
+SIGMA_UPPER_LIMIT = 5
+SIGMA_LOWER_LIMIT = 0.001
+MAX_ITERATIONS = 250
+TIME_CAP = 7 # days
+MAX_VOL = 3
+MIN_MONEYNESS = 0.3
+MAX_MONEYNESS = 1.7
+NEWTON_TOLERANCE = 1E-5
+BISECTION_TOLERANCE = 1E-5
+MIN_VEGA = 1E-8
+
+
+class IVStatus(IntEnum):
+    SOLVED_NEWTON = 0
+    SOLVED_BISECTION = 1
+    BELOW_INTRINSIC = 2        # cheaper than the discounted intrinsic value
+    ABOVE_UPPER_BOUND = 3      # dearer than the (dividend discounted) stock
+    UNDER_TIME_CAP = 4         # less than TIME_CAP days to expiry
+    OUTSIDE_MONEYNESS = 5      # strike outside MIN_MONEYNESS to MAX_MONEYNESS of spot
+    NOT_CONVERGED = 6          # bisection ran out of iterations
+    ABOVE_MAX_VOL = 7          # solved, but above MAX_VOL
+    INVALID_INPUT = 8          # missing / non-finite inputs e.g. no spot price for the underlying
+
+
+@dataclass
+class IVResult:
+    iv: np.ndarray             # NaN wherever status is not a SOLVED_* code
+    status: np.ndarray         # int8 IVStatus codes
+    iterations: np.ndarray     # Newton + bisection iterations spent per contract
+
+
+def black_scholes_price(S, d, K, T, r, sigma, is_call):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r - d + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    discounted_spot = S * np.exp(-d * T)
+    discounted_strike = K * np.exp(-r * T)
+    call = discounted_spot * special.ndtr(d1) - discounted_strike * special.ndtr(d2)
+    put = discounted_strike * special.ndtr(-d2) - discounted_spot * special.ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def black_scholes_vega(S, d, K, T, r, sigma):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r - d + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    return S * sqrt_t * np.exp(-d * T) * np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+
+
+def implied_volatility_batch(S, d, opt_px, K, T, r, typ, sigma_guess: float = 0.1, backend: str = "auto") -> IVResult:
+    """
+    Args
+        S - underlying asset prices
+        d - dividend yields
+        opt_px - option prices
+        K - strike prices
+        T - time to expiration in years
+        r - risk free rates
+        typ - "call" or "put" per contract
+        sigma_guess - starting point for Newton - Raphson
+        backend - "numba" solves every contract in one compiled kernel, "numpy" in array operations,
+            "auto" uses numba when it is installed
+    All array arguments broadcast against each other.
+    """
+    backend = numba_kernels.resolve_backend(backend)
+    S, d, opt_px, K, T, r, typ = np.broadcast_arrays(
+        np.asarray(S, dtype=float), np.asarray(d, dtype=float), np.asarray(opt_px, dtype=float),
+        np.asarray(K, dtype=float), np.asarray(T, dtype=float), np.asarray(r, dtype=float), np.asarray(typ)
+    )
+    S, d, opt_px, K, T, r = (a.ravel() for a in (S, d, opt_px, K, T, r))
+    is_call = typ.ravel() == "call"
+    n = S.shape[0]
+
+    iv = np.full(n, np.nan)
+    iterations = np.zeros(n, dtype=np.int32)
+
+    # 1. Filters - in the same order as the scalar model, the first failing check is the reported status
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        discounted_spot = S * np.exp(-d * T)
+        discounted_strike = K * np.exp(-r * T)
+        lower_bound = np.maximum(0, np.where(is_call, discounted_spot - discounted_strike, discounted_strike - discounted_spot))
+        moneyness = K / S
+    invalid = ~(np.isfinite(S) & np.isfinite(d) & np.isfinite(opt_px) & np.isfinite(K) & np.isfinite(T) & np.isfinite(r)) | (S <= 0) | (K <= 0)
+    status = np.select(
+        [
+            invalid,
+            opt_px < lower_bound,
+            opt_px > discounted_spot,
+            T < (TIME_CAP / 365),
+            (moneyness < MIN_MONEYNESS) | (moneyness > MAX_MONEYNESS),
+        ],
+        [IVStatus.INVALID_INPUT, IVStatus.BELOW_INTRINSIC, IVStatus.ABOVE_UPPER_BOUND, IVStatus.UNDER_TIME_CAP, IVStatus.OUTSIDE_MONEYNESS],
+        default=IVStatus.NOT_CONVERGED, # placeholder for the contracts still to be solved
+    ).astype(np.int8)
+    to_solve = np.flatnonzero(status == IVStatus.NOT_CONVERGED)
+
+    if backend == "numba":
+        numba_kernels.implied_volatility_kernel(
+            to_solve, S, d, opt_px, K, T, r, is_call, float(sigma_guess), iv, status, iterations,
+            MAX_ITERATIONS, NEWTON_TOLERANCE, BISECTION_TOLERANCE, MIN_VEGA, SIGMA_LOWER_LIMIT, SIGMA_UPPER_LIMIT,
+            IVStatus.SOLVED_NEWTON.value, IVStatus.SOLVED_BISECTION.value, IVStatus.NOT_CONVERGED.value
+        )
+    else:
+        # 2. Newton - Raphson, contracts leave the active set as they converge or fail
+        fallback = _newton_raphson(to_solve, S, d, opt_px, K, T, r, is_call, sigma_guess, iv, status, iterations)
+        # 3. Bisection for the ones Newton - Raphson could not handle
+        _bisection(fallback, S, d, opt_px, K, T, r, is_call, iv, status, iterations)
+    bisection_fallbacks = int(np.sum((status == IVStatus.SOLVED_BISECTION) | (status == IVStatus.NOT_CONVERGED)))
+
+    # 4. Drop the unrealistically volatile
+    too_volatile = (iv > MAX_VOL)
+    iv[too_volatile] = np.nan
+    status[too_volatile] = IVStatus.ABOVE_MAX_VOL
+
+    instrumentation.count("iv.newton_solves", int(np.sum(status == IVStatus.SOLVED_NEWTON)))
+    instrumentation.count("iv.bisection_fallbacks", bisection_fallbacks)
+    instrumentation.count("iv.iterations", int(iterations.sum()))
+    return IVResult(iv=iv, status=status, iterations=iterations)
+
+
+def _newton_raphson(idx, S, d, opt_px, K, T, r, is_call, sigma_guess, iv, status, iterations) -> np.ndarray:
+    """
+    Returns the indices that have to fall back to bisection
+    """
+    sigma = np.full(idx.shape[0], sigma_guess, dtype=float)
+    failed = []
+    for _ in range(MAX_ITERATIONS):
+        if idx.shape[0] == 0:
+            break
+        iterations[idx] += 1
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            vega = black_scholes_vega(S[idx], d[idx], K[idx], T[idx], r[idx], sigma)
+            implied_price = black_scholes_price(S[idx], d[idx], K[idx], T[idx], r[idx], sigma, is_call[idx])
+            implied_sigma = (opt_px[idx] - implied_price + vega * sigma) / vega
+        no_vega = np.abs(vega) < MIN_VEGA
+        diverged = ~no_vega & ~(implied_sigma > 0) # also catches NaN
+        converged = ~no_vega & ~diverged & (np.abs(sigma - implied_sigma) <= NEWTON_TOLERANCE)
+        failed.append(idx[no_vega | diverged])
+        iv[idx[converged]] = implied_sigma[converged]
+        status[idx[converged]] = IVStatus.SOLVED_NEWTON
+        keep = ~(no_vega | diverged | converged)
+        idx, sigma = idx[keep], implied_sigma[keep]
+    failed.append(idx) # out of iterations
+    return np.concatenate(failed)
+
+
+def _bisection(idx, S, d, opt_px, K, T, r, is_call, iv, status, iterations):
+    """
+    Working on a monotonic slope - increasing volatility will have increasing option price
+    """
+    sigma_lower = np.full(idx.shape[0], SIGMA_LOWER_LIMIT, dtype=float)
+    sigma_upper = np.full(idx.shape[0], SIGMA_UPPER_LIMIT, dtype=float)
+    for _ in range(MAX_ITERATIONS):
+        if idx.shape[0] == 0:
+            break
+        iterations[idx] += 1
+        sigma_mid = (sigma_lower + sigma_upper) / 2
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            implied_price = black_scholes_price(S[idx], d[idx], K[idx], T[idx], r[idx], sigma_mid, is_call[idx])
+        found = np.abs(implied_price - opt_px[idx]) < BISECTION_TOLERANCE
+        iv[idx[found]] = sigma_mid[found]
+        status[idx[found]] = IVStatus.SOLVED_BISECTION
+        too_low = implied_price < opt_px[idx]
+        sigma_lower = np.where(too_low, sigma_mid, sigma_lower)
+        sigma_upper = np.where(implied_price > opt_px[idx], sigma_mid, sigma_upper)
+        keep = ~found
+        idx, sigma_lower, sigma_upper = idx[keep], sigma_lower[keep], sigma_upper[keep]
+    status[idx] = IVStatus.NOT_CONVERGED
+
+
+def solver_summary(result: IVResult, bins: list[int] | None = None) -> dict:
+    """
+    Aggregate telemetry for a batch: how many contracts ended in each status and how the
+    iteration counts were distributed
+    """
+    if bins is None:
+        bins = [0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 2 * MAX_ITERATIONS + 1]
+    status_counts = np.bincount(result.status.astype(np.int64), minlength=len(IVStatus))
+    iteration_counts, _ = np.histogram(result.iterations, bins=bins)
+    return {
+        "contracts": int(result.status.shape[0]),
+        "status_counts": {status.name: int(status_counts[status]) for status in IVStatus},
+        "iteration_histogram": {f"{lo}-{hi - 1}": int(c) for lo, hi, c in zip(bins[:-1], bins[1:], iteration_counts)},
+        "total_iterations": int(result.iterations.sum()),
+    }
+
+
+def merge_summaries(first: dict, second: dict) -> dict:
+    """
+    One `solver_summary` for two batches, e.g. the chunks of a chain solved one after the other
+    """
+    return {
+        "contracts": first["contracts"] + second["contracts"],
+        "status_counts": {name: first["status_counts"][name] + second["status_counts"][name] for name in first["status_counts"]},
+        "iteration_histogram": {name: first["iteration_histogram"][name] + second["iteration_histogram"][name] for name in first["iteration_histogram"]},
+        "total_iterations": first["total_iterations"] + second["total_iterations"],
+    }
@@ -0,0 +1,111 @@
+"""
+Importance sampling of out of the money payoffs by shifting the drift of the walk's normals
+(Glasserman, Heidelberger & Shahabuddin, 1999).
+
+Far from the money almost every path settles at zero and the standard error barely moves with more
+paths. Drawing each step's normal from N(theta_i, 1) instead of N(0, 1) pushes the paths towards the
+strike; every path is then weighted by the likelihood ratio
+
+    dP/dQ = exp(-sum_i theta_i * Z_i - sum_i theta_i^2 / 2)       Z_i the unshifted draw
+
+so the estimator stays unbiased. `optimal_drift_shift` picks theta as the most likely way for the
+payoff to pay - the z maximising log(payoff(path(z))) - |z|^2 / 2, found on the deterministic walk
+driven by z. For an Asian the shift falls off along the path as each step moves fewer fixings.
+"""
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+from pricer._lazy import lazy_import
+from pricer.model.payoffs import Payoff
+
+optimize = lazy_import("scipy.optimize")
+
+logger = logging.getLogger(__name__)
+
+FD_STEP = 1e-6
+LINE_SEARCH = np.concatenate([-np.geomspace(0.05, 20, 25), np.geomspace(0.05, 20, 25)]) # scales of the initial shift
+
+
+class ShiftedNormals:
+    """
+    Stands in for the random generator of a walk, drawing each step's normals from N(shift[step], 1) and keeping every
+    path's log likelihood ratio. The walks draw their normals once per step.
+    """
+    def __init__(self, generator: np.random.Generator, shift: np.ndarray, iterations: int):
+        self.generator = generator
+        self.shift = np.asarray(shift, dtype=np.float64)
+        self.step = 0
+        self.log_weight = np.zeros(iterations)
+
+    def standard_normal(self, size, dtype=np.float64) -> np.ndarray:
+        theta = self.shift[self.step]
+        self.step += 1
+        normals = self.generator.standard_normal(size=size, dtype=dtype)
+        self.log_weight -= theta * normals + theta ** 2 / 2
+        normals += np.dtype(dtype).type(theta)
+        return normals
+
+    @property
+    def weights(self) -> np.ndarray:
+        return np.exp(self.log_weight)
+
+
+class _FixedNormals:
+    """
+    Hands a walk the given normals (steps x paths), one row per step
+    """
+    def __init__(self, normals: np.ndarray):
+        self.rows = iter(normals)
+
+    def standard_normal(self, size, dtype=np.float64) -> np.ndarray:
+        return next(self.rows)
+
+
+def _payoffs(mc, current_price: float, volatility, payoff: Payoff, path_length: int, normals: np.ndarray) -> np.ndarray:
+    """
+    Undiscounted payoff of the deterministic walk driven by every column of normals
+    """
+    iterations = normals.shape[1]
+    state = payoff.start(iterations, current_price, path_length)
+    steps = mc._steps_numpy(_FixedNormals(normals), current_price, volatility, path_length, iterations, np.dtype(np.float64))
+    for step, prices in enumerate(steps, start=1):
+        payoff.update(state, step, prices)
+    return payoff.settle(state)
+
+
+def optimal_drift_shift(mc, current_price: float, volatility, payoff: Payoff, path_length: int) -> np.ndarray:
+    """
+    Per step shift of the normals for `MonteCarlo.simulate(..., drift_shift=)`, zeros if the payoff is zero on every
+    path tried
+    Args
+        mc, current_price, volatility, payoff, path_length - as for `MonteCarlo.simulate`, the local volatility
+            surface must already be computed unless `volatility` is flat
+    """
+    n = path_length
+
+    def objective(z: np.ndarray) -> np.ndarray:
+        # -log payoff + |z|^2 / 2, vectorised over columns
+        with np.errstate(divide="ignore"):
+            log_payoff = np.log(np.maximum(_payoffs(mc, current_price, volatility, payoff, n, z), 1e-300))
+        return -log_payoff + 0.5 * np.sum(z ** 2, axis=0)
+
+    def value_and_gradient(z: np.ndarray):
+        # The point and its forward differences walked together as n + 1 paths
+        columns = np.repeat(z[:, None], n + 1, axis=1)
+        columns[np.arange(n), np.arange(1, n + 1)] += FD_STEP
+        values = objective(columns)
+        return values[0], (values[1:] - values[0]) / FD_STEP
+
+    # Start from the best of a line of shifts falling off along the path, the shape an Asian's optimum has
+    direction = np.arange(n, 0, -1, dtype=np.float64) / n
+    candidates = direction[:, None] * LINE_SEARCH
+    values = objective(candidates)
+    best = int(np.argmin(values))
+    if _payoffs(mc, current_price, volatility, payoff, n, candidates[:, best:best + 1])[0] <= 0:
+        logger.info("No shift along the path makes %s pay, sampling without a shift", payoff)
+        return np.zeros(n)
+    result = optimize.minimize(value_and_gradient, candidates[:, best], jac=True, method="L-BFGS-B")
+    return result.x if result.fun <= values[best] else candidates[:, best]
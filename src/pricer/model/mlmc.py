@@ -0,0 +1,245 @@
+"""
+Multilevel Monte Carlo (Giles, 2008) for payoffs on `MonteCarlo` paths.
+
+`MonteCarlo.simulate` walks every path in daily steps. Here the price is a telescoping sum over levels
+of coarser to finer walks,
+
+    E[P_L] = E[P_0] + sum over l = 1 .. L of E[P_l - P_(l-1)]
+
+where level 0 takes a single step to expiry and each level halves the step. A correction P_l - P_(l-1) is
+simulated on one set of Brownian increments: the coarse walk's increments are the sums of the fine
+walk's, so the two paths stay close and the correction's variance shrinks as the levels get finer.
+Most paths are then spent on the cheap coarse levels and only a few on the expensive daily ones.
+
+Payoffs see daily closes as in `simulate`; on a level coarser than a day they are linearly interpolated
+between the steps of the walk. The number of paths per level is picked from pilot estimates of each
+level's variance V_l and cost C_l (time steps per path),
+
+    N_l = 2 eps^-2 * sqrt(V_l / C_l) * sum_k sqrt(V_k * C_k)
+
+which minimises the total cost for a standard error of eps / sqrt(2), and topped up as the estimates improve.
+
+The finest level L is chosen adaptively (Giles' convergence test): starting from MIN_LEVELS levels, a
+finer one is added until the time discretisation bias, estimated from the last corrections for the weak
+order 1 of the Euler walk as max(|E[Y_L]|, |E[Y_(L-1)]| / 2), is below eps / sqrt(2) too. The squared
+error eps^2 is split evenly between variance and bias, so the root mean square error of the price against
+the continuous time model (with daily fixings) is eps. Levels stop at `max_steps_per_day`; if the bias
+test or the standard error target still fail there, or after MAX_ROUNDS top ups, the result is flagged.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from pricer.instrumentation import instrumentation
+from pricer.model.payoffs import Payoff
+
+logger = logging.getLogger(__name__)
+
+PILOT_PATHS = 1000
+BATCH_PATHS = 10_000     # paths simulated at once per level - bounds the memory of the stored paths
+MAX_ROUNDS = 10          # top up rounds after the pilot of each level
+MIN_LEVELS = 3           # levels simulated before the first bias test
+MAX_STEPS_PER_DAY = 8    # finest level allowed by default
+WEAK_ORDER = 1           # the Euler walk's bias halves with the step
+
+
+@dataclass
+class LevelStatistics:
+    level: int
+    step_days: float       # length of the fine walk's steps, in trading days
+    cost: int              # time steps per path, fine and coarse walks together
+    paths: int = 0
+    total: float = 0.0     # sums of the discounted P_l - P_(l-1) and its square
+    total_squares: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.paths
+
+    @property
+    def variance(self) -> float:
+        if self.paths < 2:
+            return math.inf
+        return max(self.total_squares - self.total ** 2 / self.paths, 0.0) / (self.paths - 1)
+
+
+@dataclass
+class MLMCResult:
+    price: float
+    standard_error: float
+    levels: list[LevelStatistics] = field(default_factory=list)
+    bias: float = math.nan  # estimated discretisation bias of the finest level, NaN with a single level
+    converged: bool = True  # False if the standard error or bias target was not reached
+
+    @property
+    def rmse(self) -> float:
+        return math.hypot(self.standard_error, 0.0 if math.isnan(self.bias) else self.bias)
+
+    @property
+    def cost(self) -> int:
+        """
+        Time steps simulated over every path of every level
+        """
+        return sum(level.paths * level.cost for level in self.levels)
+
+
+def level_grid(path_length: int, step_days: float) -> np.ndarray:
+    """
+    Times (trading days) a walk with steps of `step_days` stops at - multiples of the step, then expiry
+    """
+    return np.append(np.arange(0, path_length, step_days, dtype=np.float64), float(path_length))
+
+
+def level_steps(path_length: int, steps_per_day: int = 1) -> list[float]:
+    """
+    Step of every level in trading days, halving from a single step to expiry down to 1 / steps_per_day
+    at the finest
+    """
+    if steps_per_day < 1 or steps_per_day & (steps_per_day - 1):
+        raise ValueError(f"steps_per_day must be a power of 2, got {steps_per_day}")
+    coarsest = 2 ** math.ceil(math.log2(max(path_length, 1)))
+    return [coarsest / 2 ** l for l in range(int(math.log2(coarsest * steps_per_day)) + 1)]
+
+
+def _walk(mc, grid: np.ndarray, increments: np.ndarray, current_price: float, volatility) -> np.ndarray:
+    """
+    Log Euler walk over `grid` driven by the Brownian increments (steps x paths), the same scheme as
+    `MonteCarlo._steps_numpy` - local volatility is looked up at the start of each step
+    """
+    flat = isinstance(volatility, (float, int))
+    prices = np.empty((len(grid), increments.shape[1]))
+    prices[0] = current_price
+    for j, dt in enumerate(np.diff(grid) / 252):
+        lv = volatility if flat else mc.get_lv(grid[j] / 252, prices[j])
+        np.multiply(prices[j], np.exp((mc.r - lv ** 2 / 2) * dt + lv * increments[j]), out=prices[j + 1])
+    return prices
+
+
+def _settle(payoff: Payoff, grid: np.ndarray, prices: np.ndarray, current_price: float, path_length: int) -> np.ndarray:
+    """
+    Undiscounted payoff of every path, fed the daily closes - interpolated between steps longer than a day
+    """
+    days = np.arange(1, path_length + 1, dtype=np.float64)
+    i = np.clip(np.searchsorted(grid, days, side="right") - 1, 0, len(grid) - 2)
+    w = (days - grid[i]) / (grid[i + 1] - grid[i])
+    state = payoff.start(prices.shape[1], current_price, path_length)
+    for step, (j, weight) in enumerate(zip(i, w), start=1):
+        payoff.update(state, step, prices[j] if weight == 0 else prices[j] + (prices[j + 1] - prices[j]) * weight)
+    return payoff.settle(state)
+
+
+def _sample(mc, generator: np.random.Generator, level: LevelStatistics, current_price: float, volatility, payoff: Payoff, path_length: int, paths: int):
+    """
+    Simulate `paths` more discounted corrections on a level and add them to its statistics
+    """
+    fine_grid = level_grid(path_length, level.step_days)
+    fine_dt = np.diff(fine_grid) / 252
+    increments = generator.standard_normal((len(fine_dt), paths)) * np.sqrt(fine_dt)[:, None]
+    values = _settle(payoff, fine_grid, _walk(mc, fine_grid, increments, current_price, volatility), current_price, path_length)
+    if level.level > 0:
+        coarse_grid = level_grid(path_length, 2 * level.step_days)
+        # Every coarse step spans whole fine steps, its increment is their sum
+        coarse_increments = np.add.reduceat(increments, np.searchsorted(fine_grid, coarse_grid[:-1]), axis=0)
+        values -= _settle(payoff, coarse_grid, _walk(mc, coarse_grid, coarse_increments, current_price, volatility), current_price, path_length)
+    values *= np.exp(-mc.r * (path_length / 252))
+    level.paths += paths
+    level.total += float(values.sum())
+    level.total_squares += float(values @ values)
+    instrumentation.count("mc.paths", paths)
+    instrumentation.count("mc.path_steps", paths * level.cost)
+
+
+def optimal_paths(levels: list[LevelStatistics], epsilon: float) -> list[int]:
+    """
+    Paths per level minimising the cost of a standard error of epsilon, from the current variance estimates
+    """
+    weights = [math.sqrt(level.variance * level.cost) for level in levels]
+    return [math.ceil(math.sqrt(level.variance / level.cost) * sum(weights) / epsilon ** 2) for level in levels]
+
+
+def estimated_bias(levels: list[LevelStatistics]) -> float:
+    """
+    Bias of the finest level against the continuous time walk, from the means of the last two corrections
+    (Giles, 2008). NaN without a correction to estimate it from.
+    """
+    corrections = [level for level in levels if level.level > 0]
+    if not corrections:
+        return math.nan
+    rate = 2 ** WEAK_ORDER
+    last = abs(corrections[-1].mean)
+    if len(corrections) > 1:
+        last = max(last, abs(corrections[-2].mean) / rate)
+    return last / (rate - 1)
+
+
+@instrumentation.timed("mc.mlmc")
+def simulate_multilevel(
+    mc,
+    current_price: float,
+    volatility,
+    payoff: Payoff,
+    path_length: int,
+    epsilon: float,
+    max_steps_per_day: int = MAX_STEPS_PER_DAY,
+    pilot_paths: int = PILOT_PATHS,
+    seed=None,
+) -> MLMCResult:
+    """
+    Price a payoff to a target root mean square error, see the module docstring
+    Args
+        mc - MonteCarlo with the surface, and its local volatility computed unless `volatility` is flat
+        current_price, volatility, payoff, path_length - as for `MonteCarlo.simulate`
+        epsilon - target root mean square error of the price, sampling and discretisation error together
+        max_steps_per_day - steps per trading day of the finest level that may be added, a power of 2
+        pilot_paths - paths per level to estimate the variances from before the allocation
+        seed - anything np.random.SeedSequence takes, each level draws from its own stream
+    """
+    if epsilon <= 0:
+        raise ValueError(f"Target error must be positive, got {epsilon}")
+    steps = level_steps(path_length, max_steps_per_day)
+    levels = []
+    for l, step_days in enumerate(steps):
+        cost = len(level_grid(path_length, step_days)) - 1
+        if l > 0:
+            cost += len(level_grid(path_length, 2 * step_days)) - 1
+        levels.append(LevelStatistics(level=l, step_days=step_days, cost=cost))
+    generators = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(levels))]
+
+    def run(level, paths):
+        while paths > 0:
+            batch = min(paths, BATCH_PATHS)
+            _sample(mc, generators[level.level], level, current_price, volatility, payoff, path_length, batch)
+            paths -= batch
+
+    tolerance = epsilon / math.sqrt(2) # for the standard error and the bias each
+    active = levels[:min(MIN_LEVELS, len(levels))]
+    for level in active:
+        run(level, pilot_paths)
+    rounds = 0
+    while True:
+        extra = [max(target - level.paths, 0) for level, target in zip(active, optimal_paths(active, tolerance))]
+        if any(extra) and rounds < MAX_ROUNDS:
+            for level, paths in zip(active, extra):
+                run(level, paths)
+            rounds += 1
+            continue
+        bias = estimated_bias(active)
+        if any(extra) or not bias > tolerance or len(active) == len(levels):
+            break
+        active.append(levels[len(active)])
+        run(active[-1], pilot_paths)
+        rounds = 0
+
+    price = sum(level.mean for level in active)
+    standard_error = math.sqrt(sum(level.variance / level.paths for level in active))
+    converged = standard_error <= tolerance * 1.01 and not bias > tolerance
+    if not converged:
+        logger.warning(
+            "Multilevel Monte Carlo stopped short of epsilon %g: standard error %.3g, estimated bias %.3g over %d levels",
+            epsilon, standard_error, bias, len(active)
+        )
+    return MLMCResult(price=price, standard_error=standard_error, levels=active, bias=bias, converged=converged)
@@ -0,0 +1,85 @@
+"""
+Volatility surfaces in log-moneyness / total variance coordinates, re-anchored to a new spot without a rebuild.
+
+The grids `create_volatility_surface` and `MonteCarlo.local_volatility` produce are in absolute
+strikes, tied to the spot the chain was fetched at. Here the strike axis is ln(K / spot) and the
+implied vols are total variance w = IV^2 * T, so moving the spot is a change of anchor:
+
+    sticky moneyness - the smile moves with the spot. Log-moneyness, total variance and (Dupire local
+        volatility is homogeneous in spot and strike) the local volatility grid are all kept as is
+    sticky strike - every absolute strike keeps its implied vol. The log-moneyness axis shifts by
+        ln(S_old / S_new); the local volatility depends on the forward, so it is dropped and rebuilt
+        from the grid by finite differences
+
+Either way the cost is O(grid) - no refetch, IV solve or re-interpolation of the chain.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+
+import numpy as np
+
+STICKY_MONEYNESS = "sticky_moneyness"
+STICKY_STRIKE = "sticky_strike"
+MODES = (STICKY_MONEYNESS, STICKY_STRIKE)
+
+
+@dataclass(frozen=True)
+class MoneynessSurface:
+    spot: float
+    r: float
+    q: float
+    maturities: np.ndarray            # days
+    log_moneyness: np.ndarray         # ln(K / spot)
+    total_variance: np.ndarray        # IV^2 * years, log-moneyness x maturities
+    local_vol: np.ndarray | None = None
+
+    @classmethod
+    def from_grids(cls, maturities, strike_prices, implied_vol, spot: float, r: float = 0.035, q: float = 0, local_vol=None) -> "MoneynessSurface":
+        """
+        Args
+            maturities, strike_prices, implied_vol - the (strike x maturity) grids of `create_volatility_surface`
+            spot - the underlying price the surface was built at
+            local_vol - the LV grid on the same points, if built
+        """
+        maturities_1d = np.asarray(maturities, dtype=float)[0, :]
+        strikes_1d = np.asarray(strike_prices, dtype=float)[:, 0]
+        implied_vol = np.asarray(implied_vol, dtype=float)
+        return cls(
+            spot=float(spot),
+            r=r,
+            q=q,
+            maturities=maturities_1d,
+            log_moneyness=np.log(strikes_1d / spot),
+            total_variance=implied_vol ** 2 * (maturities_1d / 365),
+            local_vol=local_vol,
+        )
+
+    @property
+    def strikes(self) -> np.ndarray:
+        return self.spot * np.exp(self.log_moneyness)
+
+    @property
+    def implied_vol(self) -> np.ndarray:
+        years = self.maturities / 365
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(np.where(years > 0, self.total_variance / years, np.nan))
+
+    def to_grids(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (maturities, strike_prices, implied_vol) grids in absolute strikes at this surface's spot
+        """
+        strike_prices, maturities = np.meshgrid(self.strikes, self.maturities, indexing="ij")
+        return maturities, strike_prices, self.implied_vol
+
+    def reanchor(self, spot: float, mode: str = STICKY_MONEYNESS) -> "MoneynessSurface":
+        """
+        The surface at a new spot, see the module docstring for the two modes
+        """
+        if spot <= 0:
+            raise ValueError(f"Spot must be positive, got {spot}")
+        if mode == STICKY_MONEYNESS:
+            return replace(self, spot=float(spot))
+        if mode == STICKY_STRIKE:
+            return replace(self, spot=float(spot), log_moneyness=self.log_moneyness + np.log(self.spot / spot), local_vol=None)
+        raise ValueError(f"Unknown re-anchoring mode {mode!r}, expected one of {MODES}")
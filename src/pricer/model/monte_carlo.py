@@ -1,5 +1,33 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, Sequence
+
 import numpy as np
-from scipy.interpolate import RegularGridInterpolator, NearestNDInterpolator
+
+from pricer._lazy import lazy_import
+from pricer.data.surface_store import SurfaceSnapshot
+from pricer.instrumentation import instrumentation
+from pricer.model import mlmc
+from pricer.model.heston import HestonParameters
+from pricer.model.importance import ShiftedNormals, optimal_drift_shift
+from pricer.model.moneyness import STICKY_MONEYNESS, MoneynessSurface
+from pricer.model.payoffs import ArithmeticAsian, Payoff
+
+interpolate = lazy_import("scipy.interpolate")
+numba_kernels = lazy_import("pricer.model.numba_kernels")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SimulationResult:
+    prices: np.ndarray           # discounted price per payoff, in the order the payoffs were given
+    standard_errors: np.ndarray  # standard error of each price
+    paths: np.ndarray            # the first MAX_DISPLAY_AMT simulated paths, including the starting price
+
 
 class MonteCarlo:
     def __init__(self, maturities: list[list[float]], strike_prices: list[list[float]], implied_vol: list[list[float]], asset_price: float, q: float = 0, r: float = 0.035):
@@ -7,79 +35,287 @@ class MonteCarlo:
         self.max_maturity: float =  maturities[0][-1] / 365
         self.min_strike: float=  strike_prices[0][0]
         self.max_strike: float=  strike_prices[-1][0]
-        self.maturities = np.array(maturities)
-        self.strike_prices = np.array(strike_prices)
-        self.implied_vol = np.array(implied_vol)
+        self.maturities = np.asarray(maturities) # asarray - memory-mapped snapshot grids are used without copying
+        self.strike_prices = np.asarray(strike_prices)
+        self.implied_vol = np.asarray(implied_vol)
         self.asset_price = asset_price # latest underlying asset price
         self.r = r # risk free rate
         self.q = q # dividend yield
 
-        # np.savetxt("maturities.csv", self.maturities)
-        # np.savetxt("strike_prices.csv", self.strike_prices)
-        # np.savetxt("implied_vol.csv", self.implied_vol)
-        print(self.min_maturity, self.max_maturity, self.min_strike, self.max_strike)
+        logger.debug("Surface bounds - maturity: [%s, %s], strike: [%s, %s]", self.min_maturity, self.max_maturity, self.min_strike, self.max_strike)
 
         self.lv_surface = None
+        self.lv_raw = None
         self.MAX_DISPLAY_AMT = 200
 
+    @classmethod
+    def from_snapshot(cls, snapshot: SurfaceSnapshot) -> "MonteCarlo":
+        """
+        Build from a stored surface. Memory-mapped grids are not copied and a stored LV grid is used
+        as is, so many workers can price off one snapshot without rebuilding the surface.
+        """
+        mc = cls(snapshot.maturities, snapshot.strike_prices, snapshot.implied_vol, snapshot.spot, q=snapshot.q, r=snapshot.r)
+        if snapshot.local_vol is not None:
+            mc.set_local_volatility(snapshot.local_vol)
+        return mc
+
+    def to_snapshot(self, ticker: str, timestamp: datetime | None = None) -> SurfaceSnapshot:
+        return SurfaceSnapshot(
+            ticker=ticker,
+            spot=self.asset_price,
+            r=self.r,
+            q=self.q,
+            timestamp=timestamp or datetime.now(),
+            maturities=self.maturities,
+            strike_prices=self.strike_prices,
+            implied_vol=self.implied_vol,
+            local_vol=self.lv_raw,
+        )
+
+    @classmethod
+    def from_moneyness(cls, surface: MoneynessSurface) -> "MonteCarlo":
+        """
+        Build from a surface in log-moneyness / total variance coordinates, anchored at its spot
+        """
+        mc = cls(*surface.to_grids(), surface.spot, q=surface.q, r=surface.r)
+        if surface.local_vol is not None:
+            mc.set_local_volatility(surface.local_vol)
+        return mc
+
+    def moneyness_surface(self) -> MoneynessSurface:
+        return MoneynessSurface.from_grids(self.maturities, self.strike_prices, self.implied_vol, self.asset_price, self.r, self.q, self.lv_raw)
+
+    def reanchor(self, spot: float, mode: str = STICKY_MONEYNESS) -> "MonteCarlo":
+        """
+        A model on this surface moved to a new spot, in O(grid) time (see `pricer.model.moneyness`)
+        Args
+            spot - the new underlying price, simulations should start from it
+            mode - "sticky_moneyness": strikes scale with the spot and the implied and local vol grids are reused as is.
+                "sticky_strike": every strike keeps its implied vol, the local volatility (if built) is recomputed from the grid
+        """
+        mc = MonteCarlo.from_moneyness(self.moneyness_surface().reanchor(spot, mode))
+        if self.lv_raw is not None and mc.lv_raw is None:
+            mc.local_volatility()
+        instrumentation.count(f"mc.reanchor.{mode}")
+        return mc
+
+    def set_local_volatility(self, local_volatility: np.ndarray) -> interpolate.RegularGridInterpolator:
+        """
+        Set up an interpolater over a (strike, maturity) LV grid to be able to query the surface for all possible values
+        """
+        maturities_1d = self.maturities[0, :] / 365
+        strike_prices_1d = self.strike_prices[:, 0]
+        self.lv_raw = local_volatility
+        self.lv_surface = interpolate.RegularGridInterpolator((strike_prices_1d, maturities_1d), local_volatility, bounds_error=False)
+        return self.lv_surface
+
+    @instrumentation.timed("mc.simple_random_walk")
     def simple_random_walk(
         self,
         current_price: float,
-        volatility: float | RegularGridInterpolator,
+        volatility: float | interpolate.RegularGridInterpolator | HestonParameters,
         strike: float,
         typ: str,
         path_length: int,
-        iterations: int = 1000
+        iterations: int = 1000,
+        dtype: np.dtype = np.float64,
+        seed: int | None = None,
+        backend: str = "auto",
+        drift_shift: np.ndarray | None = None
     ):
         """
+        Arithmetic average Asian option, see `simulate` for the arguments
         Args
-            currrent_price - the price of the asset at the start of the path
-            volatility - used to caculate the next price in the path. If float, is constant. If interpolater, is local volatility
             strike - the strike price of the option
             typ - the type of option; either CALL or PUT
-            path_length - how long to walk down each path
-            iterations - how many paths to walk
         Assumption
             Observation/Fixing/Reset dates are daily EOD
+        Returns
+            price, the first MAX_DISPLAY_AMT paths, standard error of the price
+        """
+        result = self.simulate(current_price, volatility, [ArithmeticAsian(strike, typ)], path_length, iterations, dtype, seed, backend, drift_shift)
+        return result.prices[0], result.paths, result.standard_errors[0]
+
+    @instrumentation.timed("mc.simulate")
+    def simulate(
+        self,
+        current_price: float,
+        volatility: float | interpolate.RegularGridInterpolator | HestonParameters,
+        payoffs: Sequence[Payoff],
+        path_length: int,
+        iterations: int = 1000,
+        dtype: np.dtype = np.float64,
+        seed: int | None = None,
+        backend: str = "auto",
+        drift_shift: np.ndarray | None = None
+    ) -> SimulationResult:
+        """
+        Price every payoff off one set of simulated paths. Each path is walked once, the payoffs update
+        their running statistics from the prices of every step (see `pricer.model.payoffs`).
+        Args
+            currrent_price - the price of the asset at the start of the path
+            volatility - used to caculate the next price in the path. If float, is constant. If interpolater, is local volatility.
+                If HestonParameters, the variance follows the Heston process (full truncation Euler)
+            payoffs - the products to price, all expiring at the end of the path
+            path_length - how long to walk down each path, in trading days
+            iterations - how many paths to walk
+            dtype - precision of the simulated paths. np.float32 halves the memory traffic of the path generation,
+                LV lookup and exp update; payoff statistics are always accumulated in float64
+            seed - seed for the random number generator, anything np.random.default_rng takes e.g. a SeedSequence
+            backend - "numba" runs each time step as one fused compiled loop, "numpy" as array operations,
+                "auto" uses numba when it is installed. Both draw the same random numbers.
+            drift_shift - importance sampling: each step's normals are drawn from N(drift_shift[step], 1) and every path
+                weighted by its likelihood ratio, e.g. `optimal_drift_shift` for a deep out of the money payoff.
+                The paths returned are the shifted ones
+        """
+        instrumentation.count("mc.paths", iterations)
+        instrumentation.count("mc.path_steps", iterations * path_length)
+        generator = np.random.default_rng(seed)
+        if drift_shift is not None:
+            if isinstance(volatility, HestonParameters):
+                raise ValueError("Importance sampling is not supported under Heston")
+            if len(drift_shift) != path_length:
+                raise ValueError(f"Expected a drift shift per step ({path_length}), got {len(drift_shift)}")
+            generator = ShiftedNormals(generator, drift_shift, iterations)
+        dtype = np.dtype(dtype)
+        backend = numba_kernels.resolve_backend(backend)
+        if isinstance(volatility, HestonParameters):
+            steps = self._steps_heston(generator, current_price, volatility, path_length, iterations, dtype)
+        elif backend == "numba" and (isinstance(volatility, (float, int)) or self.lv_raw is not None):
+            steps = self._steps_numba(generator, current_price, volatility, path_length, iterations, dtype)
+        else:
+            steps = self._steps_numpy(generator, current_price, volatility, path_length, iterations, dtype)
+
+        states = [payoff.start(iterations, current_price, path_length) for payoff in payoffs]
+        prices_archive = np.empty((min(iterations, self.MAX_DISPLAY_AMT), path_length+1), dtype=dtype)
+        prices_archive[:, 0] = current_price
+        for step, prices in enumerate(steps, start=1):
+            prices_archive[:, step] = prices[:prices_archive.shape[0]]
+            for payoff, state in zip(payoffs, states):
+                payoff.update(state, step, prices)
+
+        discount = np.exp(-self.r * (path_length / 252))
+        if drift_shift is not None:
+            discount = discount * generator.weights # likelihood ratio per path
+        prices, standard_errors = np.empty(len(payoffs)), np.empty(len(payoffs))
+        for j, (payoff, state) in enumerate(zip(payoffs, states)):
+            discounted_payoffs = payoff.settle(state) * discount
+            prices[j] = np.mean(discounted_payoffs)
+            standard_errors[j] = np.std(discounted_payoffs, ddof=1) / np.sqrt(iterations) # sample standard deviation
+        return SimulationResult(prices=prices, standard_errors=standard_errors, paths=prices_archive)
+
+    def optimal_drift_shift(self, current_price: float, volatility: float | interpolate.RegularGridInterpolator, payoff: Payoff, path_length: int) -> np.ndarray:
+        """
+        Drift shift for `simulate` that makes `payoff` pay on most paths, see `pricer.model.importance`
+        """
+        return optimal_drift_shift(self, current_price, volatility, payoff, path_length)
+
+    def simulate_multilevel(
+        self,
+        current_price: float,
+        volatility: float | interpolate.RegularGridInterpolator,
+        payoff: Payoff,
+        path_length: int,
+        epsilon: float,
+        max_steps_per_day: int = mlmc.MAX_STEPS_PER_DAY,
+        seed: int | None = None,
+    ) -> mlmc.MLMCResult:
+        """
+        Multilevel Monte Carlo price of one payoff to a target root mean square error `epsilon`, split between the
+        standard error and the time discretisation bias. The paths per level are chosen from estimated variances and
+        finer levels are added until the bias is small enough (see `pricer.model.mlmc`). Far fewer time steps than
+        `simulate` needs for the same standard error, as most paths take a handful of coarse steps rather than one per day.
+        Args
+            max_steps_per_day - finest level allowed, in steps per trading day, a power of 2
+        """
+        return mlmc.simulate_multilevel(self, current_price, volatility, payoff, path_length, epsilon, max_steps_per_day, seed=seed)
+
+    def _steps_numpy(self, generator: np.random.Generator, current_price: float, volatility: float | interpolate.RegularGridInterpolator, path_length: int, iterations: int, dtype: np.dtype) -> Iterator[np.ndarray]:
+        """
+        Yields the prices of every path after each step. Only two price vectors are kept, the yielded one is overwritten two steps later.
         """
-        generator = np.random.default_rng()
         time_delta = 1 / 252
-        prices_archive = []
+        # Typed scalars so that float32 arrays are not promoted back to float64
+        r = dtype.type(self.r)
+        dt = dtype.type(time_delta)
+        sqrt_dt = dtype.type(np.sqrt(time_delta))
 
-        prices = np.empty((iterations, path_length+1))
-        prices[:, 0] = current_price
+        prev = np.full(iterations, current_price, dtype=dtype)
+        out = np.empty_like(prev)
 
         time_elapsed = 0
         for i in range(path_length):
             # Get current volatility (current time and price)
             if isinstance(volatility, (float, int)):
-                lv = volatility
+                lv = dtype.type(volatility)
             else:
-                lv = self.get_lv(time_elapsed, prices[:, i])
+                lv = self.get_lv(time_elapsed, prev).astype(dtype, copy=False)
             # Generate and update vars
-            random_var = generator.standard_normal(size=iterations)
+            random_var = generator.standard_normal(size=iterations, dtype=dtype)
             time_elapsed += time_delta
             # Form up Geometric Brownian terms
             itos_correction = (lv**2) / 2
-            drift_term = (self.r - itos_correction) * time_delta
-            shock_term = lv * random_var * np.sqrt(time_delta)
+            drift_term = (r - itos_correction) * dt
+            shock_term = lv * random_var * sqrt_dt
             # Calculate new price
-            prices[:, i+1] =  prices[:, i] * np.exp(drift_term + shock_term)
+            np.multiply(prev, np.exp(drift_term + shock_term), out=out)
+            yield out
+            prev, out = out, prev
 
-        average_price = np.mean(prices[:, 1:], axis=1)
-        prices_archive = prices[:self.MAX_DISPLAY_AMT, :].copy()
-        if typ == "call":
-            payoffs = np.maximum(0, average_price - strike)
-        else:
-            payoffs = np.maximum(0, strike - average_price)
+    def _steps_numba(self, generator: np.random.Generator, current_price: float, volatility: float | interpolate.RegularGridInterpolator, path_length: int, iterations: int, dtype: np.dtype) -> Iterator[np.ndarray]:
+        """
+        Same walk as `_steps_numpy` with each step fused into one compiled kernel
+        """
+        time_delta = 1 / 252
+        sqrt_dt = np.sqrt(time_delta)
+        flat = isinstance(volatility, (float, int))
+        if not flat:
+            k_axis = np.ascontiguousarray(self.strike_prices[:, 0], dtype=np.float64)
+            t_axis = np.ascontiguousarray(self.maturities[0, :] / 365, dtype=np.float64)
+            lv_grid = np.ascontiguousarray(self.lv_raw, dtype=np.float64)
+
+        prev = np.full(iterations, current_price, dtype=dtype)
+        out = np.empty_like(prev)
+
+        time_elapsed = 0
+        for i in range(path_length):
+            random_var = generator.standard_normal(size=iterations, dtype=dtype)
+            if flat:
+                numba_kernels.flat_vol_step(prev, out, random_var, float(volatility), self.r, time_delta, sqrt_dt)
+            else:
+                clamped_t = min(max(time_elapsed, self.min_maturity), self.max_maturity)
+                numba_kernels.local_vol_step(
+                    prev, out, random_var, clamped_t, k_axis, t_axis, lv_grid,
+                    float(self.min_strike), float(self.max_strike), self.r, time_delta, sqrt_dt
+                )
+            time_elapsed += time_delta
+            yield out
+            prev, out = out, prev
+
+    def _steps_heston(self, generator: np.random.Generator, current_price: float, params: HestonParameters, path_length: int, iterations: int, dtype: np.dtype) -> Iterator[np.ndarray]:
+        """
+        Heston paths with full truncation Euler for the variance - negative variances are floored at 0
+        wherever they feed back into the drift, diffusion and asset price. The asset drifts at r - q, the
+        forward `HestonModel` prices and calibrates against
+        """
+        time_delta = 1 / 252
+        sqrt_dt = np.sqrt(time_delta)
+        drift = self.r - self.q
+        rho_complement = np.sqrt(1 - params.rho ** 2)
 
-        discounted_payoffs = payoffs * np.exp(-self.r * (path_length / 252))
+        prev = np.full(iterations, current_price, dtype=dtype)
+        out = np.empty_like(prev)
+        variance = np.full(iterations, params.v0, dtype=dtype)
 
-        std_dev = np.std(discounted_payoffs, ddof=1) # Sample standard deviation
-        standard_error = std_dev / np.sqrt(iterations)
-        payoff = np.mean(discounted_payoffs)
-        # print(payoff, np.array(prices_archive), standard_error)
-        return payoff, np.array(prices_archive), standard_error
+        for i in range(path_length):
+            asset_shock = generator.standard_normal(size=iterations, dtype=dtype)
+            variance_shock = params.rho * asset_shock + rho_complement * generator.standard_normal(size=iterations, dtype=dtype)
+            positive_variance = np.maximum(variance, 0)
+            vol = np.sqrt(positive_variance)
+            out[:] = prev * np.exp((drift - positive_variance / 2) * time_delta + vol * asset_shock * sqrt_dt)
+            variance = variance + params.kappa * (params.theta - positive_variance) * time_delta + params.sigma * vol * variance_shock * sqrt_dt
+            yield out
+            prev, out = out, prev
 
     def get_lv(self, t: float, k: np.ndarray) -> float:
         clamped_t = np.clip(t, self.min_maturity, self.max_maturity)
@@ -90,6 +326,7 @@ class MonteCarlo:
         # print("lv: ", val, "t: ", t, "k: ", k, " clamped_t: ", clamped_t, " clamped_k: ", clamped_k)
         return val
 
+    @instrumentation.timed("lv.local_volatility")
     def local_volatility(self):
         """
         Args
@@ -147,14 +384,14 @@ class MonteCarlo:
         variance = numerator / denominator
         # 8. The result is variance, square root it to get volatility
         variance = np.where(variance<0, self.implied_vol**2, variance)
-        np.savetxt('var.csv', variance)
         local_volatility = np.pow(variance, 0.5)
         # 9. Interpolate nan values away
         mask_invalid = np.isnan(local_volatility)
         mask_valid = ~mask_invalid
 
         if np.any(mask_invalid):
-            print(f"Fixed {np.sum(mask_invalid)} NaN values in Local Vol surface.")
+            logger.info("Fixed %s NaN values in Local Vol surface.", np.sum(mask_invalid))
+            instrumentation.count("lv.nan_filled", int(np.sum(mask_invalid)))
             
             # 2. Get coordinates for valid data
             # We use meshgrid to generate (Strike, Maturity) coordinates for every point
@@ -167,7 +404,7 @@ class MonteCarlo:
             
             # 3. Train a "Filler" interpolator
             # NearestNDInterpolator: extends valid edges into the void
-            filler = NearestNDInterpolator(valid_coords, valid_values)
+            filler = interpolate.NearestNDInterpolator(valid_coords, valid_values)
             
             # 4. Fill the holes
             # Get coordinates of INVALID points
@@ -178,20 +415,5 @@ class MonteCarlo:
             
             # Update the main matrix
             local_volatility[mask_invalid] = filled_values
-        np.savetxt('local_volatility.csv', local_volatility)
-        self.lv_raw = local_volatility
         # 10. Set up an interpolater to be able to query the surface for all possible values
-        local_volatility_interpolater = RegularGridInterpolator((strike_prices_1d, maturities_1d), local_volatility, bounds_error=False)
-        self.lv_surface = local_volatility_interpolater
-        return local_volatility_interpolater
-
-# m = np.loadtxt("maturities.csv")
-# k = np.loadtxt("strike_prices.csv")
-# iv = np.loadtxt("implied_vol.csv")
-# s = 271.01
-# q = 0
-# r = 0.035
-# m = MonteCarlo(m,k,iv,s,q,r)
-# m.local_volatility()
-# px, _, std_err = m.simple_random_walk(current_price=271.01,volatility=0.25,strike=284.56,typ="call",path_length=30, iterations=10000)
-# print(px, std_err)
+        return self.set_local_volatility(local_volatility)
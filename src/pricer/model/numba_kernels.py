@@ -0,0 +1,146 @@
+"""
+Optional Numba-compiled kernels for the Monte Carlo time step and the IV solve.
+
+Numba is not a hard dependency. When it is missing `NUMBA_AVAILABLE` is False, `resolve_backend("auto")`
+picks "numpy" and callers keep using the pure NumPy code paths.
+
+The MC kernels fuse everything done to a path within one time step - LV lookup (bilinear, identical to a
+linear `RegularGridInterpolator` on clamped inputs), the Ito drift, the shock and the exp update - into a
+single parallel pass without full-array temporaries. Payoffs accumulate their own statistics from the
+prices each step writes.
+Random numbers are still drawn by the caller's NumPy generator, so both backends walk the same paths.
+"""
+import math
+import os
+
+try:
+    from numba import config, njit, prange
+    NUMBA_AVAILABLE = True
+    # The kernels are launched from worker threads (background simulations, the pricing service). TBB
+    # hangs interpreter exit when it was first started off the main thread and workqueue aborts on
+    # concurrent launches, so OpenMP goes first unless the environment picks a layer
+    if "NUMBA_THREADING_LAYER" not in os.environ and "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+BACKENDS = ("auto", "numpy", "numba")
+
+
+def resolve_backend(backend: str) -> str:
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "auto":
+        return "numba" if NUMBA_AVAILABLE else "numpy"
+    if backend == "numba" and not NUMBA_AVAILABLE:
+        raise ImportError("The numba backend needs numba installed (pip install numba), or use backend='numpy'")
+    return backend
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _search(axis, x):
+        """
+        Index i of the grid cell [axis[i], axis[i+1]] holding x, x is expected to be clamped to the axis
+        """
+        lo, hi = 0, axis.shape[0] - 1
+        if x >= axis[hi]:
+            return hi - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if axis[mid] <= x:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+    @njit(cache=True)
+    def _bilinear(k_axis, t_axis, values, k, t):
+        i = _search(k_axis, k)
+        j = _search(t_axis, t)
+        wk = (k - k_axis[i]) / (k_axis[i + 1] - k_axis[i])
+        wt = (t - t_axis[j]) / (t_axis[j + 1] - t_axis[j])
+        return ((1 - wk) * (1 - wt) * values[i, j] + wk * (1 - wt) * values[i + 1, j]
+                + (1 - wk) * wt * values[i, j + 1] + wk * wt * values[i + 1, j + 1])
+
+    @njit(parallel=True, cache=True)
+    def local_vol_step(prev, out, z, t, k_axis, t_axis, values, min_k, max_k, r, dt, sqrt_dt):
+        """
+        One Euler step of the local vol GBM for every path; t must already be clamped to the maturity axis
+        """
+        for p in prange(prev.shape[0]):
+            k = min(max(prev[p], min_k), max_k)
+            lv = _bilinear(k_axis, t_axis, values, k, t)
+            out[p] = prev[p] * math.exp((r - lv * lv / 2) * dt + lv * z[p] * sqrt_dt)
+
+    @njit(parallel=True, cache=True)
+    def flat_vol_step(prev, out, z, vol, r, dt, sqrt_dt):
+        drift = (r - vol * vol / 2) * dt
+        for p in prange(prev.shape[0]):
+            out[p] = prev[p] * math.exp(drift + vol * z[p] * sqrt_dt)
+
+    @njit(cache=True)
+    def _ndtr(x):
+        return 0.5 * math.erfc(-x / math.sqrt(2.0))
+
+    @njit(cache=True)
+    def _bs_price(S, d, K, T, r, sigma, is_call):
+        sqrt_t = math.sqrt(T)
+        d1 = (math.log(S / K) + (r - d + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+        d2 = d1 - sigma * sqrt_t
+        if is_call:
+            return S * math.exp(-d * T) * _ndtr(d1) - K * math.exp(-r * T) * _ndtr(d2)
+        return K * math.exp(-r * T) * _ndtr(-d2) - S * math.exp(-d * T) * _ndtr(-d1)
+
+    @njit(cache=True)
+    def _bs_vega(S, d, K, T, r, sigma):
+        sqrt_t = math.sqrt(T)
+        d1 = (math.log(S / K) + (r - d + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+        return S * sqrt_t * math.exp(-d * T) * math.exp(-0.5 * d1 ** 2) / math.sqrt(2 * math.pi)
+
+    @njit(parallel=True, cache=True)
+    def implied_volatility_kernel(
+        idx, S, d, opt_px, K, T, r, is_call, sigma_guess, iv, status, iterations,
+        max_iterations, newton_tolerance, bisection_tolerance, min_vega, sigma_lower_limit, sigma_upper_limit,
+        status_newton, status_bisection, status_not_converged
+    ):
+        """
+        Newton - Raphson with a bisection fall back for the contracts in idx, same steps and
+        tolerances as `implied_volatility._newton_raphson` / `_bisection`
+        """
+        for n in prange(idx.shape[0]):
+            i = idx[n]
+            sigma = sigma_guess
+            solved = False
+            for _ in range(max_iterations):
+                iterations[i] += 1
+                vega = _bs_vega(S[i], d[i], K[i], T[i], r[i], sigma)
+                if abs(vega) < min_vega:
+                    break
+                implied_price = _bs_price(S[i], d[i], K[i], T[i], r[i], sigma, is_call[i])
+                implied_sigma = (opt_px[i] - implied_price + vega * sigma) / vega
+                if not implied_sigma > 0:
+                    break
+                if abs(sigma - implied_sigma) <= newton_tolerance:
+                    iv[i] = implied_sigma
+                    status[i] = status_newton
+                    solved = True
+                    break
+                sigma = implied_sigma
+            if solved:
+                continue
+            sigma_lower, sigma_upper = sigma_lower_limit, sigma_upper_limit
+            status[i] = status_not_converged
+            for _ in range(max_iterations):
+                iterations[i] += 1
+                sigma_mid = (sigma_lower + sigma_upper) / 2
+                implied_price = _bs_price(S[i], d[i], K[i], T[i], r[i], sigma_mid, is_call[i])
+                if abs(implied_price - opt_px[i]) < bisection_tolerance:
+                    iv[i] = sigma_mid
+                    status[i] = status_bisection
+                    break
+                if implied_price < opt_px[i]:
+                    sigma_lower = sigma_mid
+                elif implied_price > opt_px[i]:
+                    sigma_upper = sigma_mid
@@ -0,0 +1,200 @@
+"""
+Payoffs evaluated on the fly from simulated paths.
+
+`MonteCarlo.simulate` walks the paths once and, at every time step, hands the new prices to each payoff.
+A payoff only keeps the per path statistics it needs - a running sum, product (as a sum of logs),
+minimum, maximum or barrier flag - so any number of products can be priced off one simulation, each
+adding a vector update per step rather than a simulation of its own.
+
+A payoff implements
+    start(iterations, current_price, path_length) -> state     before the first step
+    update(state, step, prices)                                 after every step, step = 1 .. path_length
+    settle(state) -> np.ndarray                                 undiscounted payoff per path at expiry
+`prices` is a buffer the simulation reuses, so payoffs must copy anything they want to keep.
+Statistics are accumulated in float64 whatever the precision of the paths.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def _vanilla(underlying: np.ndarray, strike, typ: str) -> np.ndarray:
+    if typ == "call":
+        return np.maximum(0, underlying - strike)
+    return np.maximum(0, strike - underlying)
+
+
+class Payoff(ABC):
+    def start(self, iterations: int, current_price: float, path_length: int) -> dict:
+        return {}
+
+    @abstractmethod
+    def update(self, state: dict, step: int, prices: np.ndarray):
+        ...
+
+    @abstractmethod
+    def settle(self, state: dict) -> np.ndarray:
+        ...
+
+
+@dataclass
+class European(Payoff):
+    strike: float
+    typ: str
+
+    def start(self, iterations, current_price, path_length):
+        return {"last": np.full(iterations, current_price, dtype=np.float64), "path_length": path_length}
+
+    def update(self, state, step, prices):
+        if step == state["path_length"]:
+            state["last"][:] = prices
+
+    def settle(self, state):
+        return _vanilla(state["last"], self.strike, self.typ)
+
+
+@dataclass
+class ArithmeticAsian(Payoff):
+    """
+    Average of every daily close after the start of the path
+    """
+    strike: float
+    typ: str
+
+    def start(self, iterations, current_price, path_length):
+        return {"sum": np.zeros(iterations, dtype=np.float64), "count": path_length}
+
+    def update(self, state, step, prices):
+        state["sum"] += prices
+
+    def settle(self, state):
+        return _vanilla(state["sum"] / state["count"], self.strike, self.typ)
+
+
+@dataclass
+class GeometricAsian(Payoff):
+    strike: float
+    typ: str
+
+    def start(self, iterations, current_price, path_length):
+        return {"log_sum": np.zeros(iterations, dtype=np.float64), "count": path_length}
+
+    def update(self, state, step, prices):
+        state["log_sum"] += np.log(prices)
+
+    def settle(self, state):
+        return _vanilla(np.exp(state["log_sum"] / state["count"]), self.strike, self.typ)
+
+
+@dataclass
+class FixedScheduleAsian(Payoff):
+    """
+    Arithmetic average over the fixing dates only, given as steps (trading days) from the start, 1 .. path_length
+    """
+    strike: float
+    typ: str
+    fixings: tuple[int, ...]
+
+    def start(self, iterations, current_price, path_length):
+        fixings = np.unique(np.asarray(self.fixings, dtype=int))
+        if fixings.size == 0 or fixings[0] < 1 or fixings[-1] > path_length:
+            raise ValueError(f"Fixings must be steps between 1 and {path_length}, got {self.fixings}")
+        is_fixing = np.zeros(path_length + 1, dtype=bool)
+        is_fixing[fixings] = True
+        return {"sum": np.zeros(iterations, dtype=np.float64), "is_fixing": is_fixing, "count": fixings.size}
+
+    def update(self, state, step, prices):
+        if state["is_fixing"][step]:
+            state["sum"] += prices
+
+    def settle(self, state):
+        return _vanilla(state["sum"] / state["count"], self.strike, self.typ)
+
+
+@dataclass
+class Lookback(Payoff):
+    """
+    strike None is a floating strike lookback - a call pays S_T - min(S), a put max(S) - S_T.
+    Otherwise fixed strike - a call pays max(S) - K, a put K - min(S).
+    Extremes include the starting price and are observed at the daily closes.
+    """
+    typ: str
+    strike: float | None = None
+
+    def start(self, iterations, current_price, path_length):
+        return {
+            "min": np.full(iterations, current_price, dtype=np.float64),
+            "max": np.full(iterations, current_price, dtype=np.float64),
+            "last": np.full(iterations, current_price, dtype=np.float64),
+            "path_length": path_length,
+        }
+
+    def update(self, state, step, prices):
+        np.minimum(state["min"], prices, out=state["min"])
+        np.maximum(state["max"], prices, out=state["max"])
+        if step == state["path_length"]:
+            state["last"][:] = prices
+
+    def settle(self, state):
+        if self.strike is None:
+            return state["last"] - state["min"] if self.typ == "call" else state["max"] - state["last"]
+        return _vanilla(state["max"] if self.typ == "call" else state["min"], self.strike, self.typ)
+
+
+@dataclass
+class Barrier(Payoff):
+    """
+    European option that is knocked in or out once a daily close touches the barrier. The barrier is
+    an up barrier when above the starting price, a down barrier when below.
+    """
+    strike: float
+    typ: str
+    barrier: float
+    knock: str = "out"
+
+    def start(self, iterations, current_price, path_length):
+        if self.knock not in ("in", "out"):
+            raise ValueError(f"Unknown knock {self.knock!r}, expected 'in' or 'out'")
+        return {
+            "up": self.barrier > current_price,
+            "hit": np.zeros(iterations, dtype=bool),
+            "last": np.full(iterations, current_price, dtype=np.float64),
+            "path_length": path_length,
+        }
+
+    def update(self, state, step, prices):
+        state["hit"] |= (prices >= self.barrier) if state["up"] else (prices <= self.barrier)
+        if step == state["path_length"]:
+            state["last"][:] = prices
+
+    def settle(self, state):
+        alive = state["hit"] if self.knock == "in" else ~state["hit"]
+        return np.where(alive, _vanilla(state["last"], self.strike, self.typ), 0.0)
+
+
+@dataclass
+class ControlVariate(Payoff):
+    """
+    A payoff with a correlated control whose expected (undiscounted) payoff is known, e.g. a geometric Asian for an
+    arithmetic one (`pricer.model.asian_analytic.control_variate`). Settles to payoff - beta * (control - control_mean)
+    with the variance minimising beta estimated from the same paths - the price is unchanged, the variance drops by
+    the squared correlation of the two.
+    """
+    payoff: Payoff
+    control: Payoff
+    control_mean: float
+
+    def start(self, iterations, current_price, path_length):
+        return {"payoff": self.payoff.start(iterations, current_price, path_length), "control": self.control.start(iterations, current_price, path_length)}
+
+    def update(self, state, step, prices):
+        self.payoff.update(state["payoff"], step, prices)
+        self.control.update(state["control"], step, prices)
+
+    def settle(self, state):
+        values = self.payoff.settle(state["payoff"])
+        control = self.control.settle(state["control"]) - self.control_mean
+        variance = np.var(control)
+        beta = np.mean((values - values.mean()) * control) / variance if variance > 0 else 0.0
+        return values - beta * control
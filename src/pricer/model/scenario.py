@@ -0,0 +1,214 @@
+"""
+Scenario and stress revaluation of option chains and Monte Carlo priced products.
+
+A ScenarioGrid is the product of spot, parallel vol, skew and rate shocks. `revalue_chain` prices
+every contract under every scenario in one broadcast Black-Scholes evaluation - an array shaped
+(spots, vols, skews, rates, contracts) - instead of one model object or solve per contract and shock.
+Shocked vols are sticky strike: each contract keeps its own implied vol, moved by
+    vol_shock + skew_shock * ln(K / S0)
+so a negative skew shock steepens the put wing.
+
+`revalue_monte_carlo` reruns `MonteCarlo.simulate` per scenario with the same seed, i.e. common random
+numbers, so differences between scenarios are not swamped by simulation noise, and reuses the local
+volatility grid already computed for the surface - shocking it rather than rebuilding it.
+"""
+from __future__ import annotations
+
+import copy
+import itertools
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from pricer._lazy import lazy_import
+from pricer.instrumentation import instrumentation
+from pricer.model.payoffs import Payoff
+
+special = lazy_import("scipy.special")
+
+MIN_VOL = 1e-4 # shocked vols are floored here so deep negative shocks stay priceable
+
+
+@dataclass
+class ScenarioGrid:
+    spot_shocks: Sequence[float] = (0.0,)   # relative moves of the underlying, 0.1 is +10%
+    vol_shocks: Sequence[float] = (0.0,)    # parallel shifts in vol, 0.01 is +1 vol point
+    skew_shocks: Sequence[float] = (0.0,)   # vol added per unit of log-moneyness ln(K / S0)
+    rates: Sequence[float] | None = None    # absolute risk free rates, None keeps each contract's own
+
+    def __post_init__(self):
+        self.spot_shocks = np.atleast_1d(np.asarray(self.spot_shocks, dtype=float))
+        self.vol_shocks = np.atleast_1d(np.asarray(self.vol_shocks, dtype=float))
+        self.skew_shocks = np.atleast_1d(np.asarray(self.skew_shocks, dtype=float))
+        if self.rates is not None:
+            self.rates = np.atleast_1d(np.asarray(self.rates, dtype=float))
+        if np.any(self.spot_shocks <= -1):
+            raise ValueError("Spot shocks must be above -1 (-100%)")
+
+    @property
+    def shape(self) -> tuple[int, int, int, int]:
+        n_rates = 1 if self.rates is None else len(self.rates)
+        return len(self.spot_shocks), len(self.vol_shocks), len(self.skew_shocks), n_rates
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    def scenarios(self):
+        """
+        (spot_shock, vol_shock, skew_shock, rate) for every scenario in C order, rate None if unshocked
+        """
+        rates = [None] if self.rates is None else list(self.rates)
+        return itertools.product(self.spot_shocks, self.vol_shocks, self.skew_shocks, rates)
+
+
+@dataclass
+class ScenarioResult:
+    grid: ScenarioGrid
+    base: np.ndarray                 # (contracts,) model value with no shock
+    values: np.ndarray               # grid.shape + (contracts,)
+    labels: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=object)) # underlying per contract
+
+    def pnl(self, quantities=None) -> np.ndarray:
+        """
+        Change in value of the book under every scenario, shaped like the grid
+        Args
+            quantities - position per contract, 1 each if None
+        """
+        change = self.values - self.base
+        if quantities is None:
+            return change.sum(axis=-1)
+        return change @ np.asarray(quantities, dtype=float)
+
+
+def _chain_inputs(chain: pd.DataFrame, spot) -> dict[str, np.ndarray]:
+    n = len(chain)
+    if isinstance(spot, Mapping):
+        S = chain["underlying_symbol"].map(spot).to_numpy(dtype=float)
+    else:
+        S = np.broadcast_to(np.asarray(spot, dtype=float), (n,))
+    return {
+        "S": S,
+        "K": chain["strike_price"].to_numpy(dtype=float),
+        "T": chain["period_year"].to_numpy(dtype=float),
+        "sigma": chain["calculated_iv"].to_numpy(dtype=float),
+        "r": chain["risk_free_rate"].to_numpy(dtype=float) if "risk_free_rate" in chain.columns else np.full(n, 0.035),
+        "q": chain["dividend_yield"].to_numpy(dtype=float) if "dividend_yield" in chain.columns else np.zeros(n),
+        "is_call": (chain["type"] == "call").to_numpy(),
+    }
+
+
+def _black_scholes(S, K, T, r, q, sigma, is_call):
+    """
+    Black-Scholes over broadcast arrays, the put from parity so the normal CDF is only evaluated for the call
+    """
+    sigma_sqrt_t = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q) * T) / sigma_sqrt_t + 0.5 * sigma_sqrt_t
+    discounted_spot = S * np.exp(-q * T)
+    discounted_strike = K * np.exp(-r * T)
+    call = discounted_spot * special.ndtr(d1) - discounted_strike * special.ndtr(d1 - sigma_sqrt_t)
+    return np.where(is_call, call, call - discounted_spot + discounted_strike)
+
+
+@instrumentation.timed("scenario.revalue_chain")
+def revalue_chain(chain: pd.DataFrame, spot, grid: ScenarioGrid) -> ScenarioResult:
+    """
+    Args
+        chain - cleaned contracts with strike_price, period_year, calculated_iv and type, plus the
+            risk_free_rate and dividend_yield columns `Data.clean_up_df` adds (3.5% and 0 if missing)
+        spot - underlying price, one per contract, or a {ticker: price} map read via underlying_symbol
+        grid - the scenarios
+    Returns
+        the value of every contract under every scenario
+    """
+    x = _chain_inputs(chain, spot)
+    instrumentation.count("scenario.valuations", grid.size * len(chain))
+    base = _black_scholes(x["S"], x["K"], x["T"], x["r"], x["q"], x["sigma"], x["is_call"])
+
+    # Axes: spot, vol, skew, rate, contract. The vol axes are the same for every spot move, so they are
+    # set up once and the spot moves are priced one slice at a time - cache sized temporaries rather
+    # than a dozen full size ones
+    log_moneyness = np.log(x["K"] / x["S"])
+    sigma = x["sigma"] + grid.vol_shocks[:, None, None, None] + grid.skew_shocks[None, :, None, None] * log_moneyness
+    np.maximum(sigma, MIN_VOL, out=sigma)
+    sigma_sqrt_t = sigma * np.sqrt(x["T"])
+    half_sigma_sqrt_t = 0.5 * sigma_sqrt_t
+    r = x["r"] if grid.rates is None else grid.rates[:, None]
+    discounted_strike = x["K"] * np.exp(-r * x["T"])   # (rates, contracts)
+    carry = (r - x["q"]) * x["T"]
+
+    values = np.empty(grid.shape + (len(chain),))
+    d = np.empty(np.broadcast_shapes(sigma.shape, carry.shape))
+    for i, shock in enumerate(grid.spot_shocks):
+        S = x["S"] * (1 + shock)
+        discounted_spot = S * np.exp(-x["q"] * x["T"])
+        put_adjustment = np.where(x["is_call"], 0.0, discounted_strike - discounted_spot) # put = call - S e^-qT + K e^-rT
+        np.divide(np.log(S / x["K"]) + carry, sigma_sqrt_t, out=d)
+        d += half_sigma_sqrt_t                                   # d1
+        out = values[i]
+        special.ndtr(d, out=out)
+        out *= discounted_spot
+        d -= sigma_sqrt_t                                        # d2
+        special.ndtr(d, out=d)
+        d *= discounted_strike
+        out -= d
+        out += put_adjustment
+    labels = chain["underlying_symbol"].to_numpy() if "underlying_symbol" in chain.columns else np.empty(0, dtype=object)
+    return ScenarioResult(grid=grid, base=base, values=values, labels=labels)
+
+
+def revalue_contracts(contracts: Mapping[str, pd.DataFrame], asset_prices: Mapping[str, float], grid: ScenarioGrid) -> ScenarioResult:
+    """
+    Every ticker's chain, e.g. `Data.contracts_dict`, revalued together. Spot shocks are relative so
+    they move every underlying by the same percentage.
+    """
+    chains = [df for df in contracts.values() if not df.empty]
+    chain = pd.concat(chains, ignore_index=True) if chains else pd.DataFrame(columns=["underlying_symbol", "strike_price", "period_year", "calculated_iv", "type"])
+    return revalue_chain(chain, asset_prices, grid)
+
+
+@instrumentation.timed("scenario.revalue_monte_carlo")
+def revalue_monte_carlo(
+    mc,
+    volatility,
+    payoffs: Sequence[Payoff],
+    path_length: int,
+    grid: ScenarioGrid,
+    iterations: int = 1000,
+    seed: int = 0,
+    **simulate_kwargs
+) -> ScenarioResult:
+    """
+    Monte Carlo prices of `payoffs` under every scenario, all simulated with the same random numbers
+    Args
+        mc - MonteCarlo with the surface, and its local volatility already computed if `volatility` is local
+        volatility - a float for flat vol, otherwise the local volatility surface (`mc.lv_surface`) is used
+        payoffs - products to value, strikes stay where they are while the spot moves
+        seed - common to every scenario, which is what makes the differences low noise
+        simulate_kwargs - passed on to `MonteCarlo.simulate` (dtype, backend)
+    Returns
+        values shaped grid.shape + (payoffs,), base at no shock
+    """
+    flat = isinstance(volatility, (float, int))
+    if not flat and mc.lv_raw is None:
+        raise ValueError("Compute the local volatility (mc.local_volatility()) before revaluing on it")
+    log_moneyness = None if flat else np.log(mc.strike_prices / mc.asset_price)
+
+    def price(spot_shock, vol_shock, skew_shock, rate):
+        shocked = copy.copy(mc) # shares the grids, only the shocked attributes are replaced
+        if rate is not None:
+            shocked.r = rate
+        if flat:
+            vol = max(volatility + vol_shock, MIN_VOL)
+        else:
+            if vol_shock or skew_shock:
+                shocked.set_local_volatility(np.maximum(mc.lv_raw + vol_shock + skew_shock * log_moneyness, MIN_VOL))
+            vol = shocked.lv_surface
+        result = shocked.simulate(mc.asset_price * (1 + spot_shock), vol, payoffs, path_length, iterations, seed=seed, **simulate_kwargs)
+        return result.prices
+
+    base = price(0.0, 0.0, 0.0, None)
+    values = np.array([price(*scenario) for scenario in grid.scenarios()]).reshape(grid.shape + (len(payoffs),))
+    return ScenarioResult(grid=grid, base=base, values=values)
@@ -1,12 +1,16 @@
 import numpy as np
+import pandas as pd
 import streamlit as st
-from data.data import Data
+from data.data import DIVIDEND_TTL, SPOT_TTL, UNFILTERED_TTL, Data
 
+from pricer.data.cache import TTLCache
+from pricer.data.history import HistoryStore
+from pricer.instrumentation import StreamlitSink, instrumentation
 from pricer.plotter.plot_volatility_surface import (
-    create_volatility_surface,
     find_vol_arbitrage,
     plot_volatility_surface,
 )
+from pricer.plotter.surface_pipeline import build_surfaces, make_executor
 
 # Configure page
 st.set_page_config(layout="wide", page_title="Volatility Surface", page_icon="📈")
@@ -22,21 +26,38 @@ user_input = st.sidebar.text_input(
     help="Enter ticker (e.g., AAPL). Separate multiples with commas."
 )
 limit_size = st.sidebar.number_input("Contract Limit", min_value=100, max_value=50000, value=1000, step=100, help="Max number of options to pull per ticker")
+record_history = st.sidebar.toggle("Record History", value=False, help="Append each new chain and its surface to the local history store")
+count_avoided = st.sidebar.toggle("Count Avoided Contracts", value=False, help="Report how many contracts the server side filters saved downloading - costs one unfiltered fetch per ticker a day")
+show_timings = st.sidebar.toggle("Show Stage Timings", value=False, help="Time the data fetch, IV solve, interpolation and plotting stages")
+
+# A rerun can stop part way (st.stop) - detach whatever the previous run left attached before recording again.
+# The sink is local to this run's thread, so other sessions' stages never show up in this session's table
+timings_sink = st.session_state.setdefault("timings_sink", StreamlitSink())
+instrumentation.remove_sink(timings_sink)
+timings_sink.reset()
+if show_timings:
+    instrumentation.add_sink(timings_sink, local=True)
 
 # Process Symbols
 symbols = [s.strip().upper() for s in user_input.split(",") if s.strip()]
 
+@st.cache_resource
+def shared_caches():
+    # One set of dividend / spot / unfiltered chain size caches for every session, so page loads only fetch what is missing or stale
+    return TTLCache(ttl=DIVIDEND_TTL), TTLCache(ttl=SPOT_TTL), TTLCache(ttl=UNFILTERED_TTL)
+
 # Initialize Data
 if "data_instance" not in st.session_state:
-    st.session_state["data_instance"] = Data()
+    dividend_cache, spot_cache, unfiltered_cache = shared_caches()
+    st.session_state["data_instance"] = Data(dividend_cache=dividend_cache, spot_cache=spot_cache, unfiltered_cache=unfiltered_cache)
 
 data = st.session_state["data_instance"]
 
 @st.cache_data
-def get_data(underlying_symbols: list[str], limit: int = 1000):
+def get_data(underlying_symbols: list[str], limit: int = 1000, count_avoided: bool = False):
     data.contracts_dict = {} 
-    data.get_underlying_details(underlying_symbols)
-    data.get_active_options_api(underlying_symbols, limit)
+    data.get_underlying_details(underlying_symbols, fetch_dividends=False) # r and q are implied from the chain
+    data.get_active_options_api(underlying_symbols, limit, count_avoided=count_avoided)
     return data.contracts_dict
 
 if not symbols:
@@ -45,7 +66,7 @@ if not symbols:
 
 # Fetch Data
 with st.spinner(f"Fetching option chains for: {', '.join(symbols)}..."):
-    contracts_dict = get_data(symbols, limit_size)
+    contracts_dict = get_data(symbols, limit_size, count_avoided)
 
 if not contracts_dict:
     st.error(f"No data found for {symbols}.")
@@ -53,39 +74,29 @@ if not contracts_dict:
 
 # Adjustable resliution for interpolation based on the number of valid data points
 max_resolution = min([val.shape[0] for val in contracts_dict.values()])
-resolution = st.sidebar.number_input("Surface Resolution", min_value=50, max_value=max_resolution, value=50, step=10, help=f"Higher = smoother but slower. Max = {max_resolution}")
-
-page_2_data = {}
-
-# --- Main Visualization Loop ---
-for key, df in contracts_dict.items():
-    st.markdown(f"### Option Chain: **{key}**")
-    
-    if df.empty or len(df) < 4:
-        st.error("Not enough data points to plot surface.")
-        continue
-
-    # --- Save Data for Monte Carlo Page ---
-    # We grab the latest close price and a median IV to help seed the next page
-    latest_price = data.asset_price_dict[key] if key in data.asset_price_dict else 100.0
-    dividend_yield = data.dividend_yield_dict[key] if key in data.asset_price_dict else 0
-    avg_iv = df['calculated_iv'].median() if 'calculated_iv' in df.columns else 0.2
-    
-    # Save to Session State so Page 2 can see it
-    page_2_data[key] = {
-        'symbol': key,
-        'price': latest_price,
-        'dividend_yield': dividend_yield,
-        'vol': avg_iv
-    }
-    # ---------------------------------------------
+grid = st.sidebar.radio(
+    "Surface Grid", ["Uniform", "Adaptive"], horizontal=True,
+    help="Adaptive places the nodes where the smile curves and the contracts are - more near the money and at short expiries"
+).lower()
+# An adaptive grid matches a uniform one's accuracy with several times fewer nodes, so it defaults to a smaller budget
+default_resolution = min(50 if grid == "uniform" else 25, max_resolution)
+resolution = st.sidebar.number_input(
+    "Surface Resolution", min_value=min(10, max_resolution), max_value=max_resolution, value=default_resolution, step=5,
+    help=f"Nodes along each axis, or the square root of the node budget for an adaptive grid. Higher = smoother but slower. Max = {max_resolution}"
+)
 
+@st.cache_resource
+def surface_pool():
+    # Worker processes shared by every session, started on the first multi-ticker load
+    return make_executor()
+
+def render_surface(result):
+    key = result.ticker
+    if not result.ok:
+        st.error(result.error)
+        return
+    x, y, z = result.maturities, result.strike_prices, result.implied_vol
     try:
-        x, y, z = create_volatility_surface(df, resolution)
-        page_2_data[key]["maturities"] = x
-        page_2_data[key]["strike_prices"] = y
-        page_2_data[key]["implied_vol"] = z
-        
         # Local Controls
         col1, col2 = st.columns([1, 2])
         with col1:
@@ -94,16 +105,80 @@ for key, df in contracts_dict.items():
         anomaly_mask = None 
         if show_anomalies:
             with col2:
-                threshold = st.slider("Gradient Threshold", 0.01, 1.0, 0.1, 0.01, key=f"thresh_{key}")
-                anomaly_mask = find_vol_arbitrage(z, threshold=threshold)
+                threshold = st.slider("Gradient Threshold", 0.005, 0.5, 0.05, 0.005, key=f"thresh_{key}", help="IV change per 1% of the strike / expiry range")
+                anomaly_mask = find_vol_arbitrage(z, threshold=threshold, X=x, Y=y)
                 st.metric("Anomalies Detected", int(np.sum(anomaly_mask)))
 
         fig = plot_volatility_surface(x, y, z, 'Implied Volatility', anomaly_mask)
-        st.plotly_chart(fig, width="stretch")
+        with instrumentation.timer("plot.plotly_chart"):
+            st.plotly_chart(fig, width="stretch")
         
+        if key in data.iv_stats_dict:
+            with st.expander("IV Solver Telemetry", expanded=False):
+                stats = data.iv_stats_dict[key]
+                if key in data.fetch_stats_dict:
+                    fetch = data.fetch_stats_dict[key]
+                    avoided = f", {fetch['contracts_avoided']} never downloaded thanks to the server side filters" if "contracts_avoided" in fetch else ""
+                    st.caption(f"Fetched {fetch['contracts_received']} contracts over {fetch['pages']} pages, {fetch['contracts_discarded']} discarded after download{avoided}")
+                if key in data.forward_curve_dict:
+                    st.caption(f"Rates and dividend yields implied by put-call parity for {len(data.forward_curve_dict[key])} expiries")
+                    st.dataframe(data.forward_curve_dict[key], hide_index=True)
+                st.caption(f"{stats['contracts']} contracts, {stats['total_iterations']} solver iterations, surface built in {result.seconds:.2f}s")
+                col_status, col_iterations = st.columns(2)
+                col_status.dataframe([{"status": k, "contracts": v} for k, v in stats["status_counts"].items()], hide_index=True)
+                col_iterations.dataframe([{"iterations": k, "contracts": v} for k, v in stats["iteration_histogram"].items()], hide_index=True)
+
         st.info(f"💡 **Analysis for {key}:** Data saved. Navigate to 'Asian Option Pricer' in the sidebar to price options using this data.")
             
     except Exception as e:
         st.error(f"Error plotting surface: {e}")
 
-st.session_state["page_2_data"] = page_2_data
\ No newline at end of file
+# --- Main Visualization Loop ---
+# One placeholder per ticker in watchlist order, filled as the surfaces come back from the pool
+placeholders = {}
+for key in contracts_dict:
+    st.markdown(f"### Option Chain: **{key}**")
+    placeholders[key] = st.empty()
+    with placeholders[key].container():
+        st.caption("Building surface...")
+
+# We grab the latest close price and the forward curve's dividend yield to help seed the next page
+prices, dividend_yields = {}, {}
+for key in contracts_dict:
+    prices[key] = data.asset_price_dict[key] if key in data.asset_price_dict else 100.0
+    dividend_yields[key] = data.dividend_yield_dict[key] if key in data.asset_price_dict else 0
+    forward_curve = data.forward_curve_dict.get(key)
+    if forward_curve is not None and not forward_curve.empty:
+        dividend_yields[key] = float(forward_curve["dividend_yield"].median())
+
+@st.cache_resource
+def history_store():
+    return HistoryStore()
+
+def record(result):
+    # Reruns reuse the cached chain - only append a chain that has not been recorded yet
+    chain = contracts_dict[result.ticker]
+    fingerprint = int(pd.util.hash_pandas_object(chain[["strike_price", "days_to_expiry", "calculated_iv"]], index=False).sum())
+    recorded = st.session_state.setdefault("recorded_history", {})
+    if recorded.get(result.ticker) == fingerprint:
+        return
+    grids = {"maturities": result.maturities, "strike_prices": result.strike_prices, "implied_vol": result.implied_vol}
+    history_store().append(result.ticker, chain, prices[result.ticker], grids=grids)
+    recorded[result.ticker] = fingerprint
+
+page_2_data = {}
+executor = surface_pool() if len(contracts_dict) > 1 else None
+for result in build_surfaces(contracts_dict, resolution, prices, dividend_yields, executor=executor, grid=grid):
+    # Save to Session State so Page 2 can see it
+    if result.ok:
+        page_2_data[result.ticker] = result.page_2_data
+        if record_history:
+            record(result)
+    with placeholders[result.ticker].container():
+        render_surface(result)
+
+st.session_state["page_2_data"] = page_2_data
+
+if show_timings:
+    instrumentation.remove_sink(timings_sink)
+    timings_sink.render()
@@ -1,7 +1,11 @@
 import numpy as np
 import streamlit as st
 
+from pricer.model import asian_analytic
+from pricer.model.background import CANCELLED, FAILED, BackgroundSimulation
+from pricer.model.basket import BasketMonteCarlo, default_correlation
 from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, Barrier, European, GeometricAsian, Lookback
 from pricer.plotter.plot_monte_carlo import plot_traces
 from pricer.plotter.plot_volatility_surface import plot_volatility_surface
 
@@ -33,6 +37,7 @@ with col_params:
         default_price = float(data['price'])
         st.success(f"Loaded data for **{selected_ticker}**")
     else:
+        data = None
         default_price = 100.0
         default_vol = 0.2
 
@@ -50,33 +55,108 @@ with col_params:
     if selected_ticker != "Manual Entry":
         mc_vol = st.number_input("Volatility (σ)", value=None, disabled=True)
         st.info("Utilizing local volatility from implied volatility from previous page")
+        spot_move = st.radio(
+            "Surface at a New Price", ["Sticky Moneyness", "Sticky Strike"], horizontal=True,
+            help="How the surface follows an asset price other than the one it was built at - moving with the price, or each strike keeping its volatility"
+        )
     else:
         mc_vol = st.number_input("Volatility (σ)", value=default_vol, step=0.01, format="%.4f", help="Defaulted to median of IVs calculated in the previous page")
     
     mc_r = st.number_input("Risk Free Rate (r)", value=0.035, step=0.001, format="%.3f")
     mc_days = st.number_input("Days to Expiration", value=30, step=1)
     mc_iter = st.number_input("Iterations", value=10000, step=100, max_value=1000000)
+    extra_products = st.multiselect(
+        "Also Price", ["Geometric Asian", "European", "Floating Strike Lookback", "Knock-Out Barrier"],
+        help="Priced off the same simulated paths - no extra simulation"
+    )
+    if "Knock-Out Barrier" in extra_products:
+        default_barrier = round(mc_price * 1.2, 2) if mc_type == "call" else round(mc_price * 0.8, 2)
+        mc_barrier = st.number_input("Barrier ($)", value=default_barrier, step=0.5)
+    mc_importance = st.checkbox(
+        "Importance Sampling",
+        help="Shift the paths towards the strike and reweight them by their likelihood - far fewer paths for strikes well away from the price"
+    )
     
     st.markdown("---")
     run_sim = st.button("Run Simulation", type="primary", use_container_width=True)
 
 with col_plot:
+    if selected_ticker == "Manual Entry":
+        # Flat vol has closed forms - priced on every change, no simulation needed
+        analytic_args = (mc_price, mc_strike, int(mc_days), mc_vol, mc_r, 0.0, mc_type)
+        a1, a2 = st.columns(2)
+        a1.metric(f"Analytic Fair Value ({mc_type.title()})", f"${float(asian_analytic.arithmetic_asian_price(*analytic_args)):.4f}", help="Turnbull-Wakeman moment matching")
+        a2.metric("Geometric Asian (Exact)", f"${float(asian_analytic.geometric_asian_price(*analytic_args)):.4f}", help="Kemna-Vorst closed form")
+
     if run_sim:
-        mc = MonteCarlo(maturities=data["maturities"],strike_prices=data["strike_prices"],implied_vol=data["implied_vol"],asset_price=data["price"],q=data["dividend_yield"],r=mc_r)
-        with st.spinner("Spinning up local volatility surface from implied volatility"):
-            mc.local_volatility()
-        with st.spinner(f"Simulating {mc_iter} paths for {selected_ticker}..."):
-            calc_price, paths, std_error = mc.simple_random_walk(
-                current_price=mc_price,
-                volatility=mc_vol,
-                strike=mc_strike,
-                typ=mc_type,
-                path_length=int(mc_days),
-                iterations=int(mc_iter)
-            )
+        # A new run replaces the previous one - stop it rather than let it simulate for nothing
+        if "simulation" in st.session_state:
+            st.session_state["simulation"]["run"].cancel()
+        if data is not None:
+            mc = MonteCarlo(maturities=data["maturities"],strike_prices=data["strike_prices"],implied_vol=data["implied_vol"],asset_price=data["price"],q=data["dividend_yield"],r=mc_r)
+            if mc_price != data["price"]:
+                mc = mc.reanchor(mc_price, "sticky_strike" if spot_move == "Sticky Strike" else "sticky_moneyness")
+        else:
+            # Flat vol walks never read the surface
+            mc = MonteCarlo([[1, 365], [1, 365]], [[mc_price, mc_price], [2 * mc_price, 2 * mc_price]], [[mc_vol, mc_vol], [mc_vol, mc_vol]], mc_price, r=mc_r)
+        products = {
+            "Arithmetic Asian": ArithmeticAsian(mc_strike, mc_type),
+            "Geometric Asian": GeometricAsian(mc_strike, mc_type),
+            "European": European(mc_strike, mc_type),
+            "Floating Strike Lookback": Lookback(mc_type),
+            "Knock-Out Barrier": Barrier(mc_strike, mc_type, mc_barrier) if "Knock-Out Barrier" in extra_products else None,
+        }
+        if data is None:
+            # The exact geometric Asian as a control variate for the arithmetic one
+            products["Arithmetic Asian"] = asian_analytic.control_variate(mc_price, mc_strike, mc_type, int(mc_days), mc_vol, mc_r)
+        product_names = ["Arithmetic Asian", *extra_products]
+        drift_shift = None
+        if mc_importance:
+            if mc_vol is None:
+                mc.local_volatility()
+            drift_shift = mc.optimal_drift_shift(mc_price, mc_vol, ArithmeticAsian(mc_strike, mc_type), int(mc_days))
+        # Runs in a background thread - the page stays responsive and widget changes do not restart it
+        run = BackgroundSimulation(
+            mc,
+            current_price=mc_price,
+            volatility=mc_vol,
+            payoffs=[products[name] for name in product_names],
+            path_length=int(mc_days),
+            iterations=int(mc_iter),
+            prepare=mc.local_volatility if data is not None and mc.lv_surface is None else None,
+            drift_shift=drift_shift,
+        ).start()
+        st.session_state["simulation"] = {
+            "run": run, "mc": mc, "product_names": product_names, "price": mc_price, "strike": mc_strike, "type": mc_type,
+            "iterations": mc_iter, "ticker": selected_ticker, "data": data, "polling": True, "importance": drift_shift is not None,
+        }
+
+    def render_simulation(simulation: dict):
+        progress = simulation["run"].snapshot()
+        if progress.finished and simulation["polling"]:
+            # Rerun the whole page once to stop polling
+            simulation["polling"] = False
+            st.rerun()
+
+        if not progress.finished:
+            col_progress, col_stop = st.columns([4, 1])
+            stage = "Spinning up local volatility surface from implied volatility" if progress.paths_done == 0 else f"Simulated {progress.paths_done:,} of {progress.iterations:,} paths for {simulation['ticker']}"
+            col_progress.progress(progress.paths_done / progress.iterations, text=stage)
+            if col_stop.button("Stop", use_container_width=True, help="Stop after the current batch and keep the price so far"):
+                simulation["run"].cancel()
+        elif progress.status == CANCELLED:
+            st.warning(f"Stopped early after {progress.paths_done:,} of {progress.iterations:,} paths.")
+        elif progress.status == FAILED:
+            st.error(f"Simulation failed: {progress.error}")
+            return
+
+        if progress.paths_done == 0:
+            return
 
         # --- Results ---
         # Layout metrics
+        calc_price, std_error, paths = progress.prices[0], progress.standard_errors[0], progress.paths
+        mc_price, mc_strike, mc_type = simulation["price"], simulation["strike"], simulation["type"]
         m1, m2, m3, m4 = st.columns(4)
         m1.metric(f"Fair Value ({mc_type.title()})", f"${calc_price:.4f}")
         
@@ -90,10 +170,73 @@ with col_plot:
         pricing_err = 1.96*std_error
         m4.metric(f"95% Confidence Interval", f"±${pricing_err:.4f}")
 
-        # --- Plotting ---
-        fig_mc = plot_traces(paths, mc_price, mc_strike, mc_iter, selected_ticker)
-        st.plotly_chart(fig_mc, width='stretch')
+        if simulation["importance"]:
+            st.caption("Paths are drawn under the shifted measure - the ITM probability and average final price are of the shifted paths")
 
-        
-        lv_surface_plot = plot_volatility_surface(data["maturities"], data["strike_prices"], mc.lv_raw, 'Local Volatility')
-        st.plotly_chart(lv_surface_plot, width="stretch")
\ No newline at end of file
+        if len(simulation["product_names"]) > 1:
+            st.dataframe(
+                [{"product": name, "fair value": px, "95% CI ±": 1.96 * se} for name, px, se in zip(simulation["product_names"], progress.prices, progress.standard_errors)],
+                hide_index=True
+            )
+
+        if len(progress.history) > 1:
+            st.caption("Convergence of the fair value with its 95% confidence interval")
+            st.line_chart({
+                "paths": [done for done, _, _ in progress.history],
+                "fair value": [px[0] for _, px, _ in progress.history],
+                "lower": [px[0] - 1.96 * se[0] for _, px, se in progress.history],
+                "upper": [px[0] + 1.96 * se[0] for _, px, se in progress.history],
+            }, x="paths")
+
+        if progress.finished:
+            # --- Plotting ---
+            fig_mc = plot_traces(paths, mc_price, mc_strike, simulation["iterations"], simulation["ticker"])
+            st.plotly_chart(fig_mc, width='stretch')
+
+            if simulation["data"] is not None:
+                lv_surface_plot = plot_volatility_surface(simulation["data"]["maturities"], simulation["data"]["strike_prices"], simulation["mc"].lv_raw, 'Local Volatility')
+                st.plotly_chart(lv_surface_plot, width="stretch")
+
+    if "simulation" in st.session_state:
+        simulation = st.session_state["simulation"]
+        # Poll the background run while it is going, render once when it is not
+        st.fragment(render_simulation, run_every=0.5 if simulation["polling"] else None)(simulation)
+
+# --- Basket ---
+if len(available_data) >= 2:
+    st.markdown("---")
+    st.subheader("Basket Asian Option")
+    st.caption("Arithmetic average of a weighted basket, every asset on its own local volatility surface with correlated shocks")
+    basket_tickers = st.multiselect("Basket Assets", list(available_data.keys()), default=list(available_data.keys())[:2])
+    if len(basket_tickers) >= 2:
+        col_weights, col_correlation = st.columns([1, 2])
+        with col_weights:
+            weights = st.data_editor(
+                {"ticker": basket_tickers, "units": [1 / len(basket_tickers)] * len(basket_tickers)},
+                disabled=["ticker"], hide_index=True, key="basket_weights"
+            )
+        with col_correlation:
+            correlation = st.data_editor(
+                default_correlation(basket_tickers),
+                hide_index=True, key="basket_correlation", help="Correlation of the assets' daily shocks"
+            )
+        basket_level = sum(w * available_data[t]["price"] for w, t in zip(weights["units"], basket_tickers))
+        col_strike, col_days, col_iterations = st.columns(3)
+        basket_strike = col_strike.number_input("Basket Strike ($)", value=round(basket_level, 2), step=0.5)
+        basket_days = col_days.number_input("Basket Days to Expiration", value=30, step=1)
+        basket_iterations = col_iterations.number_input("Basket Iterations", value=10000, step=1000, max_value=500000)
+        if st.button("Price Basket", type="primary"):
+            try:
+                basket = BasketMonteCarlo.from_page_data(
+                    available_data, basket_tickers, [[correlation[b][a] for b in basket_tickers] for a in range(len(basket_tickers))],
+                    weights=weights["units"], r=mc_r
+                )
+                with st.spinner("Simulating correlated local volatility paths..."):
+                    result = basket.simulate("local", [ArithmeticAsian(basket_strike, mc_type)], int(basket_days), int(basket_iterations))
+                b1, b2, b3 = st.columns(3)
+                b1.metric(f"Basket Fair Value ({mc_type.title()})", f"${result.prices[0]:.4f}")
+                b2.metric("Basket Level", f"${basket_level:.2f}")
+                b3.metric("95% Confidence Interval", f"±${1.96 * result.standard_errors[0]:.4f}")
+                st.plotly_chart(plot_traces(result.paths, basket_level, basket_strike, int(basket_iterations), " + ".join(basket_tickers)), width="stretch")
+            except ValueError as e:
+                st.error(f"Cannot price the basket: {e}")
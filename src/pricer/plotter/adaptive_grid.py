@@ -0,0 +1,91 @@
+"""
+Non-uniform (rectilinear) surface grids with the nodes where the surface needs them.
+
+A uniform resolution x resolution grid spends as many nodes on illiquid far wings and long tenors as on
+the short dated near the money contracts, where the smile curves most. Here each axis is placed by
+equidistribution: nodes are spaced so that every interval holds the same share of a monitor
+
+    m = FLOOR + sqrt|d2 IV| / mean + DENSITY_WEIGHT * contracts / mean
+
+- sqrt of the IV curvature along the axis (averaged over the other) is the node density that evens out
+  the error of linear interpolation, the liquidity term keeps detail where the contracts are, and the
+  floor keeps some nodes in the wings. Linear interpolation error on an axis with n nodes placed like
+  this is about (integral of sqrt|d2 IV|)^2 / n^2, so the node budget is split between the axes in
+  proportion to those integrals - a smile curving in strike but nearly linear in time gets several strikes
+  per maturity.
+
+The result is still a tensor product grid (meshgrid of two sorted axes), which `MonteCarlo.local_volatility`
+(np.gradient with coordinates) and the LV interpolators take as is.
+"""
+import warnings
+
+import numpy as np
+
+PILOT = 64             # pilot grid the curvature is measured on
+FLOOR = 0.3
+DENSITY_WEIGHT = 0.25
+MIN_NODES = 4          # per axis
+
+
+def _equidistribute(pilot_axis: np.ndarray, monitor: np.ndarray, nodes: int) -> np.ndarray:
+    """
+    `nodes` points from the first to the last of pilot_axis, equal integrals of the monitor apart
+    """
+    cumulative = np.concatenate(([0.0], np.cumsum((monitor[1:] + monitor[:-1]) / 2 * np.diff(pilot_axis))))
+    return np.interp(np.linspace(0, cumulative[-1], nodes), cumulative, pilot_axis)
+
+
+def _monitor(curvature: np.ndarray, density: np.ndarray) -> np.ndarray:
+    root = np.sqrt(curvature)
+    monitor = np.full(len(curvature), FLOOR)
+    if root.mean() > 0:
+        monitor += root / root.mean()
+    if density.mean() > 0:
+        monitor += DENSITY_WEIGHT * density / density.mean()
+    return monitor
+
+
+def _density(samples: np.ndarray, pilot_axis: np.ndarray, weights: np.ndarray | None) -> np.ndarray:
+    """
+    Contracts (or their weights) per pilot node, lightly smoothed
+    """
+    step = pilot_axis[1] - pilot_axis[0]
+    edges = np.append(pilot_axis - step / 2, pilot_axis[-1] + step / 2)
+    counts = np.histogram(samples, bins=edges, weights=weights)[0].astype(float)
+    return np.convolve(counts, np.ones(3) / 3, mode="same")
+
+
+def adaptive_axes(days_to_expiry, strike_prices, interpolator, nodes: int, weights=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Args
+        days_to_expiry, strike_prices - coordinates of the contracts
+        interpolator - IV over (days, strike), e.g. `surface_interpolator`, evaluated on a PILOT x PILOT grid
+        nodes - total node budget, e.g. resolution ** 2 for the uniform grid it replaces
+        weights - liquidity per contract, e.g. open interest, contracts count equally if None
+    Returns
+        maturities and strike axes, sorted and spanning the contracts
+    """
+    days = np.asarray(days_to_expiry, dtype=float)
+    strikes = np.asarray(strike_prices, dtype=float)
+    weights = None if weights is None else np.nan_to_num(np.asarray(weights, dtype=float))
+    t_pilot = np.linspace(days.min(), days.max(), PILOT)
+    k_pilot = np.linspace(strikes.min(), strikes.max(), PILOT)
+    T, K = np.meshgrid(t_pilot, k_pilot)
+    iv = interpolator(T, K)
+
+    # Mean |second derivative| along each axis, the other averaged out - NaNs are outside the contracts' hull
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning) # all NaN slices
+        k_curvature = np.nan_to_num(np.nanmean(np.abs(np.gradient(np.gradient(iv, k_pilot, axis=0), k_pilot, axis=0)), axis=1))
+        t_curvature = np.nan_to_num(np.nanmean(np.abs(np.gradient(np.gradient(iv, t_pilot, axis=1), t_pilot, axis=1)), axis=0))
+
+    # Split the budget so that both axes contribute the same interpolation error
+    k_weight = np.trapezoid(np.sqrt(k_curvature), k_pilot)
+    t_weight = np.trapezoid(np.sqrt(t_curvature), t_pilot)
+    ratio = k_weight / t_weight if k_weight > 0 and t_weight > 0 else 1.0 # strikes per maturity
+    n_k = int(np.clip(round(np.sqrt(nodes * ratio)), MIN_NODES, max(nodes // MIN_NODES, MIN_NODES)))
+    n_t = max(MIN_NODES, int(round(nodes / n_k)))
+
+    maturities_1d = _equidistribute(t_pilot, _monitor(t_curvature, _density(days, t_pilot, weights)), n_t)
+    strikes_1d = _equidistribute(k_pilot, _monitor(k_curvature, _density(strikes, k_pilot, weights)), n_k)
+    return maturities_1d, strikes_1d
@@ -1,7 +1,12 @@
-import plotly.graph_objects as go
 import numpy as np
 
+from pricer._lazy import lazy_import
+from pricer.instrumentation import instrumentation
 
+go = lazy_import("plotly.graph_objects")
+
+
+@instrumentation.timed("plot.traces")
 def plot_traces(
     paths: np.array,
     mc_price: float,
@@ -1,31 +1,126 @@
 # --- plot.py ---
+import hashlib
+import threading
+from collections import OrderedDict
+
 import numpy as np
-import plotly.graph_objects as go
-from scipy.interpolate import griddata
+
+from pricer._lazy import lazy_import
+from pricer.instrumentation import instrumentation
+
+go = lazy_import("plotly.graph_objects")
+interpolate = lazy_import("scipy.interpolate")
+spatial = lazy_import("scipy.spatial")
+adaptive_grid = lazy_import("pricer.plotter.adaptive_grid")
+
+CACHE_SIZE = 16 # chain snapshots (triangulations) and IV sets (interpolators) kept
+
+
+class _LRUCache:
+    """
+    Shared by every Streamlit session, hence the lock
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, create):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = create() # outside the lock, a miss can take a while
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_triangulations = _LRUCache(CACHE_SIZE)
+_interpolators = _LRUCache(CACHE_SIZE)
+
+
+def _fingerprint(array: np.ndarray) -> tuple:
+    array = np.ascontiguousarray(array)
+    return array.shape, array.dtype.str, hashlib.blake2b(array.tobytes(), digest_size=16).hexdigest()
 
 
-def create_volatility_surface(calls_data, resolution: int):
+def surface_interpolator(points: np.ndarray, values: np.ndarray, method: str = "cubic"):
+    """
+    Interpolator over scattered (days_to_expiry, strike) points, as `griddata` would build it.
+    The Delaunay triangulation is cached per set of points and the interpolator per set of values, so
+    a new resolution only costs the evaluation and new IVs on the same contracts skip the triangulation.
+    Args
+        method - "cubic" (Clough-Tocher) or "linear"
+    """
+    points = np.asarray(points, dtype=float)
+    values = np.asarray(values, dtype=float)
+    points_key = _fingerprint(points)
+
+    def triangulate():
+        instrumentation.count("surface.triangulations")
+        with instrumentation.timer("surface.triangulate"):
+            return spatial.Delaunay(points)
+
+    def build():
+        triangulation = _triangulations.get_or_create(points_key, triangulate)
+        if method == "cubic":
+            return interpolate.CloughTocher2DInterpolator(triangulation, values)
+        if method == "linear":
+            return interpolate.LinearNDInterpolator(triangulation, values)
+        raise ValueError(f"Unknown method {method!r}, expected 'cubic' or 'linear'")
+
+    return _interpolators.get_or_create((points_key, _fingerprint(values), method), build)
+
+
+@instrumentation.timed("surface.create_volatility_surface")
+def create_volatility_surface(calls_data, resolution: int, grid: str = "uniform"):
+    """
+    Args
+        grid - "uniform" for resolution x resolution evenly spaced nodes, "adaptive" for the same number of nodes
+            placed by IV curvature and contract density (`pricer.plotter.adaptive_grid`)
+    """
     x = calls_data["days_to_expiry"]
     y = calls_data["strike_price"]
     z = calls_data["calculated_iv"]
 
-    # 2. Define a regular grid to interpolate onto
-    xi = np.linspace(x.min(), x.max(), resolution)
-    yi = np.linspace(y.min(), y.max(), resolution)
+    # 'cubic' looks smoother, 'linear' is more robust to outliers
+    interpolator = surface_interpolator(np.column_stack((x, y)), z, method='cubic')
+
+    # Define a grid to interpolate onto
+    if grid == "adaptive":
+        xi, yi = adaptive_grid.adaptive_axes(x, y, interpolator, resolution ** 2, weights=calls_data.get("open_interest"))
+    elif grid == "uniform":
+        xi = np.linspace(x.min(), x.max(), resolution)
+        yi = np.linspace(y.min(), y.max(), resolution)
+    else:
+        raise ValueError(f"Unknown grid {grid!r}, expected 'uniform' or 'adaptive'")
     X, Y = np.meshgrid(xi, yi)
 
-    # 3. Interpolate the scattered data onto the grid
-    # 'cubic' looks smoother, 'linear' is more robust to outliers
-    Z = griddata((x, y), z, (X, Y), method='cubic')
+    # Interpolate the scattered data onto the grid
+    Z = interpolator(X, Y)
 
     return X, Y, Z
 
-def find_vol_arbitrage(Z, threshold=0.05):
+def find_vol_arbitrage(Z, threshold=0.05, X=None, Y=None):
     """
     Finds points where the gradient magnitude exceeds the threshold.
+    With the grid's X (maturities) and Y (strike prices) the gradient is taken against the coordinates, each
+    axis measured in percent of its span - the IV change per 1% of the axis, the same on uniform and adaptive
+    grids. Without them it is the IV change per grid step, which only means the same on a uniform grid.
     """
     # np.gradient returns a tuple: (gradient_along_y, gradient_along_x)
-    grad_y, grad_x = np.gradient(Z)
+    if X is None or Y is None:
+        grad_y, grad_x = np.gradient(Z)
+    else:
+        strikes, maturities = np.asarray(Y)[:, 0], np.asarray(X)[0, :]
+        grad_y, grad_x = np.gradient(Z, _percent_of_span(strikes), _percent_of_span(maturities))
     
     # Calculate magnitude of the gradient vector: sqrt(dx^2 + dy^2)
     grad_magnitude = np.sqrt(grad_x**2 + grad_y**2)
@@ -36,6 +131,10 @@ def find_vol_arbitrage(Z, threshold=0.05):
     
     return mask
 
+def _percent_of_span(axis: np.ndarray) -> np.ndarray:
+    return 100 * (axis - axis[0]) / (axis[-1] - axis[0])
+
+@instrumentation.timed("plot.volatility_surface")
 def plot_volatility_surface(X, Y, Z, title: str, anomaly_mask=None):
     # Create interactive 3D plot with Plotly
     fig = go.Figure(data=[go.Surface(
@@ -0,0 +1,135 @@
+"""
+Volatility surfaces for a whole watchlist, built concurrently on a process pool.
+
+Each ticker's interpolation (Delaunay triangulation, Clough-Tocher gradients, grid evaluation) is
+independent and mostly Python-level SciPy work holding the GIL, so tickers are farmed out to worker
+processes. Results are yielded in completion order - a page can draw the first surfaces while the rest
+are still being computed.
+
+Only the three columns the interpolation needs travel to the workers, and the workers are spawned
+rather than forked, which is safe next to the threads of a Streamlit server and cheap now that the
+pricer modules load their heavy dependencies lazily.
+"""
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from pricer.instrumentation import instrumentation
+from pricer.plotter.plot_volatility_surface import create_volatility_surface
+
+logger = logging.getLogger(__name__)
+
+SURFACE_COLUMNS = ["days_to_expiry", "strike_price", "calculated_iv", "open_interest"]
+MIN_CONTRACTS = 4     # fewest contracts a surface is interpolated from
+DEFAULT_PRICE = 100.0 # used when no underlying price is known
+DEFAULT_VOL = 0.2     # used when the chain has no solved IVs
+
+
+@dataclass
+class SurfaceResult:
+    ticker: str
+    maturities: np.ndarray | None = None
+    strike_prices: np.ndarray | None = None
+    implied_vol: np.ndarray | None = None
+    page_2_data: dict | None = None   # what the Asian Option Pricer page reads, None on error
+    error: str | None = None
+    seconds: float = 0.0              # time spent in the worker
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def build_surface(ticker: str, chain: pd.DataFrame, price: float, dividend_yield: float, resolution: int, grid: str = "uniform") -> SurfaceResult:
+    """
+    Surface grids and Monte Carlo page payload for one ticker. Runs in a worker process, so failures
+    are returned rather than raised.
+    """
+    start = time.perf_counter()
+    if chain.empty or len(chain) < MIN_CONTRACTS:
+        return SurfaceResult(ticker, error="Not enough data points to plot surface.")
+    try:
+        X, Y, Z = create_volatility_surface(chain, resolution, grid)
+    except Exception as e:
+        return SurfaceResult(ticker, error=f"Error plotting surface: {e}", seconds=time.perf_counter() - start)
+    vol = chain["calculated_iv"].median() if "calculated_iv" in chain.columns else DEFAULT_VOL
+    page_2_data = {
+        "symbol": ticker,
+        "price": price,
+        "dividend_yield": dividend_yield,
+        "vol": vol,
+        "maturities": X,
+        "strike_prices": Y,
+        "implied_vol": Z,
+    }
+    return SurfaceResult(ticker, X, Y, Z, page_2_data, seconds=time.perf_counter() - start)
+
+
+def make_executor(max_workers: int | None = None) -> ProcessPoolExecutor:
+    """
+    A pool to reuse across calls of `build_surfaces` - worker start-up is paid once, and each worker
+    keeps its triangulation cache between calls
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def build_surfaces(
+    chains: Mapping[str, pd.DataFrame],
+    resolution: int,
+    prices: Mapping[str, float] | None = None,
+    dividend_yields: Mapping[str, float] | None = None,
+    executor: Executor | None = None,
+    max_workers: int | None = None,
+    grid: str = "uniform",
+) -> Iterator[SurfaceResult]:
+    """
+    Args
+        chains - cleaned option chain per ticker, with at least days_to_expiry, strike_price and calculated_iv
+        resolution - grid points along each axis, or the square root of the node budget for an adaptive grid
+        prices, dividend_yields - per ticker, for the Monte Carlo page payload
+        executor - pool to run on, e.g. from `make_executor`, left running afterwards. Without one a
+            pool of `max_workers` is started for this call, unless there is a single ticker, which is
+            built in this process.
+        grid - "uniform" or "adaptive", see `create_volatility_surface`
+    Yields
+        a SurfaceResult per ticker, as soon as it is ready
+    """
+    prices = prices or {}
+    dividend_yields = dividend_yields or {}
+
+    def arguments(ticker, chain):
+        columns = [column for column in SURFACE_COLUMNS if column in chain.columns]
+        return ticker, chain[columns], prices.get(ticker, DEFAULT_PRICE), dividend_yields.get(ticker, 0.0), resolution, grid
+
+    if executor is None and len(chains) <= 1:
+        for ticker, chain in chains.items():
+            yield build_surface(*arguments(ticker, chain))
+        return
+
+    owned = executor is None
+    if owned:
+        executor = make_executor(max_workers)
+    try:
+        futures = {executor.submit(build_surface, *arguments(ticker, chain)): ticker for ticker, chain in chains.items()}
+        try:
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e: # the worker died or the arguments did not pickle
+                    logger.exception("Surface for %s failed", ticker)
+                    result = SurfaceResult(ticker, error=f"Error plotting surface: {e}")
+                instrumentation.count("surface.pipeline.results")
+                yield result
+        finally:
+            for future in futures: # the consumer stopped early
+                future.cancel()
+    finally:
+        if owned:
+            executor.shutdown(wait=False, cancel_futures=True)
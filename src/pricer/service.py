@@ -0,0 +1,389 @@
+"""
+Local HTTP pricing service for Asian options, with warm surfaces and request micro-batching.
+
+Every client building its own `MonteCarlo`, computing the LV surface and simulating on its own repeats
+the same work whenever the underlying and horizon are the same. The service instead keeps one
+MonteCarlo per ticker, local volatility computed, in memory (loaded from the `SurfaceStore`, or added
+directly) and coalesces concurrent requests: requests for the same ticker, days to expiry and
+volatility that arrive within `window` seconds of each other are priced by one simulation over the
+union of their strikes (`MonteCarlo.simulate` prices any number of payoffs off one set of paths).
+
+    python -m pricer.service --port 8765 --tickers AAPL MSFT
+
+    POST /price     {"ticker": "AAPL", "strike": 280, "type": "call", "days": 30, "iterations": 20000}
+                    or a list of such requests, answered in order
+    GET  /metrics   request / batch counts, batch sizes, latency percentiles and throughput
+    GET  /surfaces  tickers held in memory
+    GET  /health
+
+Standard library only - `http.server.ThreadingHTTPServer`, one thread per connection.
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from pricer.data.surface_store import SurfaceStore
+from pricer.instrumentation import instrumentation
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+WINDOW = 0.005            # seconds a request waits for others to share its simulation
+MAX_BATCH = 256           # requests priced by one simulation at most
+MAX_ITERATIONS = 1_000_000
+DEFAULT_ITERATIONS = 10_000
+LATENCY_SAMPLES = 10_000  # latencies kept for the percentiles
+REFRESH_INTERVAL = 30.0   # seconds between checks of the store for newer surfaces
+
+
+@dataclass(frozen=True)
+class PriceRequest:
+    ticker: str
+    strike: float
+    typ: str
+    days: int
+    iterations: int = DEFAULT_ITERATIONS
+    volatility: float | None = None   # flat volatility, the ticker's local volatility if None
+
+    @classmethod
+    def from_json(cls, payload: dict) -> "PriceRequest":
+        try:
+            request = cls(
+                ticker=str(payload["ticker"]).upper(),
+                strike=float(payload["strike"]),
+                typ=str(payload.get("type", "call")).lower(),
+                days=int(payload["days"]),
+                iterations=int(payload.get("iterations", DEFAULT_ITERATIONS)),
+                volatility=None if payload.get("volatility") is None else float(payload["volatility"]),
+            )
+        except KeyError as e:
+            raise ValueError(f"Missing field {e.args[0]!r}") from None
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid request: {e}") from None
+        if request.typ not in ("call", "put"):
+            raise ValueError(f"Unknown type {request.typ!r}, expected 'call' or 'put'")
+        if request.strike <= 0 or request.days < 1:
+            raise ValueError("Strike must be positive and days at least 1")
+        if not 2 <= request.iterations <= MAX_ITERATIONS:
+            raise ValueError(f"Iterations must be between 2 and {MAX_ITERATIONS}")
+        if request.volatility is not None and request.volatility <= 0:
+            raise ValueError("Volatility must be positive")
+        return request
+
+    @property
+    def batch_key(self) -> tuple:
+        return self.ticker, self.days, self.volatility
+
+
+@dataclass
+class PriceResponse:
+    ticker: str
+    strike: float
+    type: str
+    days: int
+    price: float | None = None
+    standard_error: float | None = None
+    iterations: int = 0          # paths the price was simulated with, at least the requested number
+    batch_size: int = 0          # requests that shared the simulation
+    error: str | None = None
+
+
+class SurfaceRegistry:
+    """
+    One MonteCarlo per ticker with its local volatility computed, shared by every request
+    """
+    def __init__(self, store: SurfaceStore | None = None, refresh_interval: float = REFRESH_INTERVAL):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._models = {}     # ticker -> (version, MonteCarlo, last checked)
+        self._lock = threading.Lock()
+        self._loading = defaultdict(threading.Lock) # one load per ticker at a time
+
+    def add(self, ticker: str, mc: MonteCarlo, version: str | None = None):
+        if mc.lv_surface is None:
+            mc.local_volatility()
+        with self._lock:
+            self._models[ticker] = (version, mc, time.monotonic())
+
+    def tickers(self) -> list[str]:
+        with self._lock:
+            return sorted(self._models)
+
+    def get(self, ticker: str) -> MonteCarlo:
+        with self._lock:
+            entry = self._models.get(ticker)
+        if entry is not None and (self.store is None or time.monotonic() - entry[2] < self.refresh_interval):
+            return entry[1]
+        if self.store is None:
+            raise KeyError(f"No surface loaded for {ticker}")
+        with self._lock:
+            loading = self._loading[ticker]
+        with loading:
+            with self._lock:
+                entry = self._models.get(ticker)
+            if entry is not None and time.monotonic() - entry[2] < self.refresh_interval:
+                return entry[1] # loaded while this thread waited
+            versions = self.store.versions(ticker)
+            if not versions:
+                if entry is not None:
+                    return entry[1]
+                raise KeyError(f"No surface stored for {ticker}")
+            if entry is not None and entry[0] == versions[-1]:
+                with self._lock:
+                    self._models[ticker] = (entry[0], entry[1], time.monotonic())
+                return entry[1]
+            with instrumentation.timer("service.load_surface"):
+                mc = MonteCarlo.from_snapshot(self.store.load(ticker, versions[-1]))
+                self.add(ticker, mc, versions[-1])
+            return mc
+
+
+class ServiceMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_batch_size = 0
+        self.simulation_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._completed = deque(maxlen=LATENCY_SAMPLES) # completion times, for the recent throughput
+
+    def record_request(self, latency: float, ok: bool):
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self._latencies.append(latency)
+            self._completed.append(time.monotonic())
+        instrumentation.count("service.requests")
+
+    def record_batch(self, size: int, seconds: float):
+        with self._lock:
+            self.batches += 1
+            self.batched_requests += size
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.simulation_seconds += seconds
+        instrumentation.count("service.batches")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = np.array(self._latencies)
+            completed = list(self._completed)
+            now = time.monotonic()
+            uptime = now - self.started
+            snapshot = {
+                "uptime_s": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "simulation_s": self.simulation_seconds,
+                "throughput_rps": self.requests / uptime if uptime > 0 else 0.0,
+            }
+        recent = now - completed[0] if len(completed) > 1 else 0.0
+        snapshot["recent_throughput_rps"] = len(completed) / recent if recent > 0 else 0.0
+        for name, q in (("p50", 50), ("p95", 95), ("p99", 99)):
+            snapshot[f"latency_{name}_ms"] = float(np.percentile(latencies, q)) * 1000 if latencies.size else None
+        snapshot["latency_max_ms"] = float(latencies.max()) * 1000 if latencies.size else None
+        return snapshot
+
+
+class MicroBatcher:
+    def __init__(self, registry: SurfaceRegistry, window: float = WINDOW, max_batch: int = MAX_BATCH, workers: int | None = None, metrics: ServiceMetrics | None = None):
+        """
+        Args
+            window - how long the first request of a batch waits for others, 0 prices every request on its own
+            max_batch - a batch that reaches this size is priced straight away
+            workers - simulations run concurrently (for different keys, or batches of the same key)
+        """
+        self.registry = registry
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.metrics = metrics or ServiceMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pricing")
+        self._lock = threading.Lock()
+        self._pending = {}  # batch key -> [(request, future, submitted)]
+
+    def submit(self, request: PriceRequest) -> Future:
+        future = Future()
+        ready = None
+        with self._lock:
+            batch = self._pending.setdefault(request.batch_key, [])
+            batch.append((request, future, time.perf_counter()))
+            if len(batch) >= self.max_batch or self.window <= 0:
+                ready = self._pending.pop(request.batch_key)
+            elif len(batch) == 1: # the first request of the batch sets off its timer
+                timer = threading.Timer(self.window, self._flush, args=(request.batch_key,))
+                timer.daemon = True
+                timer.start()
+        if ready is not None:
+            self._executor.submit(self._run, ready)
+        return future
+
+    def price(self, request: PriceRequest, timeout: float | None = None) -> PriceResponse:
+        return self.submit(request).result(timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _flush(self, key: tuple):
+        with self._lock:
+            batch = self._pending.pop(key, None)
+        if batch:
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: list):
+        ticker, days, volatility = batch[0][0].batch_key
+        responses = [PriceResponse(r.ticker, r.strike, r.typ, r.days, batch_size=len(batch)) for r, _, _ in batch]
+        start = time.perf_counter()
+        try:
+            mc = self.registry.get(ticker)
+            # The union of the strikes, each priced once however many requests asked for it
+            contracts = list(dict.fromkeys((r.strike, r.typ) for r, _, _ in batch))
+            iterations = max(r.iterations for r, _, _ in batch)
+            with instrumentation.timer("service.simulate"):
+                result = mc.simulate(
+                    mc.asset_price, mc.lv_surface if volatility is None else volatility,
+                    [ArithmeticAsian(strike, typ) for strike, typ in contracts], days, iterations
+                )
+            index = {contract: i for i, contract in enumerate(contracts)}
+            for response, (request, _, _) in zip(responses, batch):
+                i = index[(request.strike, request.typ)]
+                response.price = float(result.prices[i])
+                response.standard_error = float(result.standard_errors[i])
+                response.iterations = iterations
+        except KeyError as e:
+            for response in responses:
+                response.error = str(e.args[0])
+        except Exception as e:
+            logger.exception("Pricing batch for %s failed", ticker)
+            for response in responses:
+                response.error = f"Pricing failed: {e}"
+        self.metrics.record_batch(len(batch), time.perf_counter() - start)
+        done = time.perf_counter()
+        for response, (_, future, submitted) in zip(responses, batch):
+            self.metrics.record_request(done - submitted, response.error is None)
+            future.set_result(response)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._send(200, service.batcher.metrics.snapshot())
+        elif self.path == "/surfaces":
+            self._send(200, {"tickers": service.registry.tickers()})
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/price":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+            many = isinstance(payload, list)
+            requests = [PriceRequest.from_json(item) for item in (payload if many else [payload])]
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        # Submitted together so a list of requests shares simulations too
+        futures = [self.server.service.batcher.submit(request) for request in requests]
+        responses = [asdict(future.result()) for future in futures]
+        self._send(200, responses if many else responses[0])
+
+    def _send(self, status: int, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service: "PricingService"):
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+class PricingService:
+    def __init__(self, registry: SurfaceRegistry, host: str = "127.0.0.1", port: int = DEFAULT_PORT, window: float = WINDOW, max_batch: int = MAX_BATCH, workers: int | None = None):
+        """
+        Args
+            port - 0 picks a free port, see `url`
+        """
+        self.registry = registry
+        self.batcher = MicroBatcher(registry, window, max_batch, workers)
+        self._server = _Server((host, port), self)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "PricingService":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="pricing-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self.batcher.close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Local Asian option pricing service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--store", default=None, help="surface store directory, the default store if not given")
+    parser.add_argument("--tickers", nargs="*", default=[], help="surfaces to load and warm up before serving")
+    parser.add_argument("--window", type=float, default=WINDOW, help="seconds requests wait to be batched together")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--workers", type=int, default=None, help="concurrent simulations")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    store = SurfaceStore(args.store) if args.store else SurfaceStore()
+    registry = SurfaceRegistry(store)
+    for ticker in args.tickers:
+        registry.get(ticker.upper())
+    service = PricingService(registry, args.host, args.port, args.window, args.max_batch, args.workers)
+    logger.info("Serving %s on %s", registry.tickers() or "surfaces on demand", service.url)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from pricer.data.cache import TTLCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2025, 1, 1, 9, 30)
+
+    def __call__(self):
+        return self.now
+
+class TestTTLCache:
+
+    def test_only_missing_keys_are_fetched(self):
+        calls = []
+        def fetch(keys):
+            calls.append(keys)
+            return {key: key.lower() for key in keys}
+
+        cache = TTLCache(ttl=timedelta(minutes=1))
+        assert cache.get_many(["AAPL", "MSFT"], fetch) == {"AAPL": "aapl", "MSFT": "msft"}
+        assert cache.get_many(["MSFT", "TSLA", "TSLA"], fetch) == {"MSFT": "msft", "TSLA": "tsla"}
+        assert calls == [["AAPL", "MSFT"], ["TSLA"]]
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        calls = []
+        def fetch(keys):
+            calls.append(keys)
+            return {key: len(calls) for key in keys}
+
+        cache = TTLCache(ttl=timedelta(seconds=15), clock=clock)
+        assert cache.get_many(["AAPL"], fetch) == {"AAPL": 1}
+        clock.now += timedelta(seconds=10)
+        assert cache.get_many(["AAPL"], fetch) == {"AAPL": 1}
+        clock.now += timedelta(seconds=10)
+        assert cache.get_many(["AAPL"], fetch) == {"AAPL": 2}
+
+    def test_concurrent_callers_share_one_fetch(self):
+        """
+        A second caller asking for a symbol already being fetched waits for that fetch instead of
+        issuing its own request.
+        """
+        calls = []
+        started = threading.Event()
+        def slow_fetch(keys):
+            calls.append(list(keys))
+            started.set()
+            time.sleep(0.2)
+            return {key: 1.0 for key in keys}
+
+        cache = TTLCache(ttl=timedelta(minutes=1))
+        results = {}
+        first = threading.Thread(target=lambda: results.setdefault("first", cache.get_many(["AAPL", "MSFT"], slow_fetch)))
+        first.start()
+        started.wait()
+        results["second"] = cache.get_many(["MSFT", "TSLA"], slow_fetch)
+        first.join()
+
+        assert results["first"] == {"AAPL": 1.0, "MSFT": 1.0}
+        assert results["second"] == {"MSFT": 1.0, "TSLA": 1.0}
+        assert calls == [["AAPL", "MSFT"], ["TSLA"]]
@@ -0,0 +1,110 @@
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from alpaca.trading.enums import ContractType
+from pricer.data.chain_dataset import RAW, SOLVED, ChainDataset, rechunk, write_behind
+from pricer.data.data import Data
+from pricer.model.implied_volatility import black_scholes_price
+from pricer.plotter.surface_pipeline import SURFACE_COLUMNS
+
+@pytest.fixture
+def data_instance(mocker, monkeypatch):
+    monkeypatch.setenv("ALPACA_ID", "TEST_API_KEY")
+    monkeypatch.setenv("ALPACA_KEY", "TEST_SECRET_KEY")
+    mocker.patch("pricer.data.data.TradingClient")
+    mocker.patch("pricer.data.data.StockHistoricalDataClient")
+    data = Data()
+    data.asset_price_dict = {"TEST": 100.0}
+    data.dividend_yield_dict = {"TEST": 0.0}
+    return data
+
+def contracts():
+    """
+    Calls and puts on every strike of a few expiries, priced at 5% rates and a 2% dividend yield
+    """
+    listed = []
+    for days in (30, 90, 200):
+        expiry = (datetime.now() + timedelta(days=days)).date()
+        strikes = np.arange(70.0, 131.0, 4.0)
+        for typ in (ContractType.CALL, ContractType.PUT):
+            prices = black_scholes_price(100.0, 0.02, strikes, days / 365, 0.05, 0.25 + 0.001 * (100 - strikes), typ == ContractType.CALL)
+            listed += [
+                SimpleNamespace(close_price=px, id="id", symbol=f"TEST{days}{typ.value}{k}", name="TEST", expiration_date=expiry,
+                                underlying_symbol="TEST", type=typ, style="american", strike_price=k, open_interest=10, size=100)
+                for k, px in zip(strikes, prices)
+            ]
+    return listed
+
+class SlowDataset(ChainDataset):
+    def append(self, ticker, stage, chunk):
+        time.sleep(0.01)
+        return super().append(ticker, stage, chunk)
+
+class TestChainDataset:
+
+    def test_rechunk(self):
+        chunks = list(rechunk([[1, 2, 3], [4], [5, 6, 7, 8, 9]], 4, lambda rows: pd.DataFrame({"x": rows})))
+        assert [chunk["x"].tolist() for chunk in chunks] == [[1, 2, 3, 4], [5, 6, 7, 8], [9]]
+
+    def test_round_trip_reads_only_requested_columns(self, tmp_path):
+        dataset = ChainDataset(tmp_path)
+        chain = pd.DataFrame({"symbol": [f"OPT{i}" for i in range(25)], "strike_price": np.arange(25.0), "days_to_expiry": np.arange(25)})
+        written = write_behind(dataset, "TEST", SOLVED, [chain.iloc[:10], chain.iloc[10:20], chain.iloc[20:]])
+
+        assert written == 25 and dataset.rows("TEST") == 25
+        assert dataset.parts("TEST") == ["000000", "000001", "000002"]
+        pd.testing.assert_frame_equal(dataset.read("TEST"), chain, check_dtype=False)
+        only = dataset.read("TEST", columns=["strike_price"])
+        assert list(only.columns) == ["strike_price"]
+        with pytest.raises(KeyError):
+            dataset.read("TEST", columns=["calculated_iv"])
+        assert dataset.tickers() == ["TEST"] and dataset.tickers(RAW) == []
+
+    def test_backpressure(self, tmp_path):
+        dataset = SlowDataset(tmp_path)
+        produced, in_flight = 0, []
+
+        def chunks():
+            nonlocal produced
+            for i in range(20):
+                produced += 1
+                in_flight.append(produced - len(dataset.parts("TEST", RAW)))
+                yield pd.DataFrame({"x": [float(i)]})
+
+        write_behind(dataset, "TEST", RAW, chunks(), max_pending=2)
+        # Queued, being written and being produced - never more, however far the producer could run ahead
+        assert max(in_flight) <= 2 + 2
+        assert dataset.rows("TEST", RAW) == 20
+
+    def test_writer_errors_are_raised(self, tmp_path, mocker):
+        dataset = ChainDataset(tmp_path)
+        mocker.patch.object(dataset, "append", side_effect=OSError("disk full"))
+        with pytest.raises(OSError, match="disk full"):
+            write_behind(dataset, "TEST", RAW, (pd.DataFrame({"x": [i]}) for i in range(10)), max_pending=1)
+
+    def test_streamed_chain_matches_in_memory_chain(self, data_instance, tmp_path, mocker):
+        listed = contracts()
+        pages = [SimpleNamespace(option_contracts=listed[i:i + 7], next_page_token="NEXT" if i + 7 < len(listed) else None) for i in range(0, len(listed), 7)]
+        data_instance.trade_client.get_option_contracts.side_effect = pages + pages
+        mocker.patch.object(pd.DataFrame, "to_csv")
+        dataset = ChainDataset(tmp_path)
+
+        data_instance.stream_active_options(["TEST"], dataset, limit=10_000, server_side_filters=False, chunk_size=10, max_pending=1)
+        streamed = dataset.read("TEST")
+        streamed_stats = data_instance.iv_stats_dict["TEST"]
+        data_instance.get_active_options_api(["TEST"], limit=10_000, server_side_filters=False)
+        expected = data_instance.contracts_dict["TEST"]
+
+        assert len(dataset.parts("TEST")) > 1 and dataset.parts("TEST", RAW) == []
+        assert data_instance.fetch_stats_dict["TEST"]["pages"] == len(pages)
+        assert data_instance.forward_curve_dict["TEST"]["risk_free_rate"].to_numpy() == pytest.approx(0.05, abs=1e-3)
+        assert streamed_stats == data_instance.iv_stats_dict["TEST"]
+        assert streamed["symbol"].tolist() == expected["symbol"].tolist()
+        for column in ("calculated_iv", "risk_free_rate", "dividend_yield", "days_to_expiry"):
+            np.testing.assert_allclose(streamed[column], expected[column])
+
+        surfaces = dataset.chains(columns=SURFACE_COLUMNS)
+        assert list(surfaces) == ["TEST"] and list(surfaces["TEST"].columns) == SURFACE_COLUMNS
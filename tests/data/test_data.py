@@ -3,7 +3,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from pricer.data.data import Data
+from pricer.model.implied_volatility import IVResult, IVStatus
 import collections
+from types import SimpleNamespace
+from alpaca.trading.enums import ContractType
 
 # --- Fixtures ---
 
@@ -75,15 +78,72 @@ class TestDataProcessing:
             }
         ])
 
-        # Mock the internal _calculate_iv method to return a fixed float
+        # Mock the internal _calculate_iv_batch method to return a fixed float
         # This isolates the test to just the dataframe cleaning logic
-        mocker.patch.object(data_instance, '_calculate_iv', return_value=0.25)
+        mocker.patch.object(data_instance, '_calculate_iv_batch', return_value=IVResult(
+            iv=np.array([0.25]), status=np.array([IVStatus.SOLVED_NEWTON], dtype=np.int8), iterations=np.array([3])
+        ))
 
         cleaned_df = data_instance.clean_up_df(df)
 
         assert len(cleaned_df) == 1
         assert cleaned_df.iloc[0]["period_year"] == pytest.approx(1.0, abs=0.01)
         assert cleaned_df.iloc[0]["calculated_iv"] == 0.25
+        assert data_instance.iv_stats_dict["TEST"]["status_counts"]["SOLVED_NEWTON"] == 1
+
+    def test_clean_up_df_telemetry(self, data_instance):
+        """
+        Dropped contracts are accounted for per ticker, by reason.
+        """
+        data_instance.asset_price_dict = {"TEST": 100.0}
+        data_instance.dividend_yield_dict = {"TEST": 0.0}
+        far = (datetime.now() + timedelta(days=180)).strftime("%Y-%m-%d")
+        near = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+        rows = [
+            (far, 110, 5.0),   # solvable
+            (far, 110, 150.0), # worth more than the stock
+            (near, 110, 1.0),  # under the time cap
+            (far, 190, 1.0),   # outside the moneyness range
+        ]
+        df = pd.DataFrame([
+            {"underlying_symbol": "TEST", "expiration_date": exp, "strike_price": k, "close_price": px, "type": "call", "style": "american"}
+            for exp, k, px in rows
+        ])
+
+        cleaned_df = data_instance.clean_up_df(df)
+        stats = data_instance.iv_stats_dict["TEST"]
+
+        assert len(cleaned_df) == 1
+        assert stats["contracts"] == 4
+        assert stats["status_counts"]["SOLVED_NEWTON"] + stats["status_counts"]["SOLVED_BISECTION"] == 1
+        assert stats["status_counts"]["ABOVE_UPPER_BOUND"] == 1
+        assert stats["status_counts"]["UNDER_TIME_CAP"] == 1
+        assert stats["status_counts"]["OUTSIDE_MONEYNESS"] == 1
+        assert stats["total_iterations"] == cleaned_df.iloc[0]["iv_iterations"]
+
+    def test_clean_up_df_implies_rates_from_parity(self, data_instance):
+        """
+        ITM contracts are only used to pair up for put-call parity - the IV solve runs on the OTM
+        ones with the implied r and q instead of the defaults.
+        """
+        from pricer.model.implied_volatility import black_scholes_price
+        data_instance.asset_price_dict = {"TEST": 100.0}
+        data_instance.dividend_yield_dict = {"TEST": 0.0}
+        expiry = (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%d")
+        strikes = np.arange(92.0, 109.0, 2.0)
+        rows = []
+        for typ in ("call", "put"):
+            prices = black_scholes_price(100.0, 0.02, strikes, 1.0, 0.05, 0.3, typ == "call")
+            rows += [{"underlying_symbol": "TEST", "expiration_date": expiry, "strike_price": k, "close_price": px, "type": typ, "style": "american"}
+                     for k, px in zip(strikes, prices)]
+
+        cleaned_df = data_instance.clean_up_df(pd.DataFrame(rows))
+
+        curve = data_instance.forward_curve_dict["TEST"]
+        assert curve["risk_free_rate"].iloc[0] == pytest.approx(0.05, abs=1e-3)
+        assert curve["dividend_yield"].iloc[0] == pytest.approx(0.02, abs=1e-3)
+        assert (((cleaned_df["type"] == "call") & (cleaned_df["strike_price"] > 100)) | ((cleaned_df["type"] == "put") & (cleaned_df["strike_price"] < 100))).all()
+        np.testing.assert_allclose(cleaned_df["calculated_iv"], 0.3, atol=1e-3)
 
 class TestApiInteraction:
     
@@ -147,4 +207,140 @@ class TestApiInteraction:
         data_instance.get_underlying_details([symbol])
             
         assert mock_get.call_count == 2
-        assert data_instance.dividend_yield_dict[symbol] == pytest.approx(0.02)
\ No newline at end of file
+        assert data_instance.dividend_yield_dict[symbol] == pytest.approx(0.02)
+
+    def test_repeated_underlying_details_are_cached(self, data_instance, mocker):
+        """
+        A second call within the TTLs makes no corporate-actions or latest-trade requests
+        and does not double count the dividends.
+        """
+        symbol = "CACHED"
+        data_instance.stock_client.get_stock_latest_trade = mocker.MagicMock(
+            return_value={symbol: mocker.MagicMock(price=50.0)}
+        )
+        mock_get = mocker.patch("requests.get")
+        mock_get.return_value.json.return_value = {
+            "corporate_actions": {"cash_dividends": [{"symbol": symbol, "rate": 1.0}]},
+            "next_page_token": None
+        }
+
+        data_instance.get_underlying_details([symbol])
+        data_instance.get_underlying_details([symbol])
+
+        assert mock_get.call_count == 1
+        assert data_instance.stock_client.get_stock_latest_trade.call_count == 1
+        assert data_instance.dividend_yield_dict[symbol] == pytest.approx(0.02)
+
+    def test_underlying_details_without_dividends(self, data_instance, mocker):
+        data_instance.stock_client.get_stock_latest_trade = mocker.MagicMock(
+            return_value={"AAPL": mocker.MagicMock(price=100.0)}
+        )
+        mock_get = mocker.patch("requests.get")
+
+        data_instance.get_underlying_details(["AAPL"], fetch_dividends=False)
+
+        assert mock_get.call_count == 0
+        assert data_instance.asset_price_dict["AAPL"] == 100.0
+
+    def test_caches_are_shared_between_instances(self, mocker, mock_alpaca_env):
+        mocker.patch("pricer.data.data.TradingClient")
+        mocker.patch("pricer.data.data.StockHistoricalDataClient")
+        first = Data()
+        second = Data(dividend_cache=first.dividend_cache, spot_cache=first.spot_cache)
+        latest_trade = mocker.MagicMock(return_value={"AAPL": mocker.MagicMock(price=100.0)})
+        first.stock_client.get_stock_latest_trade = second.stock_client.get_stock_latest_trade = latest_trade
+        mock_get = mocker.patch("requests.get")
+        mock_get.return_value.json.return_value = {"corporate_actions": {}, "next_page_token": None}
+
+        first.get_underlying_details(["AAPL"])
+        second.get_underlying_details(["AAPL"])
+
+        assert mock_get.call_count == 1
+        assert latest_trade.call_count == 1
+        assert second.dividend_yield_dict["AAPL"] == 0
+
+    def test_option_fetch_server_side_filters(self, data_instance, mocker):
+        """
+        Calls and puts are requested separately, restricted to OTM strikes within the moneyness
+        range (plus the near ATM parity band) and expiries past the time cap, so (almost) nothing
+        downloaded is thrown away.
+        """
+        symbol = "FILTERED"
+        data_instance.asset_price_dict[symbol] = 100.0
+        expiry = (datetime.now() + timedelta(days=60)).date()
+
+        def contract(strike, typ, close_price=2.0):
+            return SimpleNamespace(
+                close_price=close_price, id="id", symbol=f"{symbol}{strike}", name=symbol, expiration_date=expiry,
+                underlying_symbol=symbol, type=typ, style="american", strike_price=strike, open_interest=10, size=100
+            )
+
+        pages = [
+            SimpleNamespace(option_contracts=[contract(110.0, ContractType.CALL), contract(120.0, ContractType.CALL)], next_page_token="NEXT"),
+            SimpleNamespace(option_contracts=[contract(130.0, ContractType.CALL, close_price=0.01)], next_page_token=None),
+            SimpleNamespace(option_contracts=[contract(90.0, ContractType.PUT)], next_page_token=None),
+        ]
+        data_instance.trade_client.get_option_contracts = mocker.MagicMock(side_effect=pages)
+        mocker.patch.object(data_instance, "clean_up_df", side_effect=lambda df: df)
+        mocker.patch.object(pd.DataFrame, "to_csv")
+
+        data_instance.get_active_options_api([symbol])
+
+        requests_made = [call.args[0] for call in data_instance.trade_client.get_option_contracts.call_args_list]
+        assert [req.type for req in requests_made] == [ContractType.CALL, ContractType.CALL, ContractType.PUT]
+        assert requests_made[0].strike_price_gte == "90.00" and requests_made[0].strike_price_lte == "170.00"
+        assert requests_made[1].page_token == "NEXT"
+        assert requests_made[2].strike_price_gte == "30.00" and requests_made[2].strike_price_lte == "110.00"
+        assert requests_made[0].expiration_date_gte == (datetime.now() + timedelta(days=7)).date()
+
+        assert len(data_instance.contracts_dict[symbol]) == 3
+        assert data_instance.fetch_stats_dict[symbol] == {
+            "pages": 3, "contracts_received": 4, "contracts_kept": 3, "contracts_discarded": 1
+        }
+
+    def test_option_fetch_counts_avoided_contracts(self, data_instance, mocker):
+        """
+        The contracts the filters saved downloading come from an unfiltered fetch that only counts, once per
+        ticker and limit while the cache keeps it.
+        """
+        symbol = "AVOIDED"
+        data_instance.asset_price_dict[symbol] = 100.0
+        expiry = (datetime.now() + timedelta(days=60)).date()
+
+        def contract(strike, typ):
+            return SimpleNamespace(
+                close_price=2.0, id="id", symbol=f"{symbol}{strike}", name=symbol, expiration_date=expiry,
+                underlying_symbol=symbol, type=typ, style="american", strike_price=strike, open_interest=10, size=100
+            )
+
+        calls = SimpleNamespace(option_contracts=[contract(110.0, ContractType.CALL)], next_page_token=None)
+        puts = SimpleNamespace(option_contracts=[contract(90.0, ContractType.PUT)], next_page_token=None)
+        unfiltered = [
+            SimpleNamespace(option_contracts=[contract(k, ContractType.CALL) for k in (50.0, 110.0, 200.0)], next_page_token="NEXT"),
+            SimpleNamespace(option_contracts=[contract(k, ContractType.PUT) for k in (20.0, 90.0)], next_page_token=None),
+        ]
+        data_instance.trade_client.get_option_contracts = mocker.MagicMock(side_effect=[calls, puts, *unfiltered, calls, puts])
+        mocker.patch.object(data_instance, "clean_up_df", side_effect=lambda df: df)
+        mocker.patch.object(pd.DataFrame, "to_csv")
+
+        data_instance.get_active_options_api([symbol], count_avoided=True)
+        assert data_instance.fetch_stats_dict[symbol]["contracts_received"] == 2
+        assert data_instance.fetch_stats_dict[symbol]["contracts_avoided"] == 3
+
+        data_instance.get_active_options_api([symbol], count_avoided=True)
+        assert data_instance.trade_client.get_option_contracts.call_count == 6 # the unfiltered count came from the cache
+        assert data_instance.fetch_stats_dict[symbol]["contracts_avoided"] == 3
+
+    def test_option_fetch_without_server_side_filters(self, data_instance, mocker):
+        symbol = "UNFILTERED"
+        data_instance.asset_price_dict[symbol] = 100.0
+        data_instance.trade_client.get_option_contracts = mocker.MagicMock(
+            return_value=SimpleNamespace(option_contracts=[], next_page_token=None)
+        )
+        mocker.patch.object(data_instance, "clean_up_df", side_effect=lambda df: df)
+        mocker.patch.object(pd.DataFrame, "to_csv")
+
+        data_instance.get_active_options_api([symbol], server_side_filters=False)
+
+        (req,) = [call.args[0] for call in data_instance.trade_client.get_option_contracts.call_args_list]
+        assert req.type is None and req.strike_price_gte is None and req.strike_price_lte is None
@@ -0,0 +1,119 @@
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from datetime import date, datetime
+import os
+from pricer.data.history import COMPACTED, HistoryStore, summary_metrics
+
+def make_chain(atm_vol, spot=100.0):
+    strikes = np.arange(70.0, 131.0, 5.0)
+    days = np.repeat([14, 30, 60, 120, 250, 400], len(strikes))
+    strike_price = np.tile(strikes, 6)
+    # Smile with a downward skew: higher vol for lower strikes
+    calculated_iv = atm_vol - 0.2 * np.log(strike_price / spot) + 0.5 * np.log(strike_price / spot) ** 2
+    return pd.DataFrame({
+        "symbol": [f"OPT{i}" for i in range(len(days))],
+        "type": np.where(strike_price >= spot, "call", "put"),
+        "expiration_date": pd.Timestamp("2025-01-01") + pd.to_timedelta(days, unit="D"),
+        "days_to_expiry": days,
+        "strike_price": strike_price,
+        "calculated_iv": calculated_iv,
+    })
+
+class TestHistoryStore:
+
+    def test_summary_metrics(self):
+        metrics = summary_metrics(make_chain(0.25), 100.0)
+        assert metrics["atm_iv_30d"] == pytest.approx(0.25)
+        assert metrics["atm_iv_365d"] == pytest.approx(0.25)
+        assert metrics["skew_30d"] > 0
+        assert metrics["contracts"] == 78
+
+    def test_round_trip(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        chain = make_chain(0.2)
+        grids = {"implied_vol": np.full((3, 3), 0.2)}
+        batch = store.append("TEST", chain, 100.0, grids=grids, timestamp=datetime(2025, 1, 2, 15, 0))
+
+        read = store.read_chain("TEST", date(2025, 1, 2))
+        pd.testing.assert_frame_equal(read, chain, check_dtype=False)
+        assert read["expiration_date"].dtype == chain["expiration_date"].dtype
+        only = store.read_chain("TEST", date(2025, 1, 2), batch, columns=["strike_price", "calculated_iv"])
+        assert list(only.columns) == ["strike_price", "calculated_iv"]
+        np.testing.assert_array_equal(store.read_grids("TEST", date(2025, 1, 2))["implied_vol"], grids["implied_vol"])
+        with pytest.raises(KeyError):
+            store.read_chain("TEST", date(2025, 1, 2), columns=["nope"])
+        with pytest.raises(FileNotFoundError):
+            store.read_chain("TEST", date(2025, 1, 3))
+
+    def test_daily_series_and_pruning(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        for day in range(1, 6):
+            for hour, vol in ((10, 0.5), (16, 0.1 + day / 100)):
+                store.append("TEST", make_chain(vol), 100.0, timestamp=datetime(2025, 3, day, hour))
+
+        series = store.daily("TEST", "atm_iv_30d", start=date(2025, 3, 2), end=date(2025, 3, 4))
+        assert list(series.index) == [date(2025, 3, 2), date(2025, 3, 3), date(2025, 3, 4)]
+        np.testing.assert_allclose(series.to_numpy(), [0.12, 0.13, 0.14])
+        assert store.partitions("TEST", start=date(2025, 3, 4)) == [date(2025, 3, 4), date(2025, 3, 5)]
+
+        scanned = store.scan("TEST", date(2025, 3, 4), date(2025, 3, 5), columns=["strike_price"])
+        assert len(scanned) == 4 * 78 and scanned["batch"].nunique() == 4
+        assert list(scanned.columns) == ["strike_price", "batch"]
+
+    def test_compaction_keeps_every_snapshot(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        batches = [
+            store.append("TEST", make_chain(vol), 100.0, grids={"implied_vol": np.full((2, 2), vol)}, timestamp=datetime(2025, 3, day, hour))
+            for day, hour, vol in ((1, 10, 0.2), (1, 16, 0.3), (2, 10, 0.4))
+        ]
+        before = store.scan("TEST")
+
+        assert store.compact("TEST", before=date(2025, 3, 2)) == 1
+        assert sorted(p.name for p in (tmp_path / "TEST" / "2025-03-01").iterdir()) == ["compacted"]
+
+        pd.testing.assert_frame_equal(store.scan("TEST"), before)
+        first = store.read_chain("TEST", date(2025, 3, 1), batches[0])
+        np.testing.assert_allclose(first["calculated_iv"], make_chain(0.2)["calculated_iv"])
+        assert store.read_grids("TEST", date(2025, 3, 1), batches[0]) == {}
+        assert store.read_grids("TEST", date(2025, 3, 1))["implied_vol"][0, 0] == 0.3
+        assert len(store.snapshots("TEST")) == 3
+        assert store.compact("TEST", before=date(2025, 3, 2)) == 0 # nothing new to merge
+
+    def test_interrupted_compaction_is_recovered(self, tmp_path, mocker):
+        store = HistoryStore(tmp_path)
+        for hour, vol in ((10, 0.2), (16, 0.3)):
+            store.append("TEST", make_chain(vol), 100.0, timestamp=datetime(2025, 3, 1, hour))
+        store.compact("TEST", before=date(2025, 3, 2))
+        store.append("TEST", make_chain(0.4), 100.0, timestamp=datetime(2025, 3, 1, 18))
+        before = store.scan("TEST")
+        partition = tmp_path / "TEST" / "2025-03-01"
+
+        # Die after the old compacted partition is moved aside, before the merged one takes its place
+        replace = os.replace
+        def crash(src, dst):
+            if dst == partition / COMPACTED:
+                raise KeyboardInterrupt
+            replace(src, dst)
+        mocker.patch("pricer.data.history.os.replace", side_effect=crash)
+        with pytest.raises(KeyboardInterrupt):
+            store.compact("TEST", before=date(2025, 3, 2))
+        mocker.stopall()
+        assert not (partition / COMPACTED).exists()
+
+        assert store.compact("TEST", before=date(2025, 3, 2)) == 1
+        assert sorted(p.name for p in partition.iterdir()) == ["compacted"]
+        pd.testing.assert_frame_equal(store.scan("TEST"), before)
+        assert all(len(store.read_chain("TEST", date(2025, 3, 1), batch)) == 78 for batch in before["batch"])
+
+    def test_concurrent_appends(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        chain = make_chain(0.2)
+        timestamps = [datetime(2025, 1, 2, 15, 0, second) for second in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            batches = list(pool.map(lambda timestamp: store.append("TEST", chain, 100.0, timestamp=timestamp), timestamps))
+
+        index = store.snapshots("TEST")
+        assert sorted(index["batch"]) == sorted(batches)
+        assert (tmp_path / "TEST" / "index.csv").read_text().count("date,batch") == 1
@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+from datetime import datetime
+from pricer.data.surface_store import SurfaceStore
+from pricer.model.monte_carlo import MonteCarlo
+from tests.configure_tests import flat_vol_surface
+
+class TestSurfaceStore:
+
+    def test_round_trip_and_versions(self, tmp_path, flat_vol_surface):
+        store = SurfaceStore(tmp_path)
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+
+        first = store.save(mc.to_snapshot("TEST", timestamp=datetime(2025, 1, 2, 10, 0)))
+        second = store.save(mc.to_snapshot("TEST", timestamp=datetime(2025, 1, 3, 10, 0)))
+
+        assert store.versions("TEST") == [first, second]
+        assert store.versions("OTHER") == []
+
+        snapshot = store.load("TEST")
+        assert snapshot.version == second
+        assert snapshot.ticker == "TEST"
+        assert snapshot.spot == flat_vol_surface["asset_price"]
+        assert snapshot.r == flat_vol_surface["r"]
+        assert isinstance(snapshot.implied_vol, np.memmap)
+        np.testing.assert_array_equal(snapshot.implied_vol, mc.implied_vol)
+        np.testing.assert_array_equal(snapshot.local_vol, mc.lv_raw)
+
+        assert store.load("TEST", version=first).timestamp == datetime(2025, 1, 2, 10, 0)
+
+    def test_missing_ticker(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            SurfaceStore(tmp_path).load("NOPE")
+
+    def test_monte_carlo_from_snapshot_is_zero_copy(self, tmp_path, flat_vol_surface):
+        """
+        A Monte Carlo built from a mapped snapshot uses the mapped grids directly and skips Dupire.
+        """
+        store = SurfaceStore(tmp_path)
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+        store.save(mc.to_snapshot("TEST"))
+
+        snapshot = store.load("TEST")
+        restored = MonteCarlo.from_snapshot(snapshot)
+
+        assert np.shares_memory(restored.implied_vol, snapshot.implied_vol)
+        assert np.shares_memory(restored.lv_raw, snapshot.local_vol)
+        points = np.array([[95.0, 0.2], [110.0, 0.3]])
+        np.testing.assert_allclose(restored.lv_surface(points), mc.lv_surface(points))
+
+    def test_snapshot_without_local_vol(self, tmp_path, flat_vol_surface):
+        store = SurfaceStore(tmp_path)
+        mc = MonteCarlo(**flat_vol_surface)
+        store.save(mc.to_snapshot("TEST"))
+
+        restored = MonteCarlo.from_snapshot(store.load("TEST", mmap_mode=None))
+
+        assert restored.lv_surface is None
+        restored.local_volatility()
+        assert restored.lv_raw[2, 2] == pytest.approx(0.2, abs=0.01)
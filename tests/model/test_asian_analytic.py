@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from pricer.model.asian_analytic import arithmetic_asian_price, arithmetic_moments, control_variate, geometric_asian_price
+from pricer.model.implied_volatility import black_scholes_price
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, GeometricAsian
+from tests.configure_tests import flat_vol_surface
+
+class TestAsianAnalytic:
+
+    def test_single_fixing_is_european(self):
+        european = black_scholes_price(100.0, 0.01, 105.0, 1 / 252, 0.04, 0.3, True)
+        assert geometric_asian_price(100.0, 105.0, 1, 0.3, 0.04, 0.01) == pytest.approx(european)
+        assert arithmetic_asian_price(100.0, 105.0, 1, 0.3, 0.04, 0.01) == pytest.approx(european)
+
+    def test_moments_match_the_double_sum(self):
+        n, vol, r, q = 20, 0.3, 0.04, 0.01
+        t = np.arange(1, n + 1) / 252
+        m1 = 100.0 * np.mean(np.exp((r - q) * t))
+        m2 = 100.0 ** 2 * np.mean(np.exp((r - q) * (t[:, None] + t[None, :]) + vol ** 2 * np.minimum(t[:, None], t[None, :])))
+        assert arithmetic_moments(100.0, n, vol, r, q) == pytest.approx((m1, m2))
+
+    def test_vectorised_with_put_call_parity(self):
+        strikes = np.array([[80.0], [100.0], [120.0]])
+        days = np.array([5, 30, 120, 252])
+        calls = arithmetic_asian_price(100.0, strikes, days, 0.25, 0.04, 0.01, "call")
+        puts = arithmetic_asian_price(100.0, strikes, days, 0.25, 0.04, 0.01, "put")
+
+        assert calls.shape == (3, 4)
+        assert calls[2, 1] == pytest.approx(arithmetic_asian_price(100.0, 120.0, 30, 0.25, 0.04, 0.01))
+        m1, _ = arithmetic_moments(100.0, days, 0.25, 0.04, 0.01)
+        np.testing.assert_allclose(calls - puts, np.exp(-0.04 * days / 252) * (m1 - strikes))
+
+    @pytest.mark.parametrize("strike, typ", [(100.0, "call"), (110.0, "call"), (95.0, "put")])
+    def test_regression_against_monte_carlo(self, flat_vol_surface, strike, typ):
+        mc = MonteCarlo(**flat_vol_surface)
+        result = mc.simulate(100.0, 0.2, [GeometricAsian(strike, typ), control_variate(100.0, strike, typ, 60, 0.2, mc.r)], 60, 50_000, seed=0, backend="numpy")
+
+        # Geometric is exact for the flat vol walk
+        assert result.prices[0] == pytest.approx(geometric_asian_price(100.0, strike, 60, 0.2, mc.r, 0.0, typ), abs=4 * result.standard_errors[0])
+        # Moment matching is an approximation, within a basis point of the spot here
+        assert result.prices[1] == pytest.approx(arithmetic_asian_price(100.0, strike, 60, 0.2, mc.r, 0.0, typ), abs=0.01)
+
+    def test_control_variate(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        plain, controlled = ArithmeticAsian(105.0, "call"), control_variate(100.0, 105.0, "call", 30, 0.2, mc.r)
+        result = mc.simulate(100.0, 0.2, [plain, controlled], 30, 20_000, seed=1, backend="numpy")
+
+        assert result.standard_errors[1] < result.standard_errors[0] / 20
+        assert result.prices[1] == pytest.approx(result.prices[0], abs=4 * result.standard_errors[0])
@@ -0,0 +1,65 @@
+import threading
+import pytest
+import numpy as np
+from pricer.model.background import CANCELLED, DONE, FAILED, BackgroundSimulation
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, European, FixedScheduleAsian
+from tests.configure_tests import flat_vol_surface
+
+class TestBackgroundSimulation:
+
+    def test_batches_merge_to_the_pooled_estimate(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        payoffs = [ArithmeticAsian(105, "call"), European(105, "call")]
+
+        progress = BackgroundSimulation(mc, 100, 0.2, payoffs, 20, iterations=3001, batch_size=1000, seed=11).start().wait(timeout=30)
+
+        # Same batches, run by hand - the remainder of 1 path rides along with the last batch
+        seeds = np.random.SeedSequence(11).spawn(3)
+        batches = [mc.simulate(100, 0.2, payoffs, 20, n, seed=seed) for n, seed in zip([1000, 1000, 1001], seeds)]
+        expected = (1000 * batches[0].prices + 1000 * batches[1].prices + 1001 * batches[2].prices) / 3001
+
+        assert progress.status == DONE and progress.paths_done == 3001
+        np.testing.assert_allclose(progress.prices, expected)
+        assert [paths for paths, _, _ in progress.history] == [1000, 2000, 3001]
+        # Pooled standard error is about a batch's over sqrt(number of batches)
+        np.testing.assert_allclose(progress.standard_errors, batches[0].standard_errors / np.sqrt(3), rtol=0.15)
+        assert progress.paths.shape == (200, 21)
+
+    def test_cancel_keeps_partial_results(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        second_batch, release = threading.Event(), threading.Event()
+
+        class BlockingPut(European):
+            batches = 0
+
+            def start(self, iterations, current_price, path_length):
+                # A batch only starts once the previous one was merged - hold the second one until cancelled
+                BlockingPut.batches += 1
+                if BlockingPut.batches == 2:
+                    second_batch.set()
+                    release.wait()
+                return super().start(iterations, current_price, path_length)
+
+        sim = BackgroundSimulation(mc, 100, 0.2, [BlockingPut(100, "put")], 10, iterations=10000, batch_size=100, seed=5)
+
+        sim.start()
+        assert second_batch.wait(timeout=30)
+        assert sim.snapshot().paths_done == 100
+        sim.cancel()
+        release.set()
+        progress = sim.wait(timeout=30)
+
+        assert progress.status == CANCELLED
+        assert 0 < progress.paths_done < progress.iterations
+        assert np.isfinite(progress.prices[0]) and np.isfinite(progress.standard_errors[0])
+        assert progress.history[-1][0] == progress.paths_done
+
+    def test_failure_is_reported(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        sim = BackgroundSimulation(mc, 100, 0.2, [FixedScheduleAsian(100, "call", (50,))], 10, iterations=100)
+
+        progress = sim.start().wait(timeout=30)
+
+        assert progress.status == FAILED and "Fixings" in progress.error
+        assert progress.finished
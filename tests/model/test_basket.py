@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+from pricer.model.basket import BasketMonteCarlo, default_correlation
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, European
+from tests.configure_tests import flat_vol_surface
+
+def skewed_surface(flat_vol_surface, asset_price=100.0):
+    surface = dict(flat_vol_surface, asset_price=asset_price)
+    strikes = np.asarray(surface["strike_prices"])
+    surface["implied_vol"] = 0.2 - 0.1 * np.log(strikes / asset_price) # put skew, so the LV varies with the price
+    return surface
+
+class TestBasketMonteCarlo:
+
+    def test_single_asset_matches_monte_carlo(self, flat_vol_surface):
+        """
+        One asset with a correlation of 1 draws the same normals as MonteCarlo and looks up the same LV
+        """
+        mc = MonteCarlo(**skewed_surface(flat_vol_surface))
+        mc.local_volatility()
+        basket = BasketMonteCarlo([mc], [[1.0]], weights=[1.0])
+        payoffs = [ArithmeticAsian(100, "call"), European(95, "put")]
+
+        expected = mc.simulate(100, mc.lv_surface, payoffs, 40, 5000, seed=7, backend="numpy")
+        result = basket.simulate("local", payoffs, 40, 5000, seed=7)
+
+        np.testing.assert_allclose(result.prices, expected.prices, rtol=1e-10)
+        np.testing.assert_allclose(result.paths, expected.paths, rtol=1e-10)
+
+    def test_stacked_lookup_matches_each_model(self, flat_vol_surface):
+        models = [MonteCarlo(**skewed_surface(flat_vol_surface, price)) for price in (100.0, 90.0)]
+        basket = BasketMonteCarlo(models, np.eye(2)).local_volatility()
+        prices = np.array([[70.0, 95.0, 101.3, 130.0], [85.0, 100.0, 110.0, 121.0]])
+        for t in (0.01, 0.2, 0.35, 1.0):
+            lv = basket.get_lv(t, prices)
+            for a, model in enumerate(models):
+                np.testing.assert_allclose(lv[a], model.get_lv(t, prices[a]))
+
+    def test_correlation_moves_the_basket_price(self, flat_vol_surface):
+        """
+        A basket of perfectly correlated assets is a single asset, less correlation diversifies its volatility away
+        """
+        models = [MonteCarlo(**flat_vol_surface), MonteCarlo(**flat_vol_surface)]
+        payoffs = [ArithmeticAsian(100, "call")]
+        single = MonteCarlo(**flat_vol_surface).simulate(100, 0.2, payoffs, 60, 20000, seed=1, backend="numpy")
+        prices = {
+            rho: BasketMonteCarlo(models, [[1, rho], [rho, 1]]).simulate(0.2, payoffs, 60, 20000, seed=1).prices[0]
+            for rho in (0.0, 0.5, 0.999999)
+        }
+        assert prices[0.999999] == pytest.approx(single.prices[0], abs=4 * single.standard_errors[0])
+        assert prices[0.0] < prices[0.5] < prices[0.999999]
+
+    def test_invalid_inputs(self, flat_vol_surface):
+        models = [MonteCarlo(**flat_vol_surface), MonteCarlo(**flat_vol_surface)]
+        with pytest.raises(ValueError):
+            BasketMonteCarlo(models, [[1, 2], [2, 1]]) # not positive definite
+        with pytest.raises(ValueError):
+            BasketMonteCarlo(models, np.eye(3))
+        with pytest.raises(ValueError):
+            BasketMonteCarlo(models, np.eye(2), weights=[1.0])
+
+    def test_default_correlation_is_a_valid_matrix(self, flat_vol_surface):
+        tickers = ["AAPL", "MSFT", "NVDA"]
+        table = default_correlation(tickers)
+        assert table == {"AAPL": [1.0, 0.5, 0.5], "MSFT": [0.5, 1.0, 0.5], "NVDA": [0.5, 0.5, 1.0]}
+        # Read back the way the page reads its editor
+        matrix = [[table[b][a] for b in tickers] for a in range(len(tickers))]
+        basket = BasketMonteCarlo([MonteCarlo(**flat_vol_surface) for _ in tickers], matrix)
+        np.testing.assert_allclose(np.diag(basket.correlation), 1.0)
@@ -0,0 +1,51 @@
+import pytest
+import numpy as np
+import pandas as pd
+from pricer.model.forward_curve import implied_forward_curve, rates_for_maturities
+from pricer.model.implied_volatility import black_scholes_price
+
+SPOT = 100.0
+
+def parity_chain(r, q, maturities=(0.25, 0.5, 1.0), strikes=np.arange(88.0, 113.0, 2.5), sigma=0.25):
+    """
+    Calls and puts on every strike, priced with Black-Scholes at the given r and q
+    """
+    rows = []
+    for T in maturities:
+        for typ in ("call", "put"):
+            prices = black_scholes_price(SPOT, q, strikes, T, r, sigma, typ == "call")
+            rows += [
+                {"expiration_date": pd.Timestamp("2030-01-01") + pd.Timedelta(days=int(T * 365)), "period_year": T,
+                 "strike_price": K, "close_price": px, "type": typ}
+                for K, px in zip(strikes, prices)
+            ]
+    return pd.DataFrame(rows)
+
+class TestForwardCurve:
+
+    def test_recovers_rates_and_forwards(self):
+        curve = implied_forward_curve(parity_chain(r=0.045, q=0.015), SPOT)
+
+        assert len(curve) == 3
+        np.testing.assert_allclose(curve["risk_free_rate"], 0.045, atol=1e-9)
+        np.testing.assert_allclose(curve["dividend_yield"], 0.015, atol=1e-9)
+        np.testing.assert_allclose(curve["forward"], SPOT * np.exp((0.045 - 0.015) * curve["period_year"]), rtol=1e-9)
+
+    def test_skips_expiries_without_enough_pairs(self):
+        df = parity_chain(r=0.04, q=0.0)
+        # Only calls for the longest expiry - nothing to pair with
+        df = df[~((df["period_year"] == 1.0) & (df["type"] == "put"))]
+
+        curve = implied_forward_curve(df, SPOT)
+
+        assert curve["period_year"].tolist() == [0.25, 0.5]
+
+    def test_rates_interpolate_and_fall_back(self):
+        curve = pd.DataFrame({"period_year": [0.5, 1.0], "risk_free_rate": [0.04, 0.05], "dividend_yield": [0.01, 0.02]})
+
+        r, q = rates_for_maturities(curve, [0.25, 0.75, 2.0], risk_free_rate=0.035, dividend_yield=0.0)
+        np.testing.assert_allclose(r, [0.04, 0.045, 0.05])
+        np.testing.assert_allclose(q, [0.01, 0.015, 0.02])
+
+        r, q = rates_for_maturities(curve.iloc[:0], [0.25], risk_free_rate=0.035, dividend_yield=0.03)
+        assert r[0] == 0.035 and q[0] == 0.03
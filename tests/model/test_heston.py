@@ -0,0 +1,90 @@
+import pytest
+import numpy as np
+import pandas as pd
+from scipy.integrate import quad
+from pricer.model.black_scholes_model import BlackScholesModel
+from pricer.model.heston import HestonModel, HestonParameters
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import European
+from tests.configure_tests import flat_vol_surface
+
+PARAMS = HestonParameters(v0=0.05, kappa=1.5, theta=0.06, sigma=0.6, rho=-0.7)
+
+def reference_call(model, K, T):
+    """
+    Gil-Pelaez inversion by direct numerical integration, independent of the FFT
+    """
+    log_k = np.log(K)
+    phi = lambda u: model.characteristic_function(u, T)
+    p1_integrand = lambda u: np.real(np.exp(-1j * u * log_k) * phi(u - 1j) / (1j * u * phi(-1j)))
+    p2_integrand = lambda u: np.real(np.exp(-1j * u * log_k) * phi(u) / (1j * u))
+    p1 = 0.5 + quad(p1_integrand, 1e-8, 200, limit=500)[0] / np.pi
+    p2 = 0.5 + quad(p2_integrand, 1e-8, 200, limit=500)[0] / np.pi
+    return model.S * np.exp(-model.q * T) * p1 - K * np.exp(-model.r * T) * p2
+
+class TestHeston:
+
+    def test_fft_matches_direct_integration(self):
+        model = HestonModel(S=100, r=0.03, q=0.01, params=PARAMS)
+        strikes = np.array([70.0, 90.0, 100.0, 115.0, 140.0])
+        maturities = np.array([0.25, 0.5, 1.0, 1.0, 2.0])
+
+        prices = model.price(strikes, maturities, "call")
+
+        for K, T, px in zip(strikes, maturities, prices):
+            assert px == pytest.approx(reference_call(model, K, T), abs=2e-3)
+
+    def test_degenerates_to_black_scholes(self):
+        """
+        With (almost) no vol of vol and v0 = theta the variance stays put - Heston is Black-Scholes.
+        """
+        model = HestonModel(S=100, r=0.05, q=0.02, params=HestonParameters(v0=0.04, kappa=1.0, theta=0.04, sigma=1e-4, rho=0.0))
+        for K, typ in [(90, "put"), (100, "call"), (120, "call")]:
+            bs = BlackScholesModel(S=100, d=0.02, opt_px=0, K=K, T=0.75, r=0.05, typ=typ, sigma=0.2)
+            expected = bs.call_option_price() if typ == "call" else bs.put_option_price()
+            assert model.price(K, 0.75, typ) == pytest.approx(expected, abs=2e-3)
+
+    def test_calibration_recovers_prices(self):
+        model = HestonModel(S=100, r=0.03, q=0.0, params=PARAMS)
+        strikes, maturities = np.meshgrid(np.linspace(70, 140, 15), [0.1, 0.25, 0.5, 1.0, 1.5])
+        strikes, maturities = strikes.ravel(), maturities.ravel()
+        typ = np.where(strikes > 100, "call", "put")
+        chain = pd.DataFrame({
+            "strike_price": strikes,
+            "period_year": maturities,
+            "type": typ,
+            "close_price": model.price(strikes, maturities, typ),
+        })
+
+        fitted = HestonModel(S=100, r=0.03, q=0.0)
+        params = fitted.calibrate(chain, target="price")
+
+        np.testing.assert_allclose(fitted.price(strikes, maturities, typ), chain["close_price"], atol=5e-3)
+        assert params.rho == pytest.approx(PARAMS.rho, abs=0.1)
+        assert params.v0 == pytest.approx(PARAMS.v0, abs=0.01)
+
+    def test_monte_carlo_heston_paths(self, flat_vol_surface):
+        """
+        With no vol of vol the Heston walk prices like the flat vol walk.
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        flat_params = HestonParameters(v0=0.04, kappa=1.0, theta=0.04, sigma=1e-6, rho=-0.5)
+
+        px_heston, paths, se_heston = mc.simple_random_walk(100, flat_params, 100, "call", 30, iterations=40000, seed=5)
+        px_flat, _, se_flat = mc.simple_random_walk(100, 0.2, 100, "call", 30, iterations=40000, seed=6)
+
+        assert paths.shape == (200, 31)
+        assert px_heston == pytest.approx(px_flat, abs=4 * np.sqrt(se_heston ** 2 + se_flat ** 2))
+
+    def test_monte_carlo_heston_uses_the_calibration_forward(self, flat_vol_surface):
+        """
+        With a dividend yield the Heston walk drifts at r - q, like the FFT pricer the parameters are fitted with.
+        """
+        mc = MonteCarlo(**{**flat_vol_surface, "q": 0.06})
+        payoffs = [European(100, "call"), European(100, "put")]
+        result = mc.simulate(100, PARAMS, payoffs, 126, 40000, seed=7, backend="numpy")
+
+        model = HestonModel(S=100, r=mc.r, q=0.06, params=PARAMS)
+        expected = [model.price(100.0, 126 / 252, "call"), model.price(100.0, 126 / 252, "put")]
+        for price, standard_error, px in zip(result.prices, result.standard_errors, expected):
+            assert price == pytest.approx(px, abs=4 * standard_error + 0.02)
@@ -0,0 +1,65 @@
+import pytest
+import numpy as np
+from pricer.model.black_scholes_model import BlackScholesModel
+from pricer.model.implied_volatility import IVStatus, implied_volatility_batch, solver_summary
+
+class TestImpliedVolatilityBatch:
+
+    def test_matches_scalar_model(self):
+        """
+        The batch solver must agree with BlackScholesModel.implied_volatility contract for contract,
+        including which contracts are dropped.
+        """
+        generator = np.random.default_rng(7)
+        n = 300
+        S = 100.0
+        d = 0.01
+        r = 0.035
+        K = generator.uniform(20, 190, size=n)
+        T = generator.uniform(1 / 365, 2, size=n)
+        typ = np.where(generator.uniform(size=n) > 0.5, "call", "put")
+        opt_px = generator.uniform(0.01, 40, size=n)
+
+        result = implied_volatility_batch(S, d, opt_px, K, T, r, typ)
+
+        for i in range(n):
+            expected = BlackScholesModel(S=S, d=d, opt_px=opt_px[i], K=K[i], T=T[i], r=r, typ=typ[i], sigma=0.1).implied_volatility()
+            if np.isnan(expected):
+                assert np.isnan(result.iv[i])
+            else:
+                assert result.iv[i] == pytest.approx(expected, abs=1e-4)
+
+    def test_round_trip(self):
+        target_vol = np.array([0.15, 0.25, 0.6, 1.2])
+        K = np.array([90, 100, 110, 140])
+        bs = [BlackScholesModel(S=100, d=0, opt_px=0, K=k, T=1, r=0.05, typ="call", sigma=v) for k, v in zip(K, target_vol)]
+        prices = [m.call_option_price() for m in bs]
+
+        result = implied_volatility_batch(100, 0, prices, K, 1, 0.05, "call")
+
+        assert result.iv == pytest.approx(target_vol, abs=1e-4)
+        assert np.all(np.isin(result.status, [IVStatus.SOLVED_NEWTON, IVStatus.SOLVED_BISECTION]))
+        assert np.all(result.iterations > 0)
+
+    def test_status_codes(self):
+        S = np.array([100, 100, 100, 100, np.nan])
+        K = np.array([100, 80, 100, 200, 100])
+        T = np.array([1, 1, 1 / 365, 1, 1])
+        opt_px = np.array([105, 1, 1, 1, 5])
+        result = implied_volatility_batch(S, 0, opt_px, K, T, 0.05, "call")
+
+        assert list(result.status) == [
+            IVStatus.ABOVE_UPPER_BOUND,
+            IVStatus.BELOW_INTRINSIC,
+            IVStatus.UNDER_TIME_CAP,
+            IVStatus.OUTSIDE_MONEYNESS,
+            IVStatus.INVALID_INPUT,
+        ]
+        assert np.all(np.isnan(result.iv))
+        assert np.all(result.iterations == 0)
+
+        summary = solver_summary(result)
+        assert summary["contracts"] == 5
+        assert summary["status_counts"]["ABOVE_UPPER_BOUND"] == 1
+        assert summary["status_counts"]["SOLVED_NEWTON"] == 0
+        assert sum(summary["iteration_histogram"].values()) == 5
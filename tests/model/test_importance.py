@@ -0,0 +1,52 @@
+import pytest
+import numpy as np
+from pricer.model.heston import HestonParameters
+from pricer.model.implied_volatility import black_scholes_price
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, European
+from tests.configure_tests import flat_vol_surface
+
+class TestImportanceSampling:
+
+    def test_deep_out_of_the_money_european(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        payoff = European(140.0, "call")
+        shift = mc.optimal_drift_shift(100.0, 0.2, payoff, 30)
+        plain = mc.simulate(100.0, 0.2, [payoff], 30, 20_000, seed=0, backend="numpy")
+        shifted = mc.simulate(100.0, 0.2, [payoff], 30, 20_000, seed=0, backend="numpy", drift_shift=shift)
+
+        expected = black_scholes_price(100.0, 0.0, 140.0, 30 / 252, 0.05, 0.2, True)
+        assert plain.prices[0] == 0 # no path gets there
+        assert shifted.standard_errors[0] < 0.02 * expected
+        assert shifted.prices[0] == pytest.approx(expected, abs=4 * shifted.standard_errors[0])
+
+    def test_unbiased_on_local_vol_asian(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+        payoff = ArithmeticAsian(110.0, "call")
+        shift = mc.optimal_drift_shift(100.0, mc.lv_surface, payoff, 30)
+        plain = mc.simulate(100.0, mc.lv_surface, [payoff], 30, 200_000, seed=1, backend="numpy")
+        shifted = mc.simulate(100.0, mc.lv_surface, [payoff], 30, 20_000, seed=2, backend="numpy", drift_shift=shift)
+
+        # The shift falls off along the path, later steps move fewer fixings
+        assert shift[0] > shift[-1] > 0
+        tolerance = 4 * np.hypot(plain.standard_errors[0], shifted.standard_errors[0])
+        assert shifted.prices[0] == pytest.approx(plain.prices[0], abs=tolerance)
+        # A tenth of the paths for a smaller standard error
+        assert shifted.standard_errors[0] < plain.standard_errors[0]
+
+    def test_zero_shift_is_plain_sampling(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        payoff = ArithmeticAsian(105.0, "call")
+        plain = mc.simulate(100.0, 0.2, [payoff], 30, 1000, seed=3, backend="numpy")
+        shifted = mc.simulate(100.0, 0.2, [payoff], 30, 1000, seed=3, backend="numpy", drift_shift=np.zeros(30))
+        np.testing.assert_allclose(shifted.prices, plain.prices)
+        np.testing.assert_allclose(shifted.standard_errors, plain.standard_errors)
+
+    def test_unreachable_payoff_and_invalid_shifts(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        np.testing.assert_array_equal(mc.optimal_drift_shift(100.0, 0.2, European(1e9, "call"), 30), np.zeros(30))
+        with pytest.raises(ValueError):
+            mc.simulate(100.0, 0.2, [European(100.0, "call")], 30, 100, drift_shift=np.zeros(10))
+        with pytest.raises(ValueError):
+            mc.simulate(100.0, HestonParameters(v0=0.04, kappa=2, theta=0.04, sigma=0.3, rho=-0.7), [European(100.0, "call")], 30, 100, drift_shift=np.zeros(30))
@@ -0,0 +1,79 @@
+import logging
+import pytest
+import numpy as np
+from pricer.model import mlmc
+from pricer.model.implied_volatility import black_scholes_price
+from pricer.model.mlmc import level_grid, level_steps
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, European
+from tests.configure_tests import flat_vol_surface
+
+@pytest.fixture
+def skewed_model():
+    t_vals = np.linspace(10, 120, 12)
+    k_vals = np.linspace(60, 140, 17)
+    maturities, strike_prices = np.meshgrid(t_vals, k_vals)
+    log_moneyness = np.log(strike_prices / 100)
+    implied_vol = 0.22 - 0.15 * log_moneyness + 0.3 * log_moneyness ** 2
+    mc = MonteCarlo(maturities, strike_prices, implied_vol, 100.0, q=0.0, r=0.035)
+    mc.local_volatility()
+    return mc
+
+class TestMultilevel:
+
+    def test_levels(self):
+        assert level_steps(30) == [32, 16, 8, 4, 2, 1]
+        assert level_steps(30, steps_per_day=4)[-1] == 0.25
+        assert level_steps(1) == [1]
+        with pytest.raises(ValueError):
+            level_steps(30, steps_per_day=3)
+
+        fine, coarse = level_grid(30, 4), level_grid(30, 8)
+        assert fine[-1] == coarse[-1] == 30
+        assert np.all(np.isin(coarse, fine)) # coarse steps span whole fine steps
+        np.testing.assert_array_equal(level_grid(30, 32), [0, 30])
+
+    def test_flat_vol_european_matches_black_scholes(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        result = mc.simulate_multilevel(100.0, 0.2, European(100.0, "call"), 30, epsilon=0.02, seed=0)
+
+        expected = black_scholes_price(100.0, 0.0, 100.0, 30 / 252, 0.05, 0.2, True)
+        assert result.converged and result.standard_error <= 0.02 / np.sqrt(2) * 1.01
+        assert result.price == pytest.approx(expected, abs=4 * result.rmse)
+
+    def test_local_vol_asian_matches_daily_simulation(self, skewed_model):
+        payoff = ArithmeticAsian(100.0, "call")
+        result = skewed_model.simulate_multilevel(100.0, skewed_model.lv_surface, payoff, 30, epsilon=0.01, seed=1)
+        daily = skewed_model.simulate(100.0, skewed_model.lv_surface, [payoff], 30, 100_000, seed=2, backend="numpy")
+
+        assert result.converged and result.rmse <= 0.01 * 1.01
+        tolerance = 4 * np.hypot(result.rmse, daily.standard_errors[0])
+        assert result.price == pytest.approx(daily.prices[0], abs=tolerance)
+
+    def test_corrections_shrink_and_save_steps(self, skewed_model):
+        payoff = ArithmeticAsian(100.0, "call")
+        result = skewed_model.simulate_multilevel(100.0, skewed_model.lv_surface, payoff, 30, epsilon=0.01, seed=3)
+
+        variances = [level.variance for level in result.levels]
+        assert all(fine < coarse for coarse, fine in zip(variances[1:], variances[2:]))
+        assert result.levels[0].paths > result.levels[-1].paths
+        # Daily paths for the same standard error
+        daily = skewed_model.simulate(100.0, skewed_model.lv_surface, [payoff], 30, 20_000, seed=4, backend="numpy")
+        daily_steps = (daily.standard_errors[0] / result.standard_error) ** 2 * 20_000 * 30
+        assert result.cost < daily_steps
+
+    def test_levels_are_added_until_the_bias_is_small(self, skewed_model):
+        payoff = ArithmeticAsian(100.0, "call")
+        loose = skewed_model.simulate_multilevel(100.0, skewed_model.lv_surface, payoff, 30, epsilon=0.02, seed=5)
+        tight = skewed_model.simulate_multilevel(100.0, skewed_model.lv_surface, payoff, 30, epsilon=0.005, seed=5)
+
+        assert len(mlmc.level_steps(30, mlmc.MAX_STEPS_PER_DAY)) > len(tight.levels) > len(loose.levels) >= mlmc.MIN_LEVELS
+        for result, epsilon in ((loose, 0.02), (tight, 0.005)):
+            assert result.converged and result.bias <= epsilon / np.sqrt(2)
+
+    def test_flags_a_missed_target(self, skewed_model, monkeypatch, caplog):
+        monkeypatch.setattr(mlmc, "MAX_ROUNDS", 0) # no top ups after the pilots
+        with caplog.at_level(logging.WARNING, logger="pricer.model.mlmc"):
+            result = skewed_model.simulate_multilevel(100.0, skewed_model.lv_surface, ArithmeticAsian(100.0, "call"), 30, epsilon=0.005, seed=6)
+        assert not result.converged and result.standard_error > 0.005 / np.sqrt(2)
+        assert "stopped short" in caplog.text
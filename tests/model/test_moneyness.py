@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+from pricer.model.moneyness import STICKY_STRIKE, MoneynessSurface
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian
+
+@pytest.fixture
+def skewed_surface():
+    t_vals = np.linspace(30, 360, 12)
+    k_vals = np.linspace(70, 130, 13)
+    maturities, strike_prices = np.meshgrid(t_vals, k_vals)
+    log_moneyness = np.log(strike_prices / 100)
+    implied_vol = 0.22 - 0.1 * log_moneyness + 0.25 * log_moneyness ** 2 + 0.02 * np.sqrt(maturities / 365)
+    return {"maturities": maturities, "strike_prices": strike_prices, "implied_vol": implied_vol, "asset_price": 100.0, "q": 0.01, "r": 0.035}
+
+class TestMoneyness:
+
+    def test_round_trip(self, skewed_surface):
+        surface = MoneynessSurface.from_grids(skewed_surface["maturities"], skewed_surface["strike_prices"], skewed_surface["implied_vol"], 100.0)
+        maturities, strike_prices, implied_vol = surface.to_grids()
+
+        assert surface.total_variance[3, 5] == pytest.approx(skewed_surface["implied_vol"][3, 5] ** 2 * skewed_surface["maturities"][3, 5] / 365)
+        np.testing.assert_allclose(maturities, skewed_surface["maturities"])
+        np.testing.assert_allclose(strike_prices, skewed_surface["strike_prices"])
+        np.testing.assert_allclose(implied_vol, skewed_surface["implied_vol"])
+
+    def test_sticky_moneyness_reuses_the_grids(self, skewed_surface):
+        mc = MonteCarlo(**skewed_surface)
+        mc.local_volatility()
+        moved = mc.reanchor(110.0)
+
+        np.testing.assert_allclose(moved.strike_prices, mc.strike_prices * 1.1)
+        np.testing.assert_allclose(moved.implied_vol, mc.implied_vol)
+        assert moved.lv_raw is mc.lv_raw
+        # Same as building the local volatility from scratch at the new spot
+        rebuilt = MonteCarlo(**{**skewed_surface, "strike_prices": skewed_surface["strike_prices"] * 1.1, "asset_price": 110.0})
+        rebuilt.local_volatility()
+        np.testing.assert_allclose(moved.lv_raw, rebuilt.lv_raw, rtol=1e-9)
+
+    def test_sticky_moneyness_prices_scale_with_spot(self, skewed_surface):
+        mc = MonteCarlo(**skewed_surface)
+        mc.local_volatility()
+        moved = mc.reanchor(120.0)
+
+        base = mc.simulate(100.0, mc.lv_surface, [ArithmeticAsian(105.0, "call")], 30, 2000, seed=1, backend="numpy")
+        scaled = moved.simulate(120.0, moved.lv_surface, [ArithmeticAsian(126.0, "call")], 30, 2000, seed=1, backend="numpy")
+        assert scaled.prices[0] == pytest.approx(1.2 * base.prices[0], rel=1e-9)
+
+    def test_sticky_strike_keeps_strikes_and_rebuilds_local_vol(self, skewed_surface):
+        mc = MonteCarlo(**skewed_surface)
+        mc.local_volatility()
+        moved = mc.reanchor(95.0, STICKY_STRIKE)
+
+        assert moved.asset_price == 95.0
+        np.testing.assert_allclose(moved.strike_prices, mc.strike_prices)
+        np.testing.assert_allclose(moved.implied_vol, mc.implied_vol)
+        rebuilt = MonteCarlo(**{**skewed_surface, "asset_price": 95.0})
+        rebuilt.local_volatility()
+        np.testing.assert_allclose(moved.lv_raw, rebuilt.lv_raw, rtol=1e-9)
+
+    def test_invalid_reanchoring(self, skewed_surface):
+        mc = MonteCarlo(**skewed_surface)
+        with pytest.raises(ValueError):
+            mc.reanchor(110.0, "sticky_delta")
+        with pytest.raises(ValueError):
+            mc.reanchor(0.0)
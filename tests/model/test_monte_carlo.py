@@ -129,4 +129,28 @@ class TestMonteCarlo:
         
         assert not np.isnan(lv_middle)
         # Since neighbors are 0.2, the filled value should be close to 0.2
-        assert lv_middle == pytest.approx(0.2, abs=0.05)
\ No newline at end of file
+        assert lv_middle == pytest.approx(0.2, abs=0.05)
+
+    def test_float32_mode_matches_float64(self, flat_vol_surface):
+        """
+        Single precision paths must price within statistical error of the double precision run,
+        for both flat and local volatility.
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+
+        for volatility in (0.2, mc.lv_surface):
+            px_64, paths_64, se_64 = mc.simple_random_walk(100, volatility, 105, "call", 30, iterations=40000, seed=1)
+            px_32, paths_32, se_32 = mc.simple_random_walk(100, volatility, 105, "call", 30, iterations=40000, dtype=np.float32, seed=1)
+
+            assert paths_64.dtype == np.float64
+            assert paths_32.dtype == np.float32
+            assert isinstance(px_32, np.float64) # payoff statistics stay in double precision
+            assert px_32 == pytest.approx(px_64, abs=4 * np.sqrt(se_32 ** 2 + se_64 ** 2))
+
+    def test_seed_is_reproducible(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        first = mc.simple_random_walk(100, 0.2, 105, "call", 10, iterations=500, seed=42)
+        second = mc.simple_random_walk(100, 0.2, 105, "call", 10, iterations=500, seed=42)
+        assert first[0] == second[0]
+        np.testing.assert_array_equal(first[1], second[1])
@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+from pricer.model import numba_kernels
+from pricer.model.implied_volatility import implied_volatility_batch
+from pricer.model.monte_carlo import MonteCarlo
+from tests.configure_tests import flat_vol_surface
+
+requires_numba = pytest.mark.skipif(not numba_kernels.NUMBA_AVAILABLE, reason="numba is not installed")
+
+class TestBackendSelection:
+
+    def test_resolve_backend(self):
+        assert numba_kernels.resolve_backend("numpy") == "numpy"
+        assert numba_kernels.resolve_backend("auto") == ("numba" if numba_kernels.NUMBA_AVAILABLE else "numpy")
+        with pytest.raises(ValueError):
+            numba_kernels.resolve_backend("cuda")
+
+    def test_numba_required_when_requested(self, monkeypatch):
+        monkeypatch.setattr(numba_kernels, "NUMBA_AVAILABLE", False)
+        assert numba_kernels.resolve_backend("auto") == "numpy"
+        with pytest.raises(ImportError):
+            numba_kernels.resolve_backend("numba")
+
+@requires_numba
+class TestBackendsAgree:
+
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_monte_carlo(self, flat_vol_surface, dtype):
+        """
+        Both backends draw the same normals, so with the same seed they must walk the same paths.
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+        rtol = 1e-10 if dtype == np.float64 else 1e-5
+
+        for volatility in (0.2, mc.lv_surface):
+            px_np, paths_np, se_np = mc.simple_random_walk(100, volatility, 105, "call", 30, iterations=5000, dtype=dtype, seed=3, backend="numpy")
+            px_nb, paths_nb, se_nb = mc.simple_random_walk(100, volatility, 105, "call", 30, iterations=5000, dtype=dtype, seed=3, backend="numba")
+
+            np.testing.assert_allclose(paths_nb, paths_np, rtol=rtol)
+            assert px_nb == pytest.approx(px_np, rel=rtol * 10)
+            assert se_nb == pytest.approx(se_np, rel=rtol * 10)
+
+    def test_implied_volatility(self):
+        generator = np.random.default_rng(11)
+        n = 2000
+        K = generator.uniform(20, 190, size=n)
+        T = generator.uniform(1 / 365, 2, size=n)
+        typ = np.where(generator.uniform(size=n) > 0.5, "call", "put")
+        opt_px = generator.uniform(0.01, 40, size=n)
+
+        numpy_result = implied_volatility_batch(100, 0.01, opt_px, K, T, 0.035, typ, backend="numpy")
+        numba_result = implied_volatility_batch(100, 0.01, opt_px, K, T, 0.035, typ, backend="numba")
+
+        np.testing.assert_allclose(numba_result.iv, numpy_result.iv, atol=1e-6, equal_nan=True)
+        np.testing.assert_array_equal(numba_result.status, numpy_result.status)
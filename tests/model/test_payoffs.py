@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from pricer.model.black_scholes_model import BlackScholesModel
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, Barrier, European, FixedScheduleAsian, GeometricAsian, Lookback, Payoff
+from tests.configure_tests import flat_vol_surface
+
+class TestPayoffs:
+
+    def test_one_pass_matches_simple_random_walk(self, flat_vol_surface):
+        """
+        Extra payoffs ride along without changing the paths - the Asian price is the same as on its own.
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        payoffs = [ArithmeticAsian(105, "call"), GeometricAsian(105, "call"), Lookback("call")]
+
+        result = mc.simulate(100, 0.2, payoffs, 30, iterations=2000, seed=7)
+        px, paths, se = mc.simple_random_walk(100, 0.2, 105, "call", 30, iterations=2000, seed=7)
+
+        assert result.prices[0] == px and result.standard_errors[0] == se
+        np.testing.assert_array_equal(result.paths, paths)
+
+    def test_european_matches_black_scholes(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        result = mc.simulate(100, 0.2, [European(100, "call"), European(100, "put")], 63, iterations=100000, seed=1)
+
+        for j, typ in enumerate(("call", "put")):
+            model = BlackScholesModel(S=100, d=0, opt_px=0, K=100, T=63 / 252, r=mc.r, typ=typ, sigma=0.2)
+            expected = model.call_option_price() if typ == "call" else model.put_option_price()
+            assert result.prices[j] == pytest.approx(expected, abs=4 * result.standard_errors[j])
+
+    def test_payoff_identities(self, flat_vol_surface):
+        """
+        Relations that hold path by path, so exactly on one simulation
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        payoffs = [
+            European(100, "call"),
+            Barrier(100, "call", 110, knock="in"),
+            Barrier(100, "call", 110, knock="out"),
+            ArithmeticAsian(100, "call"),
+            FixedScheduleAsian(100, "call", tuple(range(1, 31))),
+            FixedScheduleAsian(100, "call", (30,)),
+            GeometricAsian(100, "call"),
+            Lookback("call", strike=100),
+        ]
+        prices = mc.simulate(100, 0.3, payoffs, 30, iterations=5000, seed=3).prices
+        european, knock_in, knock_out, arithmetic, every_day, last_day, geometric, lookback = prices
+
+        assert knock_in + knock_out == pytest.approx(european)
+        assert 0 < knock_in < european
+        assert every_day == pytest.approx(arithmetic)
+        assert last_day == pytest.approx(european)
+        assert geometric < arithmetic       # AM-GM
+        assert lookback > european          # max(S) >= S_T
+
+    def test_floating_lookback(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        result = mc.simulate(100, 1e-6, [Lookback("call"), Lookback("put")], 30, iterations=10)
+        # No volatility - the path only drifts up at r, the minimum is the starting price
+        assert result.prices[0] == pytest.approx((100 * np.exp(mc.r * 30 / 252) - 100) * np.exp(-mc.r * 30 / 252), rel=1e-4)
+        assert result.prices[1] == pytest.approx(0, abs=1e-6)
+
+    def test_invalid_fixings(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        with pytest.raises(ValueError):
+            mc.simulate(100, 0.2, [FixedScheduleAsian(100, "call", (0, 31))], 30, iterations=10)
+
+    def test_incomplete_payoff_fails_on_construction(self):
+        class NoSettle(Payoff):
+            def update(self, state, step, prices):
+                pass
+
+        with pytest.raises(TypeError):
+            NoSettle()
@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+import pandas as pd
+from pricer.model.implied_volatility import black_scholes_price
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.model.payoffs import ArithmeticAsian, European
+from pricer.model.scenario import ScenarioGrid, revalue_chain, revalue_contracts, revalue_monte_carlo
+from tests.configure_tests import flat_vol_surface
+
+@pytest.fixture
+def chain():
+    strikes = np.array([80.0, 90.0, 100.0, 110.0, 120.0])
+    return pd.DataFrame({
+        "underlying_symbol": "AAA",
+        "strike_price": np.tile(strikes, 2),
+        "period_year": np.repeat([0.25, 1.0], 5),
+        "calculated_iv": np.tile([0.3, 0.25, 0.2, 0.18, 0.17], 2),
+        "type": np.tile(["put", "put", "call", "call", "call"], 2),
+        "risk_free_rate": 0.04,
+        "dividend_yield": 0.01,
+    })
+
+class TestScenario:
+
+    def test_matches_black_scholes_per_scenario(self, chain):
+        grid = ScenarioGrid(spot_shocks=[-0.1, 0, 0.1], vol_shocks=[0, 0.05], skew_shocks=[0, -0.2], rates=[0.0, 0.04])
+        result = revalue_chain(chain, 100.0, grid)
+
+        assert result.values.shape == (3, 2, 2, 2, 10)
+        K, T, iv = chain["strike_price"].to_numpy(), chain["period_year"].to_numpy(), chain["calculated_iv"].to_numpy()
+        is_call = (chain["type"] == "call").to_numpy()
+        np.testing.assert_allclose(result.base, black_scholes_price(100.0, 0.01, K, T, 0.04, iv, is_call))
+        np.testing.assert_allclose(result.values[1, 0, 0, 1], result.base)
+        shocked_vol = iv + 0.05 - 0.2 * np.log(K / 100.0)
+        expected = black_scholes_price(110.0, 0.01, K, T, 0.0, shocked_vol, is_call)
+        np.testing.assert_allclose(result.values[2, 1, 1, 0], expected)
+
+    def test_pnl(self, chain):
+        grid = ScenarioGrid(spot_shocks=[-0.05, 0, 0.05])
+        result = revalue_chain(chain, 100.0, grid)
+        quantities = np.where(chain["type"] == "call", 1.0, -1.0) # long calls, short puts - long the underlying
+        pnl = result.pnl(quantities)[:, 0, 0, 0]
+        assert pnl[1] == pytest.approx(0)
+        assert pnl[0] < 0 < pnl[2]
+        np.testing.assert_allclose(result.pnl()[1], 0, atol=1e-12)
+
+    def test_contracts_keep_their_own_spot(self, chain):
+        other = chain.assign(underlying_symbol="BBB", strike_price=chain["strike_price"] * 2)
+        result = revalue_contracts({"AAA": chain, "BBB": other}, {"AAA": 100.0, "BBB": 200.0}, ScenarioGrid(vol_shocks=[0, 0.01]))
+        # Same moneyness, maturity and vol, twice the size
+        np.testing.assert_allclose(result.base[10:], 2 * result.base[:10])
+        assert list(result.labels[[0, -1]]) == ["AAA", "BBB"]
+
+    def test_monte_carlo_common_random_numbers(self, flat_vol_surface):
+        """
+        With the same random numbers the spot bumped difference is close to the Black-Scholes one even at few paths
+        """
+        mc = MonteCarlo(**flat_vol_surface)
+        grid = ScenarioGrid(spot_shocks=[-0.01, 0.01])
+        result = revalue_monte_carlo(mc, 0.2, [European(100, "call")], 63, grid, iterations=4000, seed=3)
+        T = 63 / 252
+        expected = black_scholes_price(101.0, 0, 100, T, 0.05, 0.2, True) - black_scholes_price(99.0, 0, 100, T, 0.05, 0.2, True)
+        assert result.values[1, 0, 0, 0, 0] - result.values[0, 0, 0, 0, 0] == pytest.approx(expected, rel=0.05)
+
+    def test_monte_carlo_shocks_the_local_volatility(self, flat_vol_surface):
+        mc = MonteCarlo(**flat_vol_surface)
+        mc.local_volatility()
+        lv = mc.lv_raw.copy()
+        payoffs = [ArithmeticAsian(100, "call")]
+        result = revalue_monte_carlo(mc, mc.lv_surface, payoffs, 20, ScenarioGrid(vol_shocks=[0, 0.05]), iterations=2000, seed=5)
+
+        assert result.base[0] == pytest.approx(mc.simulate(100, mc.lv_surface, payoffs, 20, 2000, seed=5).prices[0])
+        assert result.values[0, 0, 0, 0, 0] == pytest.approx(result.base[0])
+        assert result.values[0, 1, 0, 0, 0] > result.base[0]
+        np.testing.assert_array_equal(mc.lv_raw, lv) # the shocked copies leave the original alone
@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import pandas as pd
+from scipy.interpolate import RegularGridInterpolator
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.plotter import plot_volatility_surface as surface
+from pricer.plotter.plot_volatility_surface import create_volatility_surface, find_vol_arbitrage
+
+def smile(strike_price, days_to_expiry):
+    log_moneyness = np.log(strike_price / 100)
+    return 0.22 - 0.1 * log_moneyness + 0.25 * log_moneyness ** 2 + 0.02 * np.sqrt(days_to_expiry / 365)
+
+@pytest.fixture
+def chain():
+    generator = np.random.default_rng(0)
+    n = 4000
+    days_to_expiry = generator.choice(np.concatenate([np.arange(14, 63, 7), np.arange(63, 365, 30), np.arange(365, 731, 91)]), size=n)
+    strike_price = np.round(100 * generator.uniform(0.5, 1.5, size=n), 1)
+    surface._triangulations.clear()
+    surface._interpolators.clear()
+    return pd.DataFrame({
+        "days_to_expiry": days_to_expiry,
+        "strike_price": strike_price,
+        "calculated_iv": smile(strike_price, days_to_expiry),
+        "open_interest": generator.integers(1, 5000, size=n),
+    })
+
+def contract_error(chain, X, Y, Z):
+    grid = RegularGridInterpolator((Y[:, 0], X[0, :]), Z, bounds_error=False)
+    error = grid(np.column_stack((chain["strike_price"], chain["days_to_expiry"]))) - smile(chain["strike_price"], chain["days_to_expiry"])
+    return np.sqrt(np.nanmean(error ** 2))
+
+class TestAdaptiveGrid:
+
+    def test_axes(self, chain):
+        X, Y, Z = create_volatility_surface(chain, 20, grid="adaptive")
+        maturities, strikes = X[0, :], Y[:, 0]
+
+        assert X.shape == Y.shape == Z.shape
+        assert abs(X.size - 400) <= 20 # the node budget of a 20 x 20 grid
+        assert np.all(np.diff(maturities) > 0) and np.all(np.diff(strikes) > 0)
+        assert (maturities[0], maturities[-1]) == (chain["days_to_expiry"].min(), chain["days_to_expiry"].max())
+        assert (strikes[0], strikes[-1]) == (chain["strike_price"].min(), chain["strike_price"].max())
+        # The smile curves in strike, the term structure barely does - and most curvature is at short expiries
+        assert len(strikes) > 2 * len(maturities)
+        assert np.diff(maturities)[0] < np.diff(maturities)[-1]
+
+    def test_several_times_fewer_nodes(self, chain):
+        adaptive = create_volatility_surface(chain, 15, grid="adaptive")
+        uniform = create_volatility_surface(chain, 30)
+        assert adaptive[0].size * 3.5 < uniform[0].size
+        assert contract_error(chain, *adaptive) < contract_error(chain, *uniform)
+
+    def test_local_volatility_on_adaptive_axes(self, chain):
+        X, Y, Z = create_volatility_surface(chain.assign(calculated_iv=0.2), 15, grid="adaptive")
+        mc = MonteCarlo(X, Y, np.nan_to_num(Z, nan=0.2), 100.0, r=0.05)
+        mc.local_volatility()
+        np.testing.assert_allclose(mc.lv_raw[2:-2, 2:-2], 0.2, atol=0.01)
+
+    def test_anomalies_in_coordinate_units(self):
+        # A plane on axes dense near the money - the same slope everywhere, however far apart the nodes
+        strikes = 100 + 40 * np.sinh(np.linspace(-2, 2, 21)) / np.sinh(2)
+        X, Y = np.meshgrid(np.geomspace(14, 730, 9), strikes)
+        Z = 0.2 + 0.002 * (Y - 60)
+        per_step = find_vol_arbitrage(Z, 0.005)
+        assert per_step.any() and not per_step.all()
+        slope = 0.002 * (strikes[-1] - strikes[0]) / 100 # IV per 1% of the strike range
+        assert find_vol_arbitrage(Z, 0.9 * slope, X, Y).all()
+        assert not find_vol_arbitrage(Z, 1.1 * slope, X, Y).any()
+
+    def test_unknown_grid(self, chain):
+        with pytest.raises(ValueError):
+            create_volatility_surface(chain, 15, grid="random")
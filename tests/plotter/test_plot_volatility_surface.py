@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+import pandas as pd
+from scipy.interpolate import griddata
+from pricer.instrumentation import InMemorySink, instrumentation
+from pricer.plotter import plot_volatility_surface as surface
+from pricer.plotter.plot_volatility_surface import create_volatility_surface
+
+@pytest.fixture
+def chain():
+    generator = np.random.default_rng(0)
+    days_to_expiry = generator.choice([14, 30, 60, 90, 180, 365], size=400)
+    strike_price = np.round(generator.uniform(60, 140, size=400))
+    calculated_iv = 0.2 + 0.3 * (np.log(strike_price / 100)) ** 2 + 0.01 * np.sqrt(days_to_expiry / 365)
+    surface._triangulations.clear()
+    surface._interpolators.clear()
+    return pd.DataFrame({"days_to_expiry": days_to_expiry, "strike_price": strike_price, "calculated_iv": calculated_iv})
+
+class TestVolatilitySurface:
+
+    def test_matches_griddata(self, chain):
+        X, Y, Z = create_volatility_surface(chain, 40)
+        expected = griddata((chain["days_to_expiry"], chain["strike_price"]), chain["calculated_iv"], (X, Y), method="cubic")
+        np.testing.assert_allclose(Z, expected, equal_nan=True)
+
+    def test_triangulation_is_reused(self, chain):
+        """
+        Another resolution, or new IVs on the same contracts, do not triangulate again.
+        """
+        sink = InMemorySink()
+        with instrumentation.recording(sink):
+            create_volatility_surface(chain, 30)
+            create_volatility_surface(chain, 80)
+            bumped = chain.assign(calculated_iv=chain["calculated_iv"] + 0.01)
+            _, _, Z_bumped = create_volatility_surface(bumped, 30)
+        _, _, Z = create_volatility_surface(chain, 30)
+
+        assert sink.counters["surface.triangulations"] == 1
+        np.testing.assert_allclose(Z_bumped, Z + 0.01, equal_nan=True)
+
+    def test_linear_method(self, chain):
+        points = np.column_stack((chain["days_to_expiry"], chain["strike_price"]))
+        interpolator = surface.surface_interpolator(points, chain["calculated_iv"], method="linear")
+        assert interpolator(90, 100) == pytest.approx(griddata(points, chain["calculated_iv"], (90, 100), method="linear"))
+        with pytest.raises(ValueError):
+            surface.surface_interpolator(points, chain["calculated_iv"], method="nearest")
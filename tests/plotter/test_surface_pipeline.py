@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from pricer.instrumentation import InMemorySink, instrumentation
+from pricer.plotter import plot_volatility_surface as surface
+from pricer.plotter.surface_pipeline import build_surfaces, make_executor
+
+def make_chain(seed, size=300):
+    generator = np.random.default_rng(seed)
+    days_to_expiry = generator.choice([14, 30, 60, 90, 180, 365], size=size)
+    strike_price = np.round(generator.uniform(60, 140, size=size))
+    calculated_iv = 0.2 + 0.3 * (np.log(strike_price / 100)) ** 2 + 0.01 * np.sqrt(days_to_expiry / 365)
+    return pd.DataFrame({"days_to_expiry": days_to_expiry, "strike_price": strike_price, "calculated_iv": calculated_iv, "type": "call"})
+
+@pytest.fixture
+def chains():
+    surface._triangulations.clear()
+    surface._interpolators.clear()
+    return {"AAA": make_chain(0), "BBB": make_chain(1), "CCC": make_chain(2).head(3)}
+
+class TestSurfacePipeline:
+
+    def test_process_pool(self, chains):
+        """
+        Every ticker comes back once, with the grids create_volatility_surface builds in this process.
+        """
+        executor = make_executor(max_workers=2)
+        try:
+            results = {r.ticker: r for r in build_surfaces(chains, 30, prices={"AAA": 101.0}, dividend_yields={"AAA": 0.01}, executor=executor)}
+        finally:
+            executor.shutdown()
+
+        assert set(results) == set(chains)
+        for ticker in ("AAA", "BBB"):
+            X, Y, Z = surface.create_volatility_surface(chains[ticker], 30)
+            np.testing.assert_allclose(results[ticker].implied_vol, Z, equal_nan=True)
+            np.testing.assert_allclose(results[ticker].page_2_data["maturities"], X)
+            assert results[ticker].page_2_data["vol"] == pytest.approx(chains[ticker]["calculated_iv"].median())
+        assert results["AAA"].page_2_data["price"] == 101.0
+        assert results["AAA"].page_2_data["dividend_yield"] == 0.01
+        assert results["BBB"].page_2_data["price"] == 100.0
+        assert not results["CCC"].ok and results["CCC"].page_2_data is None
+
+    def test_worker_failure_is_a_result(self, chains):
+        chains["BBB"] = chains["BBB"].drop(columns="calculated_iv")
+        with ThreadPoolExecutor(2) as executor:
+            results = {r.ticker: r for r in build_surfaces(chains, 20, executor=executor)}
+        assert results["AAA"].ok
+        assert "calculated_iv" in results["BBB"].error
+
+    def test_single_ticker_in_process(self, chains):
+        sink = InMemorySink()
+        with instrumentation.recording(sink):
+            results = list(build_surfaces({"AAA": chains["AAA"]}, 20))
+        assert len(results) == 1 and results[0].ok
+        assert sink.counters["surface.triangulations"] == 1 # built here, not in a worker
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import pricer
+
+SRC_DIR = Path(pricer.__file__).resolve().parents[1]
+HEAVY = ["pandas", "scipy.interpolate", "scipy.spatial", "scipy.optimize", "scipy.special", "scipy.stats", "numba", "plotly.graph_objects", "alpaca.trading", "requests"]
+
+def loaded_after(*modules: str) -> list[str]:
+    """
+    Heavy modules whose code ran while importing `modules` in a fresh interpreter. A lazily imported
+    module sits in sys.modules before it is loaded, but only as a plain module once it has been.
+    """
+    code = (
+        "import json, sys, types\n"
+        + "".join(f"import {module}\n" for module in modules)
+        + f"print(json.dumps([name for name in {HEAVY!r} if type(sys.modules.get(name)) is types.ModuleType]))"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+class TestImports:
+
+    def test_worker_imports_stay_light(self):
+        """
+        A Monte Carlo worker process does not pay for pandas, scipy, numba or plotly until it uses them.
+        """
+        assert loaded_after("pricer", "pricer.model.monte_carlo", "pricer.plotter.plot_monte_carlo", "pricer.plotter.plot_volatility_surface") == []
+
+    def test_data_defers_alpaca(self):
+        assert loaded_after("pricer.data.data") == ["pandas"]
+
+    def test_lazy_names_resolve(self):
+        from pricer.model.monte_carlo import MonteCarlo
+        assert pricer.MonteCarlo is MonteCarlo
+        assert "HestonModel" in dir(pricer)
+        with pytest.raises(AttributeError):
+            pricer.not_a_name
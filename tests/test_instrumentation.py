@@ -0,0 +1,91 @@
+import pytest
+import threading
+import numpy as np
+from pricer.instrumentation import InMemorySink, Instrumentation, instrumentation
+from pricer.model.monte_carlo import MonteCarlo
+from tests.configure_tests import flat_vol_surface
+
+class TestInstrumentation:
+
+    def test_disabled_records_nothing(self):
+        """
+        Without sinks the timer is a shared no-op and counters are dropped.
+        """
+        instr = Instrumentation()
+        assert not instr.enabled
+        with instr.timer("stage") as first, instr.timer("other") as second:
+            instr.count("counter", 5)
+        assert first is second
+
+    def test_timer_counter_and_decorator(self):
+        instr = Instrumentation()
+        sink = InMemorySink()
+
+        @instr.timed("decorated")
+        def work(x):
+            return x * 2
+
+        with instr.recording(sink):
+            with instr.timer("stage"):
+                instr.count("counter", 2)
+                instr.count("counter", 3)
+            assert work(21) == 42
+
+        assert not instr.enabled
+        assert sink.counters["counter"] == 5
+        assert len(sink.timings["stage"]) == 1
+        assert len(sink.timings["decorated"]) == 1
+        # Detached sinks stop receiving
+        instr.count("counter", 100)
+        assert sink.counters["counter"] == 5
+
+    def test_local_sinks_only_see_their_thread(self):
+        """
+        Two sessions recording at once each see their own stages, a process wide sink sees both.
+        """
+        instr = Instrumentation()
+        shared = InMemorySink()
+        sinks = {name: InMemorySink() for name in ("first", "second")}
+        attached = threading.Barrier(2)
+
+        def session(name):
+            with instr.recording(sinks[name], local=True):
+                attached.wait() # both sinks are attached before either records
+                with instr.timer(f"{name}.stage"):
+                    instr.count(f"{name}.counter")
+                attached.wait()
+
+        with instr.recording(shared):
+            threads = [threading.Thread(target=session, args=(name,)) for name in sinks]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for name, sink in sinks.items():
+            assert list(sink.timings) == [f"{name}.stage"] and list(sink.counters) == [f"{name}.counter"]
+        assert sorted(shared.counters) == ["first.counter", "second.counter"]
+        assert not instr.enabled
+
+        # A local sink left behind by a thread that is gone can still be detached
+        stale = InMemorySink()
+        thread = threading.Thread(target=instr.add_sink, args=(stale, True))
+        thread.start()
+        thread.join()
+        assert instr.enabled
+        instr.remove_sink(stale)
+        assert not instr.enabled
+
+    def test_monte_carlo_hooks(self, flat_vol_surface):
+        """
+        The MC and Dupire hot paths report their work to the global instrumentation.
+        """
+        sink = InMemorySink()
+        mc = MonteCarlo(**flat_vol_surface)
+        with instrumentation.recording(sink):
+            mc.local_volatility()
+            mc.simple_random_walk(current_price=100, volatility=0.2, strike=100, typ="call", path_length=10, iterations=50)
+
+        assert sink.counters["mc.path_steps"] == 500
+        assert "mc.simple_random_walk" in sink.timings
+        assert "lv.local_volatility" in sink.timings
@@ -0,0 +1,78 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+import numpy as np
+from pricer.model.monte_carlo import MonteCarlo
+from pricer.service import MicroBatcher, PriceRequest, PricingService, SurfaceRegistry
+from tests.configure_tests import flat_vol_surface
+
+@pytest.fixture
+def registry(flat_vol_surface):
+    registry = SurfaceRegistry()
+    registry.add("TEST", MonteCarlo(**flat_vol_surface))
+    return registry
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())
+
+class TestMicroBatcher:
+
+    def test_concurrent_requests_share_one_simulation(self, registry):
+        batcher = MicroBatcher(registry, window=0.2)
+        strikes = [95, 100, 105, 100, 95, 105, 100, 110]
+        futures = [batcher.submit(PriceRequest("TEST", k, "call", 20, iterations=5000 + k)) for k in strikes]
+        responses = [f.result(timeout=30) for f in futures]
+        batcher.close()
+
+        assert batcher.metrics.batches == 1
+        assert all(r.batch_size == len(strikes) and r.error is None for r in responses)
+        assert all(r.iterations == 5110 for r in responses) # the most any request asked for
+        by_strike = {}
+        for r in responses:
+            by_strike.setdefault(r.strike, set()).add(r.price)
+        assert all(len(prices) == 1 for prices in by_strike.values()) # same paths, same price
+        prices = [by_strike[k].pop() for k in (95, 100, 105, 110)]
+        assert prices == sorted(prices, reverse=True)
+
+    def test_keys_are_priced_apart(self, registry):
+        batcher = MicroBatcher(registry, window=0.05)
+        futures = [batcher.submit(PriceRequest("TEST", 100, "put", days)) for days in (10, 20)]
+        futures.append(batcher.submit(PriceRequest("NOPE", 100, "put", 10)))
+        responses = [f.result(timeout=30) for f in futures]
+        batcher.close()
+
+        assert [r.batch_size for r in responses] == [1, 1, 1]
+        assert responses[0].price < responses[1].price
+        assert "NOPE" in responses[2].error
+        snapshot = batcher.metrics.snapshot()
+        assert snapshot["requests"] == 3 and snapshot["errors"] == 1
+        assert snapshot["latency_p50_ms"] > 0
+
+    def test_request_validation(self):
+        assert PriceRequest.from_json({"ticker": "test", "strike": 100, "days": 5}) == PriceRequest("TEST", 100.0, "call", 5)
+        for payload in ({"ticker": "T", "days": 5}, {"ticker": "T", "strike": 100, "days": 5, "type": "straddle"}, {"ticker": "T", "strike": -1, "days": 5}):
+            with pytest.raises(ValueError):
+                PriceRequest.from_json(payload)
+
+class TestPricingService:
+
+    def test_http_round_trip(self, registry):
+        service = PricingService(registry, port=0, window=0.05).start()
+        try:
+            responses = post(f"{service.url}/price", [{"ticker": "TEST", "strike": k, "type": "call", "days": 20, "iterations": 2000} for k in (95, 105)])
+            single = post(f"{service.url}/price", {"ticker": "TEST", "strike": 100, "type": "put", "days": 20, "volatility": 0.3})
+            with pytest.raises(urllib.error.HTTPError) as error:
+                post(f"{service.url}/price", {"ticker": "TEST"})
+            with urllib.request.urlopen(f"{service.url}/metrics", timeout=30) as response:
+                metrics = json.loads(response.read())
+        finally:
+            service.stop()
+
+        assert [r["batch_size"] for r in responses] == [2, 2]
+        assert responses[0]["price"] > responses[1]["price"] > 0
+        assert single["error"] is None and single["price"] > 0
+        assert error.value.code == 400
+        assert metrics["requests"] == 3 and metrics["batches"] == 2